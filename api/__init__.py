@@ -1,3 +1,10 @@
 # Allows `api` package imports
 
-from .index import socket_app
+
+def __getattr__(name):
+    # Loaded on first use, so light modules such as api.frame_ring can be
+    # imported without starting up the whole server
+    if name == "socket_app":
+        from .index import socket_app
+        return socket_app
+    raise AttributeError(f"module 'api' has no attribute {name!r}")
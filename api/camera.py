@@ -0,0 +1,160 @@
+"""Camera frame ingestion: a bounded in-memory ring plus optional disk spooling.
+
+``FrameStore.add`` only appends to a ring of the last ``capacity`` frames and
+puts a reference on the spool queue, so the event loop never touches the
+disk. A spooler thread writes frames to ``spool_dir`` and deletes the oldest
+files once the retention limits are exceeded. When the disk falls behind,
+frames are dropped from the spool (never from the ring) and counted.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple
+
+DEFAULT_CAPACITY = 64
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+SPOOL_QUEUE = 256
+
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+_STOP = object()
+
+
+class Frame(NamedTuple):
+    seq: int
+    timestamp: float
+    data: bytes
+    content_type: str
+
+    @property
+    def name(self) -> str:
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime(self.timestamp))
+        micros = int(self.timestamp % 1 * 1e6)
+        return f"frame_{stamp}_{micros:06d}_{self.seq:08d}.{EXTENSIONS.get(self.content_type, 'bin')}"
+
+
+class FrameStore:
+    """Last ``capacity`` frames of one camera; ``add`` is safe to call on the event loop"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spool_dir: str = "",
+                 max_spool_bytes: int = 512 * 1024 * 1024, max_spool_files: int = 10000):
+        self.frames: deque[Frame] = deque(maxlen=capacity)
+        self.spool_dir = spool_dir
+        self.max_spool_bytes = max_spool_bytes
+        self.max_spool_files = max_spool_files
+        self.listeners: list[Callable[[Frame], None]] = []
+        self.seq = 0
+        self.bytes_received = 0
+        self.spooled = 0
+        self.spool_dropped = 0
+        self.spool_bytes = 0
+        self._rate_window: deque[float] = deque(maxlen=120)
+        self._queue: queue.Queue = queue.Queue(maxsize=SPOOL_QUEUE)
+        self._thread: threading.Thread | None = None
+        self._spool_files: deque[tuple[str, int]] = deque()
+
+    # Producer side (event loop) ---------------------------------------
+    def add(self, data: bytes, content_type: str = "image/jpeg", timestamp: float | None = None) -> Frame:
+        self.seq += 1
+        frame = Frame(self.seq, time.time() if timestamp is None else timestamp, data, content_type)
+        self.frames.append(frame)
+        self.bytes_received += len(data)
+        self._rate_window.append(time.monotonic())
+        if self._thread:
+            try:
+                self._queue.put_nowait(frame)
+            except queue.Full:
+                self.spool_dropped += 1
+        for listener in self.listeners:
+            listener(frame)
+        return frame
+
+    @property
+    def latest(self) -> Frame | None:
+        return self.frames[-1] if self.frames else None
+
+    def get(self, seq: int) -> Frame | None:
+        """Frame ``seq`` if it is still in the ring"""
+        if not self.frames:
+            return None
+        index = seq - self.frames[0].seq
+        return self.frames[index] if 0 <= index < len(self.frames) else None
+
+    def fps(self) -> float:
+        """Upload rate over the last ~4 seconds"""
+        now = time.monotonic()
+        recent = [t for t in self._rate_window if now - t < 4.0]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6)
+
+    def start(self):
+        if self._thread or not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._scan_spool()
+        self._thread = threading.Thread(target=self._spooler, name="camera-spool", daemon=True)
+        self._thread.start()
+        print(f"📷 Spooling camera frames to {self.spool_dir}")
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> dict:
+        latest = self.latest
+        return {
+            "frames": self.seq,
+            "buffered": len(self.frames),
+            "capacity": self.frames.maxlen,
+            "fps": round(self.fps(), 1),
+            "bytes": self.bytes_received,
+            "latest_seq": latest.seq if latest else None,
+            "latest_timestamp": latest.timestamp if latest else None,
+            "spool_dir": self.spool_dir or None,
+            "spooled": self.spooled,
+            "spool_dropped": self.spool_dropped,
+            "spool_queued": self._queue.qsize(),
+            "spool_files": len(self._spool_files),
+            "spool_bytes": self.spool_bytes,
+        }
+
+    # Spooler thread ---------------------------------------------------
+    def _scan_spool(self):
+        """Pick up files left by earlier runs so retention covers them too"""
+        entries = []
+        for entry in os.scandir(self.spool_dir):
+            if entry.is_file() and entry.name.startswith("frame_"):
+                entries.append((entry.name, entry.path, entry.stat().st_size))
+        for _, path, size in sorted(entries):
+            self._spool_files.append((path, size))
+            self.spool_bytes += size
+
+    def _spooler(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                return
+            path = os.path.join(self.spool_dir, frame.name)
+            try:
+                with open(path, "wb") as dst:
+                    dst.write(frame.data)
+            except OSError as e:
+                print(f"❌ Camera spool write failed: {e}")
+                continue
+            self._spool_files.append((path, len(frame.data)))
+            self.spool_bytes += len(frame.data)
+            self.spooled += 1
+            while self._spool_files and (self.spool_bytes > self.max_spool_bytes
+                                         or len(self._spool_files) > self.max_spool_files):
+                old, size = self._spool_files.popleft()
+                self.spool_bytes -= size
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
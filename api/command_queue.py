@@ -0,0 +1,209 @@
+"""Queued vehicle commands with IDs, priorities and acknowledgement tracking.
+
+HTTP handlers only ``submit`` a command and return its ID; one worker task
+per vehicle sends the commands in priority order and reports every state
+change through ``on_event``. This keeps operator requests independent of the
+link round-trip and stops concurrent clicks from interleaving.
+
+Priorities: ``rtl`` and ``land`` go before everything else. When one of them
+is submitted, the command being sent is cancelled and queued lower-priority
+commands are dropped as ``superseded`` (a takeoff queued behind an RTL must
+not run after it).
+"""
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable
+
+URGENT = 0
+NORMAL = 1
+
+COMMAND_PRIORITIES = {
+    "rtl": URGENT,
+    "land": URGENT,
+    "arm": NORMAL,
+    "disarm": NORMAL,
+    "takeoff": NORMAL,
+    "mission_upload": NORMAL,
+    "mission_start": NORMAL,
+    "mission_pause": NORMAL,
+}
+
+DEFAULT_TIMEOUT = 10.0
+HISTORY_SIZE = 100
+
+# Command lifecycle; the last three are final
+QUEUED, RUNNING, OK, FAILED, TIMEOUT, CANCELLED, SUPERSEDED = (
+    "queued", "running", "ok", "failed", "timeout", "cancelled", "superseded")
+FINAL = {OK, FAILED, TIMEOUT, CANCELLED, SUPERSEDED}
+
+
+class Command:
+    """One submitted command and its progress"""
+
+    def __init__(self, command_id: int, name: str, priority: int, timeout: float, args: tuple = ()):
+        self.id = command_id
+        self.name = name
+        self.args = args
+        self.priority = priority
+        self.timeout = timeout
+        self.status = QUEUED
+        self.error: str | None = None
+        self.submitted = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.done = asyncio.Event()
+
+    @property
+    def final(self) -> bool:
+        return self.status in FINAL
+
+    async def wait(self) -> bool:
+        """Wait until the command is final; True if the vehicle accepted it"""
+        await self.done.wait()
+        return self.status == OK
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "command": self.name,
+            "status": self.status,
+            "priority": self.priority,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class CommandQueue:
+    def __init__(self, execute: Callable[..., Awaitable[bool]],
+                 on_event: Callable[[Command], None] | None = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.execute = execute      # async execute(name, *args) -> success
+        self.on_event = on_event
+        self.timeout = timeout
+        self.commands: dict[int, Command] = {}  # recent commands by ID
+        self._ids = itertools.count(1)
+        self._queue: asyncio.PriorityQueue | None = None
+        self._worker: asyncio.Task | None = None
+        self._running: Command | None = None
+        self._running_task: asyncio.Task | None = None
+
+    def submit(self, name: str, *args, timeout: float | None = None) -> Command:
+        """Queue ``name(*args)``; an identical command still in flight is returned instead"""
+        if name not in COMMAND_PRIORITIES:
+            raise ValueError(f"Unknown command {name!r}")
+        for command in self.commands.values():
+            if command.name == name and command.args == args and not command.final:
+                return command
+
+        command = Command(next(self._ids), name, COMMAND_PRIORITIES[name], timeout or self.timeout, args)
+        self.commands[command.id] = command
+        self._trim()
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._work())
+
+        self._queue.put_nowait((command.priority, command.id, command))
+        self._event(command)
+        if command.priority == URGENT:
+            self._preempt(command)
+        return command
+
+    def get(self, command_id: int) -> Command | None:
+        return self.commands.get(command_id)
+
+    def cancel(self, command_id: int) -> bool:
+        """Cancel a command that has not finished yet"""
+        command = self.commands.get(command_id)
+        if command is None or command.final:
+            return False
+        if command is self._running:
+            self._running_task.cancel()
+        else:
+            self._finish(command, CANCELLED)
+        return True
+
+    def pending(self) -> list[Command]:
+        return [c for c in self.commands.values() if not c.final]
+
+    def stop(self):
+        if self._worker:
+            self._worker.cancel()
+        for command in self.pending():
+            self._finish(command, CANCELLED)
+
+    def _preempt(self, urgent: Command):
+        for command in self.pending():
+            if command.priority <= urgent.priority:
+                continue
+            if command is self._running:
+                self._running_task.cancel()
+            else:
+                self._finish(command, SUPERSEDED, f"superseded by {urgent.name} #{urgent.id}")
+
+    def _trim(self):
+        while len(self.commands) > HISTORY_SIZE:
+            oldest = next(iter(self.commands.values()))
+            if not oldest.final:
+                break
+            del self.commands[oldest.id]
+
+    def _event(self, command: Command):
+        if self.on_event:
+            try:
+                self.on_event(command)
+            except Exception as e:
+                print(f"❌ Command event error ({command.name}): {e}")
+
+    def _finish(self, command: Command, status: str, error: str | None = None):
+        command.status = status
+        command.error = error
+        command.finished = time.time()
+        command.done.set()
+        self._event(command)
+
+    async def _work(self):
+        while True:
+            _, _, command = await self._queue.get()
+            if command.final:
+                continue  # cancelled or superseded while queued
+            # The timeout covers the time spent waiting in the queue
+            remaining = command.submitted + command.timeout - time.time()
+            if remaining <= 0:
+                self._finish(command, TIMEOUT, "expired in queue")
+                continue
+
+            command.status = RUNNING
+            command.started = time.time()
+            self._event(command)
+            self._running = command
+            self._running_task = asyncio.ensure_future(self.execute(command.name, *command.args))
+            try:
+                success = await asyncio.wait_for(asyncio.shield(self._running_task), remaining)
+                if success:
+                    self._finish(command, OK)
+                else:
+                    self._finish(command, FAILED, "rejected by vehicle")
+            except asyncio.TimeoutError:
+                self._running_task.cancel()
+                self._finish(command, TIMEOUT, f"no acknowledgement within {command.timeout:g} s")
+            except asyncio.CancelledError:
+                if not self._running_task.cancelled():
+                    # The worker itself is being stopped
+                    self._running_task.cancel()
+                    self._finish(command, CANCELLED)
+                    raise
+                # The command was pre-empted or cancelled by the operator
+                urgent = next((c for c in self.pending() if c.priority < command.priority), None)
+                if urgent:
+                    self._finish(command, SUPERSEDED, f"superseded by {urgent.name} #{urgent.id}")
+                else:
+                    self._finish(command, CANCELLED)
+            except Exception as e:
+                self._finish(command, FAILED, str(e))
+            finally:
+                self._running = None
+                self._running_task = None
@@ -0,0 +1,308 @@
+"""Vehicle link supervision: mavsdk_server lifecycle, reconnects, link metrics.
+
+``ConnectionSupervisor`` owns the connection of one ``DroneController``.
+It connects with exponential backoff and then watches three things:
+
+- the backend's ``core.connection_state()`` (vehicle heartbeats)
+- the age of the last telemetry sample
+- the managed mavsdk_server process, if any
+
+Losing the vehicle's heartbeat only waits for it to come back; the backend
+keeps listening. A dead mavsdk_server, a failed connection stream, or
+telemetry that stops while the vehicle still counts as connected are
+transport failures: the server is restarted and the backend rebuilt. In
+both cases the controller restarts its telemetry streams once the link is
+back, which re-applies the stream rates lost when an autopilot reboots.
+Every outage is timed from the last sample before it to the first sample
+after it.
+"""
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import time
+from collections import deque
+from typing import Callable
+
+DISCONNECTED, CONNECTING, CONNECTED, LINK_LOST, RECONNECTING = (
+    "disconnected", "connecting", "connected", "link_lost", "reconnecting")
+
+OUTAGE_HISTORY = 20
+
+
+def find_mavsdk_server() -> str | None:
+    """mavsdk_server binary: ./mavsdk_server, the one bundled with mavsdk, or PATH"""
+    candidates = [os.path.abspath("mavsdk_server")]
+    try:
+        import mavsdk
+        candidates.append(os.path.join(os.path.dirname(mavsdk.__file__), "bin", "mavsdk_server"))
+    except ImportError:
+        pass
+    for path in candidates:
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return shutil.which("mavsdk_server")
+
+
+def port_in_use(port: int, host: str = "127.0.0.1") -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.2)
+        return sock.connect_ex((host, port)) == 0
+
+
+class MavsdkServer:
+    """One mavsdk_server process, restarted on demand"""
+
+    def __init__(self, binary: str, port: int, system_address: str):
+        self.binary = binary
+        self.port = port
+        self.system_address = system_address
+        self.process: subprocess.Popen | None = None
+        self.starts = 0
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if self.running:
+            return
+        print(f"🛰️ Starting mavsdk_server on port {self.port} ({self.system_address})...")
+        self.process = subprocess.Popen([self.binary, "-p", str(self.port), self.system_address],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.starts += 1
+
+    def stop(self):
+        if self.running:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def stats(self) -> dict:
+        return {"pid": self.process.pid if self.running else None, "running": self.running,
+                "port": self.port, "starts": self.starts}
+
+
+class LinkStats:
+    """Telemetry sample rate and last-seen age; ``seen()`` is called per sample"""
+
+    def __init__(self):
+        self.samples = 0
+        self.last_seen = 0.0        # monotonic
+        self.rate = 0.0             # samples/s over the last full second
+        self._second = 0
+        self._count = 0
+
+    def seen(self):
+        now = time.monotonic()
+        self.samples += 1
+        self.last_seen = now
+        second = int(now)
+        if second != self._second:
+            self.rate = self._count if second == self._second + 1 else 0.0
+            self._second = second
+            self._count = 0
+        self._count += 1
+
+    @property
+    def age(self) -> float | None:
+        return time.monotonic() - self.last_seen if self.last_seen else None
+
+    def current_rate(self) -> float:
+        """``rate``, or 0 when nothing arrived in the last second"""
+        age = self.age
+        return self.rate if age is not None and age < 2.0 else 0.0
+
+
+class ConnectionSupervisor:
+    def __init__(self, controller, factory: Callable | None = None, server: MavsdkServer | None = None,
+                 connect_timeout: float = 30.0, stale_timeout: float = 5.0,
+                 backoff: tuple[float, float] = (0.5, 30.0)):
+        self.controller = controller
+        self.factory = factory      # builds a fresh backend object for a rebuild
+        self.server = server
+        self.connect_timeout = connect_timeout
+        self.stale_timeout = stale_timeout
+        self.backoff = backoff
+        self.link = LinkStats()
+        self.status = DISCONNECTED
+        self.connected = asyncio.Event()
+        self.attempts = 0
+        self.connects = 0
+        self.rebuilds = 0
+        self.last_error: str | None = None
+        self.outages: deque = deque(maxlen=OUTAGE_HISTORY)
+        self._vehicle_connected = False
+        self._watcher: asyncio.Task | None = None
+        self._outage: dict | None = None
+
+    # Connecting -------------------------------------------------------
+    def _set_status(self, status: str):
+        if status != self.status:
+            self.status = status
+            self.controller.state.set("health", status)
+
+    async def _connect_once(self) -> bool:
+        drone = self.controller.drone
+        if self.server:
+            self.server.start()
+        await asyncio.wait_for(drone.connect(system_address=self.controller.url), self.connect_timeout)
+        async def first_connected():
+            async for state in drone.core.connection_state():
+                if state.is_connected:
+                    return
+        await asyncio.wait_for(first_connected(), self.connect_timeout)
+        return True
+
+    async def connect(self):
+        """Connect, retrying with exponential backoff until it works"""
+        delay = self.backoff[0]
+        while True:
+            self.attempts += 1
+            self._set_status(CONNECTING if not self.connects else RECONNECTING)
+            try:
+                await self._connect_once()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"❌ Connection attempt {self.attempts} failed: {self.last_error}; "
+                      f"retrying in {delay:.1f} s")
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self.backoff[1])
+                if self.factory:
+                    self._rebuild()
+        self.connects += 1
+        self._vehicle_connected = True
+        if self._outage is None:
+            self._set_status(CONNECTED)
+        print("✅ Drone connected successfully!")
+        self._watcher = asyncio.get_running_loop().create_task(self._watch_connection_state())
+        if self._outage is None:
+            self.connected.set()
+
+    def _rebuild(self):
+        """New backend object (and mavsdk_server) after a transport failure"""
+        old = self.controller.drone
+        if hasattr(old, "close"):
+            old.close()
+        if self.server and not self.server.running:
+            self.server.restart()
+        self.controller.drone = self.factory()
+        self.rebuilds += 1
+
+    async def _watch_connection_state(self):
+        async for state in self.controller.drone.core.connection_state():
+            self._vehicle_connected = state.is_connected
+
+    # Supervision -----------------------------------------------------
+    def _transport_failure(self) -> str | None:
+        if self.server and not self.server.running:
+            return "mavsdk_server exited"
+        if self._watcher and self._watcher.done():
+            error = None if self._watcher.cancelled() else self._watcher.exception()
+            return f"connection stream ended ({error})" if error else "connection stream ended"
+        age = self.link.age
+        if self._vehicle_connected and self.controller.streaming and age is not None \
+                and age > self.stale_timeout:
+            return f"no telemetry for {age:.1f} s"
+        return None
+
+    def _lost(self, reason: str):
+        print(f"⚠️ Link lost: {reason}")
+        self.connected.clear()
+        self._outage = {
+            "reason": reason,
+            "time": time.time(),
+            "last_sample": self.link.last_seen,     # the link really went quiet here
+            "detected": time.monotonic(),
+            "restored": None,                       # when the streams were restarted
+        }
+        self._set_status(LINK_LOST)
+
+    def _recovered(self):
+        outage, self._outage = self._outage, None
+        self.outages.append({
+            "reason": outage["reason"],
+            "time": outage["time"],
+            # last sample before the outage to the first one after it
+            "outage_s": round(self.link.last_seen - outage["last_sample"], 3),
+            # from noticing the outage to telemetry flowing again
+            "recovery_s": round(time.monotonic() - outage["detected"], 3),
+        })
+        print(f"✅ Link recovered after {self.outages[-1]['outage_s']:.2f} s ({outage['reason']})")
+        self._set_status(CONNECTED)
+        self.connected.set()
+
+    async def run(self, poll: float = 0.25):
+        """Connect, then watch the link forever"""
+        await self.connect()
+        self.controller.restore_streams()
+        while True:
+            await asyncio.sleep(poll)
+            failure = self._transport_failure()
+            outage = self._outage
+            if outage is None:
+                if failure:
+                    self._lost(failure)
+                    await self._reconnect()
+                elif not self._vehicle_connected:
+                    self._lost("vehicle heartbeat lost")
+                continue
+
+            if failure and (outage["restored"] is None or "no telemetry" not in failure
+                            or time.monotonic() - outage["restored"] > self.stale_timeout):
+                outage["reason"] += f", then {failure}"
+                await self._reconnect()
+            elif self._vehicle_connected and self.link.last_seen > outage["last_sample"]:
+                self._recovered()
+            elif self._vehicle_connected and outage["restored"] is None:
+                # Heartbeats are back; the autopilot may have rebooted and
+                # forgotten the stream rates
+                self.controller.restore_streams()
+                outage["restored"] = time.monotonic()
+
+    async def _reconnect(self):
+        if not self.factory:
+            return  # nothing to rebuild; wait for the vehicle
+        self.controller.stop_streams()
+        if self._watcher:
+            self._watcher.cancel()
+        self._rebuild()
+        await self.connect()
+        self.controller.restore_streams()
+        self._outage["restored"] = time.monotonic()
+
+    def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+        if self.server:
+            self.server.stop()
+
+    def stats(self) -> dict:
+        age = self.link.age
+        recoveries = [o["recovery_s"] for o in self.outages]
+        return {
+            "status": self.status,
+            "vehicle_connected": self._vehicle_connected,
+            "message_rate": self.link.current_rate(),
+            "last_seen_age_s": round(age, 3) if age is not None else None,
+            "samples": self.link.samples,
+            "connects": self.connects,
+            "attempts": self.attempts,
+            "rebuilds": self.rebuilds,
+            "last_error": self.last_error,
+            "outages": list(self.outages),
+            "last_recovery_s": recoveries[-1] if recoveries else None,
+            "max_recovery_s": max(recoveries) if recoveries else None,
+            "server": self.server.stats() if self.server else None,
+        }
@@ -1,140 +1,142 @@
-import asyncio, random
-import subprocess
+import asyncio
+from typing import Callable, NamedTuple
 from mavsdk import System
 from mavsdk.offboard import PositionNedYaw, OffboardError
+from api.command_queue import DEFAULT_TIMEOUT, Command, CommandQueue
+from api.connection import ConnectionSupervisor, MavsdkServer
+from api.mission import MissionPlan
+from api.setpoint_scheduler import GeneratorTrajectory, SetpointScheduler, random_walk
+from api.telemetry_state import TelemetryState
+from api.telemetry_log import telemetry_log, telemetry_sampler
 
-class VideoStreamBridge:
-    def __init__(self):
-        self.process = None
-        self.is_running = False
-        
-    def start_stream_bridge(self):
-        """Start GStreamer bridge to convert UDP to HTTP stream"""
-        if self.is_running:
-            return
-            
-        try:
-            # Simplified approach: Direct UDP to MJPEG HTTP stream
-            gst_pipeline = [
-                'gst-launch-1.0', '-v',
-                'udpsrc', 'port=5600', 'caps=application/x-rtp,encoding-name=H264,payload=96',
-                '!', 'rtph264depay',
-                '!', 'h264parse',
-                '!', 'avdec_h264',
-                '!', 'videoconvert',
-                '!', 'videoscale',
-                '!', 'video/x-raw,width=640,height=480',
-                '!', 'jpegenc', 'quality=90',
-                '!', 'multipartmux', 'boundary=spionisto',
-                '!', 'tcpserversink', 'host=0.0.0.0', 'port=8080'
-            ]
-            
-            print("🎥 Starting simplified video stream bridge...")
-            self.process = subprocess.Popen(
-                gst_pipeline,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            # Give it a moment to start
-            import time
-            time.sleep(2)
-            
-            # Check if process is still running
-            if self.process.poll() is None:
-                self.is_running = True
-                print("✅ Video stream bridge started on port 8080")
-                return True
-            else:
-                stderr_output = self.process.stderr.read().decode()
-                print(f"❌ Video bridge failed: {stderr_output}")
-                self.is_running = False
-                return False
-                
-        except Exception as e:
-            print(f"❌ Failed to start video bridge: {e}")
-            self.is_running = False
-            return False
+# -----------------------------
+# Telemetry stream table
+# -----------------------------
+class TelemetryStream(NamedTuple):
+    topic: str                  # TelemetryState topic
+    source: str                 # mavsdk Telemetry subscription method
+    rate_setter: str | None     # mavsdk Telemetry set_rate_* method, if any
+    rate_hz: float              # requested autopilot rate
+    convert: Callable           # MAVSDK sample -> TelemetryState field values
+    icon: str = "📡"
+    essential: bool = False     # kept running even without subscribers
+
+
+def _position_values(pos):
+    return pos.latitude_deg, pos.longitude_deg, pos.absolute_altitude_m
+
+
+def _velocity_values(velocity):
+    return round(velocity.north_m_s, 2), round(velocity.east_m_s, 2), round(velocity.down_m_s, 2)
+
+
+def _battery_values(battery):
+    # MAVSDK doesn't provide temperature
+    return round(battery.remaining_percent, 1), round(battery.voltage_v, 2), 25.0
+
+
+def _attitude_values(attitude):
+    # Normalize heading to 0-360 degrees
+    heading = (attitude.yaw_deg + 360) % 360
+    return (round(attitude.roll_deg, 2), round(attitude.pitch_deg, 2),
+            round(attitude.yaw_deg, 2), round(heading, 1))
+
+
+def _gps_info_values(gps):
+    return gps.num_satellites, gps.fix_type.name
+
+
+def _vehicle_health_values(health):
+    return (health.is_gyrometer_calibration_ok, health.is_accelerometer_calibration_ok,
+            health.is_magnetometer_calibration_ok, health.is_local_position_ok,
+            health.is_global_position_ok, health.is_home_position_ok, health.is_armable)
+
+
+def _rc_status_values(rc):
+    return rc.is_available, round(rc.signal_strength_percent, 1)
+
+
+TELEMETRY_STREAMS = {stream.topic: stream for stream in (
+    TelemetryStream("position", "position", "set_rate_position", 10.0, _position_values, "📍"),
+    TelemetryStream("velocity", "velocity_ned", "set_rate_velocity_ned", 10.0, _velocity_values, "🏃"),
+    TelemetryStream("battery", "battery", "set_rate_battery", 1.0, _battery_values, "🔋"),
+    TelemetryStream("attitude", "attitude_euler", "set_rate_attitude_euler", 20.0, _attitude_values, "🧭"),
+    TelemetryStream("gps_info", "gps_info", "set_rate_gps_info", 1.0, _gps_info_values, "🛰️"),
+    TelemetryStream("flight_mode", "flight_mode", None, 0.0, lambda mode: (mode.name,), "✈️", essential=True),
+    TelemetryStream("armed", "armed", None, 0.0, lambda armed: (armed,), "🔧", essential=True),
+    TelemetryStream("vehicle_health", "health", None, 0.0, _vehicle_health_values, "🩺"),
+    TelemetryStream("home", "home", "set_rate_home", 0.5, _position_values, "🏠"),
+    TelemetryStream("rc_status", "rc_status", "set_rate_rc_status", 1.0, _rc_status_values, "🎮"),
+)}
+
+
+# -----------------------------
+# Ground commands
+# -----------------------------
+class VehicleCommand(NamedTuple):
+    name: str
+    action: str         # method of the mavsdk plugin
+    health: str         # health state once the vehicle accepted it
+    icon: str
+    progress: str
+    done: str
+    plugin: str = "action"
+
+
+VEHICLE_COMMANDS = {command.name: command for command in (
+    VehicleCommand("arm", "arm", "armed", "🔧", "Arming drone...", "Drone armed successfully"),
+    VehicleCommand("disarm", "disarm", "disarmed", "🔧", "Disarming drone...", "Drone disarmed successfully"),
+    VehicleCommand("takeoff", "takeoff", "taking_off", "🚁", "Taking off...", "Takeoff initiated"),
+    VehicleCommand("land", "land", "landing", "🛬", "Landing...", "Landing initiated"),
+    VehicleCommand("rtl", "return_to_launch", "rtl", "🏠", "Returning to launch...", "RTL initiated"),
+    VehicleCommand("mission_upload", "upload_mission", "mission_uploaded", "🗺️", "Uploading mission...",
+                   "Mission uploaded", plugin="mission"),
+    VehicleCommand("mission_start", "start_mission", "mission", "🗺️", "Starting mission...",
+                   "Mission started", plugin="mission"),
+    VehicleCommand("mission_pause", "pause_mission", "mission_paused", "⏸️", "Pausing mission...",
+                   "Mission paused", plugin="mission"),
+)}
 
-    def _start_direct_udp_bridge(self):
-        """Fallback: Direct UDP approach without multicast"""
-        try:
-            gst_pipeline = [
-                'gst-launch-1.0',
-                'udpsrc', 'port=5600',
-                '!', 'application/x-rtp,media=video,clock-rate=90000,encoding-name=H264,payload=96',
-                '!', 'rtph264depay',
-                '!', 'h264parse',
-                '!', 'avdec_h264',
-                '!', 'videoconvert',
-                '!', 'jpegenc', 'quality=80',
-                '!', 'multipartmux',
-                '!', 'tcpserversink', 'host=0.0.0.0', 'port=8080'
-            ]
-            
-            self.process = subprocess.Popen(
-                gst_pipeline,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            import time
-            time.sleep(1)
-            
-            if self.process.poll() is None:
-                self.is_running = True
-                print("✅ Video stream bridge started (direct UDP mode)")
-            else:
-                print("❌ Both video bridge approaches failed")
-                self.is_running = False
-                
-        except Exception as e:
-            print(f"❌ Direct UDP bridge failed: {e}")
-            self.is_running = False
 
 class DroneController:
-    def __init__(self, shared_state: dict,
+    def __init__(self, state: TelemetryState,
                  altitude: float = 20,
                  data_rate: float = 0.1,
-                 sim_url: str = "udp://:14540"):
-        self.shared     = shared_state
+                 sim_url: str = "udp://:14540",
+                 drone=None,
+                 drone_factory: Callable | None = None,
+                 server: MavsdkServer | None = None):
+        self.state      = state
         self.altitude   = altitude
         self.rate       = data_rate
         self.url        = sim_url
-        # Connect to the MAVSDK server
-        self.drone      = System(mavsdk_server_address='localhost', port=50051)
-        # Initialize video bridge
-        self.video_bridge = VideoStreamBridge()
+        # Connect to the MAVSDK server unless another backend is given
+        # (anything with the mavsdk.System API, see api/drone_handler.py).
+        # ``drone_factory`` lets the connection supervisor rebuild it.
+        if drone is None:
+            drone = drone_factory() if drone_factory else System(mavsdk_server_address='localhost', port=50051)
+        self.drone      = drone
+        self.connection = ConnectionSupervisor(self, drone_factory, server)
+        # Telemetry streams are started on demand, see update_streams()
+        self._telemetry_ready = False
+        self._wanted_streams: set[str] = set(TELEMETRY_STREAMS)
+        self._stream_tasks: dict[str, asyncio.Task] = {}
+        self._stream_rates: dict[str, float] = {}
+        # Called as listener(command, status, **details) for every ground command
+        self.command_listeners: list[Callable] = []
+        self.commands = CommandQueue(self._send_command, on_event=self._on_command)
+        self.mission: MissionPlan | None = None
+        # Offboard setpoints at a fixed cadence; wanders until given a trajectory
+        self.setpoints = SetpointScheduler(
+            self._send_setpoint, rate_hz=1.0 / data_rate,
+            trajectory=GeneratorTrajectory(random_walk(altitude), name="random_walk"))
 
-    async def _connect(self):
-        print("Connecting to drone via MAVSDK server...")
-        try:
-            await self.drone.connect(system_address=self.url)
-            print("Waiting for drone connection...")
-            
-            # Start video bridge when drone connects
-            self.video_bridge.start_stream_bridge()
-            
-            # Wait for connection with timeout
-            timeout = 30  # 30 seconds
-            start_time = asyncio.get_event_loop().time()
-            
-            async for state in self.drone.core.connection_state():
-                if state.is_connected:
-                    print("✅ Drone connected successfully!")
-                    self.shared["health"] = "connected"
-                    return True
-                    
-                # Check timeout
-                if asyncio.get_event_loop().time() - start_time > timeout:
-                    print("❌ Connection timeout")
-                    self.shared["health"] = "timeout"
-                    return False
-                    
-        except Exception as e:
-            print(f"Connection error: {e}")
-            self.shared["health"] = "error"
-            return False
+    def _command_event(self, command: str, status: str, **details):
+        for listener in self.command_listeners:
+            try:
+                listener(command, status, **details)
+            except Exception as e:
+                print(f"❌ Command listener error ({command}): {e}")
 
     async def _arm_and_takeoff(self):
         print("Arming and taking off...")
@@ -142,11 +144,11 @@ class DroneController:
             await self.drone.action.arm()
             await self.drone.action.takeoff()
             await asyncio.sleep(4)
-            self.shared["health"] = "flying"
+            self.state.set("health", "flying")
             return True
         except Exception as e:
             print(f"Takeoff error: {e}")
-            self.shared["health"] = "takeoff_error"
+            self.state.set("health", "takeoff_error")
             return False
 
     async def _enable_offboard(self):
@@ -156,123 +158,118 @@ class DroneController:
                 PositionNedYaw(0, 0, -self.altitude, 0)
             )
             await self.drone.offboard.start()
-            self.shared["health"] = "offboard"
+            self.state.set("health", "offboard")
             print("✅ Offboard mode enabled")
             return True
         except OffboardError as err:
             print("❌ Offboard error:", err)
-            self.shared["health"] = "offboard_error"
+            self.state.set("health", "offboard_error")
             return False
 
+    def _telemetry_wanted(self) -> set[str]:
+        return self._wanted_streams | {s.topic for s in TELEMETRY_STREAMS.values() if s.essential}
+
     async def _telemetry_loop(self):
-        """Collect all telemetry data and update shared state"""
-        print("🔄 Starting telemetry collection...")
-        
-        # Start telemetry tasks and handle exceptions
-        tasks = [
-            asyncio.create_task(self._position_telemetry()),
-            asyncio.create_task(self._velocity_telemetry()),
-            asyncio.create_task(self._battery_telemetry()),
-            asyncio.create_task(self._attitude_telemetry()),
-        ]
-        
-        try:
-            await asyncio.gather(*tasks, return_exceptions=True)
-        except Exception as e:
-            print(f"Telemetry loop error: {e}")
+        """Start the telemetry streams that currently have subscribers"""
+        telemetry_log.info("🔄 Starting telemetry collection...")
+        self._telemetry_ready = True
+        self.update_streams(self._wanted_streams)
 
-    async def _position_telemetry(self):
-        """Monitor position data"""
-        try:
-            print("📍 Starting position telemetry...")
-            async for pos in self.drone.telemetry.position():
-                self.shared["position"] = {
-                    "lat": pos.latitude_deg,
-                    "lon": pos.longitude_deg,
-                    "abs_alt": pos.absolute_altitude_m,
-                }
-                print(f"📍 Position updated: {self.shared['position']}")
-                print(f"Position: {pos.latitude_deg:.6f}, {pos.longitude_deg:.6f}")
-        except Exception as e:
-            print(f"Position telemetry error: {e}")
+    @property
+    def streaming(self) -> bool:
+        return bool(self._stream_tasks)
 
-    async def _velocity_telemetry(self):
-        """Monitor velocity data and update shared state"""
-        try:
-            print("🏃 Starting velocity telemetry...")
-            async for velocity in self.drone.telemetry.velocity_ned():
-                self.shared["velocity"] = {
-                    "x": round(velocity.north_m_s, 2),
-                    "y": round(velocity.east_m_s, 2), 
-                    "z": round(velocity.down_m_s, 2)
-                }
-                print(f"✅ Velocity updated: {self.shared['velocity']}")
-        except Exception as e:
-            print(f"❌ Velocity telemetry error: {e}")
+    def is_streaming(self, topic: str) -> bool:
+        return topic in self._stream_tasks
 
-    async def _battery_telemetry(self):
-        """Monitor battery data and update shared state"""
+    def stop_streams(self):
+        for task in self._stream_tasks.values():
+            task.cancel()
+        self._stream_tasks.clear()
+
+    def restore_streams(self):
+        """(Re)start every wanted stream, e.g. after a reconnect; re-applies the rates"""
+        self.stop_streams()
+        self._telemetry_ready = True
+        self.update_streams(self._wanted_streams)
+
+    def update_streams(self, topics):
+        """Run exactly the streams for ``topics`` (plus the essential ones)"""
+        self._wanted_streams = {t for t in topics if t in TELEMETRY_STREAMS}
+        if not self._telemetry_ready:
+            return
+        wanted = self._telemetry_wanted()
+        for topic in list(self._stream_tasks):
+            if topic not in wanted:
+                self._stream_tasks.pop(topic).cancel()
+                telemetry_log.info("⏹ Stopped %s telemetry (no subscribers)", topic)
+        for topic in wanted:
+            if topic not in self._stream_tasks:
+                stream = TELEMETRY_STREAMS[topic]
+                self._stream_tasks[topic] = asyncio.create_task(self._stream_telemetry(stream))
+
+    async def set_stream_rate(self, topic: str, rate_hz: float) -> bool:
+        """Change the autopilot rate of a stream through MAVSDK ``set_rate_*``"""
+        stream = TELEMETRY_STREAMS[topic]
+        self._stream_rates[topic] = rate_hz
+        if not stream.rate_setter or topic not in self._stream_tasks:
+            return False
         try:
-            print("🔋 Starting battery telemetry...")
-            async for battery in self.drone.telemetry.battery():
-                self.shared["battery"] = {
-                    "level": round(battery.remaining_percent, 1),
-                    "voltage": round(battery.voltage_v, 2),
-                    "temperature": 25.0  # MAVSDK doesn't provide temperature
-                }
-                print(f"✅ Battery updated: {self.shared['battery']}")
+            await getattr(self.drone.telemetry, stream.rate_setter)(rate_hz)
+            return True
         except Exception as e:
-            print(f"❌ Battery telemetry error: {e}")
+            telemetry_log.error("❌ Could not set %s rate: %s", topic, e)
+            return False
+
+    def stream_status(self) -> list[dict]:
+        return [
+            {
+                "topic": stream.topic,
+                "running": stream.topic in self._stream_tasks,
+                "essential": stream.essential,
+                "rate_hz": self._stream_rates.get(stream.topic, stream.rate_hz) if stream.rate_setter else None,
+            }
+            for stream in TELEMETRY_STREAMS.values()
+        ]
 
-    async def _attitude_telemetry(self):
-        """Monitor attitude data and update shared state"""
+    async def _stream_telemetry(self, stream: TelemetryStream):
+        """Copy one MAVSDK telemetry stream into the state store"""
         try:
-            print("🧭 Starting attitude telemetry...")
-            async for attitude in self.drone.telemetry.attitude_euler():
-                # Read euler angles in degrees
-                roll_deg = attitude.roll_deg
-                pitch_deg = attitude.pitch_deg
-                yaw_deg = attitude.yaw_deg
-                # Normalize heading to 0-360 degrees
-                heading = (yaw_deg + 360) % 360
-                # Update shared state
-                self.shared["attitude"] = {
-                    "roll": round(roll_deg, 2),
-                    "pitch": round(pitch_deg, 2),
-                    "yaw": round(yaw_deg, 2),
-                    "heading": round(heading, 1)
-                }
-                print(f"🧭 Attitude updated: {self.shared['attitude']}")
+            telemetry_log.info("%s Starting %s telemetry...", stream.icon, stream.topic)
+            if stream.rate_setter:
+                rate_hz = self._stream_rates.get(stream.topic, stream.rate_hz)
+                try:
+                    await getattr(self.drone.telemetry, stream.rate_setter)(rate_hz)
+                except Exception as e:
+                    telemetry_log.warning("⚠️ Could not set %s rate: %s", stream.topic, e)
+            record = self.state.record(stream.topic)
+            convert = stream.convert
+            seen = self.connection.link.seen
+            async for sample in getattr(self.drone.telemetry, stream.source)():
+                seen()
+                self.state.update(stream.topic, *convert(sample))
+                telemetry_sampler.log(stream.topic, "%s %s updated: %s", stream.icon, stream.topic, record)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"❌ Attitude telemetry error: {e}")
+            telemetry_log.error("❌ %s telemetry error: %s", stream.topic, e)
+        finally:
+            if self._stream_tasks.get(stream.topic) is asyncio.current_task():
+                del self._stream_tasks[stream.topic]
 
-    async def _mission_loop(self):
-        print("🚁 Starting mission loop...")
-        nx = ex = 0.0
-        while True:
-            try:
-                nx += random.uniform(-1.5, 1.5)
-                ex += random.uniform(-1.5, 1.5)
-                yaw = (math.degrees(math.atan2(ex, nx)) + 360) % 360
-                await self.drone.offboard.set_position_ned(
-                    PositionNedYaw(nx, ex, -self.altitude, yaw)
-                )
-                await asyncio.sleep(self.rate)
-            except Exception as e:
-                print(f"Mission loop error: {e}")
-                await asyncio.sleep(1)
+    async def _send_setpoint(self, setpoint):
+        await self.drone.offboard.set_position_ned(PositionNedYaw(*setpoint))
 
     async def run(self):
         print("🚀 Starting DroneController...")
         try:
-            # Connect to drone
-            if not await self._connect():
-                print("❌ Failed to connect to drone")
-                return
-                
-            # Start telemetry immediately after connection
+            # Connect (retrying with backoff) and keep the link up; the
+            # supervisor starts telemetry on every (re)connect
+            print("Connecting to drone...")
+            link_task = asyncio.create_task(self.connection.run())
+            await self.connection.connected.wait()
+
             print("📡 Starting telemetry collection...")
-            telemetry_task = asyncio.create_task(self._telemetry_loop())
             
             # Give telemetry a moment to start
             await asyncio.sleep(2)
@@ -287,77 +284,72 @@ class DroneController:
                 print("❌ Failed to enable offboard mode")
                 return
             
-            # Run mission loop alongside telemetry
-            mission_task = asyncio.create_task(self._mission_loop())
+            # Stream offboard setpoints alongside telemetry
+            mission_task = self.setpoints.start()
             
             # Wait for both tasks
-            await asyncio.gather(telemetry_task, mission_task, return_exceptions=True)
+            await asyncio.gather(link_task, mission_task, return_exceptions=True)
             
         except Exception as e:
             print(f"❌ DroneController error: {e}")
-            self.shared["health"] = "error"
+            self.state.set("health", "error")
 
-    async def arm_drone(self):
-        """Arm the drone"""
+    # Ground commands ---------------------------------------------
+    async def _send_command(self, name: str, *args) -> bool:
+        """Send one command and wait for the vehicle; run by the command queue"""
+        command = VEHICLE_COMMANDS[name]
         try:
-            print("🔧 Arming drone...")
-            await self.drone.action.arm()
-            self.shared["health"] = "armed"
-            print("✅ Drone armed successfully")
+            print(f"{command.icon} {command.progress}")
+            plugin = getattr(self.drone, command.plugin, None)
+            if plugin is None:
+                raise RuntimeError(f"{type(self.drone).__name__} has no {command.plugin} plugin")
+            await getattr(plugin, command.action)(*args)
+            self.state.set("health", command.health)
+            print(f"✅ {command.done}")
             return True
         except Exception as e:
-            print(f"❌ Arm error: {e}")
-            self.shared["health"] = "arm_error"
-            return False
+            print(f"❌ {name} error: {e}")
+            self.state.set("health", f"{name}_error")
+            raise
+
+    def _on_command(self, command: Command):
+        details = {"id": command.id}
+        if command.error:
+            details["error"] = command.error
+        self._command_event(command.name, command.status, **details)
+
+    def submit_command(self, name: str) -> Command:
+        """Queue a command and return at once; progress goes to ``command_listeners``"""
+        return self.commands.submit(name)
+
+    def upload_mission(self, plan: MissionPlan) -> Command:
+        """Keep ``plan`` as the current mission and queue its upload"""
+        self.mission = plan
+        # About 20 ms per item on a good link, plus retries
+        return self.commands.submit("mission_upload", plan.to_mavsdk(),
+                                    timeout=max(DEFAULT_TIMEOUT, 0.05 * len(plan)))
+
+    def fly_mission_offboard(self, plan: MissionPlan):
+        """Fly ``plan`` with offboard setpoints instead of the mission plugin"""
+        self.mission = plan
+        self.setpoints.set_trajectory(plan.trajectory())
+
+    async def arm_drone(self):
+        """Arm the drone"""
+        return await self.submit_command("arm").wait()
 
     async def disarm_drone(self):
         """Disarm the drone"""
-        try:
-            print("🔧 Disarming drone...")
-            await self.drone.action.disarm()
-            self.shared["health"] = "disarmed"
-            print("✅ Drone disarmed successfully")
-            return True
-        except Exception as e:
-            print(f"❌ Disarm error: {e}")
-            self.shared["health"] = "disarm_error"
-            return False
+        return await self.submit_command("disarm").wait()
 
     async def takeoff_drone(self):
         """Takeoff the drone"""
-        try:
-            print("🚁 Taking off...")
-            await self.drone.action.takeoff()
-            self.shared["health"] = "taking_off"
-            print("✅ Takeoff initiated")
-            return True
-        except Exception as e:
-            print(f"❌ Takeoff error: {e}")
-            self.shared["health"] = "takeoff_error"
-            return False
+        return await self.submit_command("takeoff").wait()
 
     async def land_drone(self):
         """Land the drone"""
-        try:
-            print("🛬 Landing...")
-            await self.drone.action.land()
-            self.shared["health"] = "landing"
-            print("✅ Landing initiated")
-            return True
-        except Exception as e:
-            print(f"❌ Land error: {e}")
-            self.shared["health"] = "land_error"
-            return False
+        return await self.submit_command("land").wait()
 
     async def return_to_launch(self):
         """Return to launch position"""
-        try:
-            print("🏠 Returning to launch...")
-            await self.drone.action.return_to_launch()
-            self.shared["health"] = "rtl"
-            print("✅ RTL initiated")
-            return True
-        except Exception as e:
-            print(f"❌ RTL error: {e}")
-            self.shared["health"] = "rtl_error"
-            return False
\ No newline at end of file
+        return await self.submit_command("rtl").wait()
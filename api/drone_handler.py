@@ -1,27 +1,67 @@
-import random
-import asyncio
-
-# Shared state imported by `index.py`
-drone_data = {
-    "velocity": {"x": 0, "y": 0, "z": 0},
-    "battery": {"level": 100, "voltage": 12.4, "temperature": 25},
-    "camera": {"last_frame": None, "timestamp": None},
-}
-
-async def mock_drone_data():
-    """Generate mock drone data for testing."""
-    while True:
-        drone_data["velocity"] = {
-            "x": random.uniform(-5, 5),
-            "y": random.uniform(-5, 5),
-            "z": random.uniform(0, 2),
-        }
-        drone_data["battery"] = {
-            "level": max(0, drone_data["battery"]["level"] - 0.1),
-            "voltage": 12.0 + random.uniform(-0.5, 0.5),
-            "temperature": 25 + random.uniform(0, 5),
-        }
-        await asyncio.sleep(1)
-
-# NB 👍: This file retained only mock data generation and shared state to avoid duplicate API routes.
-# API routes are now defined in `index.py` using FastAPI.
\ No newline at end of file
+import os
+from mavsdk import System
+from api.connection import MavsdkServer, find_mavsdk_server, port_in_use
+from api.mavlink_backend import MavlinkSystem
+from api.simulator import KinematicSimulator, SimulatedSystem
+
+# Drone backends for DroneController. All expose the mavsdk.System API:
+#   mavsdk  - a real vehicle (or SITL) through mavsdk_server
+#   mavlink - MAVLink straight from UDP, no mavsdk_server in between
+#   sim     - the built-in kinematic simulator, no PX4/mavsdk_server needed
+BACKENDS = ("mavsdk", "mavlink", "sim")
+MAVLINK_BASE_PORT = 14540  # PX4 SITL instance i sends to 14540 + i
+
+_simulator: KinematicSimulator | None = None
+
+
+def get_simulator() -> KinematicSimulator:
+    """Shared simulator, configured from CONTROL_STATION_SIM_* on first use"""
+    global _simulator
+    if _simulator is None:
+        _simulator = KinematicSimulator(
+            vehicles=int(os.environ.get("CONTROL_STATION_SIM_VEHICLES", "1")),
+            seed=int(os.environ.get("CONTROL_STATION_SIM_SEED", "0")),
+            physics_hz=float(os.environ.get("CONTROL_STATION_SIM_PHYSICS_HZ", "200")),
+        )
+    return _simulator
+
+
+def create_drone(backend: str | None = None, vehicle: int = 0, port: int = 50051):
+    """Backend object for ``DroneController(drone=...)``.
+
+    ``backend`` defaults to CONTROL_STATION_BACKEND (``mavsdk``).
+    """
+    backend = backend or os.environ.get("CONTROL_STATION_BACKEND", "mavsdk")
+    if backend == "mavsdk":
+        return System(mavsdk_server_address='localhost', port=port)
+    if backend == "mavlink":
+        base = int(os.environ.get("CONTROL_STATION_MAVLINK_PORT", MAVLINK_BASE_PORT))
+        return MavlinkSystem(f"udp://:{base + vehicle}")
+    if backend == "sim":
+        return SimulatedSystem(get_simulator(), vehicle)
+    raise ValueError(f"Unknown drone backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+
+def create_mavsdk_server(backend: str | None = None, vehicle: int = 0, port: int = 50051) -> MavsdkServer | None:
+    """mavsdk_server for the ``mavsdk`` backend that the station starts and restarts.
+
+    CONTROL_STATION_MAVSDK_SERVER is ``auto`` (default: manage one unless
+    something already listens on ``port``), ``external`` (never), or the
+    path of the binary.
+    """
+    backend = backend or os.environ.get("CONTROL_STATION_BACKEND", "mavsdk")
+    mode = os.environ.get("CONTROL_STATION_MAVSDK_SERVER", "auto")
+    if backend != "mavsdk" or mode == "external":
+        return None
+    if mode == "auto":
+        if port_in_use(port):
+            print(f"🔗 Using the mavsdk_server already listening on port {port}")
+            return None
+        binary = find_mavsdk_server()
+        if binary is None:
+            print("⚠️ mavsdk_server not found; start it yourself or set CONTROL_STATION_MAVSDK_SERVER")
+            return None
+    else:
+        binary = mode
+    base = int(os.environ.get("CONTROL_STATION_MAVLINK_PORT", MAVLINK_BASE_PORT))
+    return MavsdkServer(binary, port, f"udp://:{base + vehicle}")
@@ -0,0 +1,315 @@
+"""Append-only flight recorder.
+
+File layout (``.cvfl``)::
+
+    header  := b"CVFL" version:u16 reserved:u16 created:f64
+    chunk   := b"CHNK" count:u32 t_first:f64 t_last:f64 raw_len:u32 size:u32 crc32:u32
+               zlib(record*)
+    record  := t:f64 kind:u8 encoding:u8 topic_len:u8 payload_len:u32 topic payload
+
+Records are grouped into zlib-compressed chunks. After each chunk is written,
+a fixed-size entry ``offset:u64 t_first:f64 t_last:f64 count:u32`` is appended
+to the ``.idx`` sidecar. Seeking to a time is therefore a binary search over
+the index followed by reading a single chunk. If the sidecar is missing or
+truncated (e.g. after a crash), it is rebuilt by walking the chunk headers.
+
+Numeric telemetry payloads are the raw float64 field values. The field names
+are stored once per file in a ``KIND_SCHEMA`` record. Everything else is
+compact JSON.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b"CVFL"
+VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+
+KIND_SCHEMA = 0
+KIND_TELEMETRY = 1
+KIND_COMMAND = 2
+KIND_EVENT = 3
+
+ENC_F64 = 0
+ENC_JSON = 1
+
+# Records waiting for the writer thread; beyond this they are dropped and counted
+RECORDER_QUEUE = 1 << 16
+
+_FILE_HEADER = struct.Struct("<4sHHd")
+_CHUNK_HEADER = struct.Struct("<4sIddIII")
+_RECORD = struct.Struct("<dBBBI")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("t_first", "<f8"), ("t_last", "<f8"), ("count", "<u4")])
+
+_STOP = object()
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FlightRecorder:
+    """Background writer for telemetry and command events.
+
+    ``telemetry`` and ``command`` only put a small tuple on a bounded queue,
+    so the event loop never waits on disk; if the disk falls behind, records
+    are dropped and counted. A writer thread encodes the records,
+    compresses them into chunks and appends the chunks to the log.
+    """
+
+    def __init__(self, directory: str = "flight_logs", schema: dict | None = None,
+                 chunk_bytes: int = 256 * 1024, chunk_seconds: float = 1.0):
+        self.directory = directory
+        self.schema = schema or {}
+        self.chunk_bytes = chunk_bytes
+        self.chunk_seconds = chunk_seconds
+        self.path: str | None = None
+        self.records = 0
+        self.chunks = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=RECORDER_QUEUE)
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def schema_for(state) -> dict:
+        """Field names per topic of a ``TelemetryState`` (None for scalars)"""
+        return {topic: None if record.scalar else list(record.fields)
+                for topic, record in state.records.items()}
+
+    @property
+    def topics(self) -> set[str]:
+        """Topics a flight log follows while the vehicle is flying"""
+        return set(self.schema)
+
+    # Producer side (event loop) ---------------------------------------
+    def start(self):
+        if self._thread:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+        self.path = os.path.join(self.directory, f"flight_{stamp}.cvfl")
+        self._thread = threading.Thread(target=self._writer, name="flight-recorder", daemon=True)
+        self._thread.start()
+        self._queue.put((time.time(), KIND_SCHEMA, "schema", self.schema))
+        print(f"📼 Flight recorder writing to {self.path}")
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def telemetry(self, topic: str, record):
+        """``TelemetryState`` listener"""
+        values = record.values
+        # Copy now: records are updated in place by the next sample
+        payload = values.tobytes() if isinstance(values, array) else list(values)
+        self._put((record.timestamp, KIND_TELEMETRY, topic, payload))
+
+    def command(self, name: str, status: str, **details):
+        self._put((time.time(), KIND_COMMAND, name, {"status": status, **details}))
+
+    def event(self, name: str, **details):
+        self._put((time.time(), KIND_EVENT, name, details))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "recording": self._thread is not None,
+            "records": self.records,
+            "chunks": self.chunks,
+            "bytes": self.bytes_written,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    # Writer thread ----------------------------------------------------
+    def _writer(self):
+        with open(self.path, "ab") as log, open(self.path + ".idx", "ab") as index:
+            log.write(_FILE_HEADER.pack(MAGIC, VERSION, 0, time.time()))
+            self.bytes_written = log.tell()
+            buffer = bytearray()
+            count = 0
+            t_first = t_last = 0.0
+            deadline = None
+            running = True
+            while running:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    running = False
+                elif item is not None:
+                    t, kind, topic, payload = item
+                    if isinstance(payload, bytes):
+                        encoding, body = ENC_F64, payload
+                    else:
+                        encoding, body = ENC_JSON, _json(payload)
+                    name = topic.encode("utf-8")[:255]
+                    buffer += _RECORD.pack(t, kind, encoding, len(name), len(body))
+                    buffer += name
+                    buffer += body
+                    if count == 0:
+                        t_first = t
+                        deadline = time.monotonic() + self.chunk_seconds
+                    t_last = max(t_last, t)
+                    count += 1
+                if count and (not running or len(buffer) >= self.chunk_bytes
+                              or time.monotonic() >= deadline):
+                    self._write_chunk(log, index, buffer, count, t_first, t_last)
+                    buffer = bytearray()
+                    count = 0
+                    t_last = 0.0
+                    deadline = None
+
+    def _write_chunk(self, log, index, raw: bytearray, count: int, t_first: float, t_last: float):
+        body = zlib.compress(bytes(raw), 6)
+        offset = log.tell()
+        log.write(_CHUNK_HEADER.pack(CHUNK_MAGIC, count, t_first, t_last,
+                                     len(raw), len(body), zlib.crc32(body)))
+        log.write(body)
+        log.flush()
+        index.write(np.array([(offset, t_first, t_last, count)], dtype=INDEX_DTYPE).tobytes())
+        index.flush()
+        self.records += count
+        self.chunks += 1
+        self.bytes_written = log.tell()
+
+
+class FlightLogReader:
+    """Random-access reader for ``.cvfl`` flight logs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        magic, version, _, self.created = _FILE_HEADER.unpack(self._file.read(_FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a flight log")
+        if version != VERSION:
+            raise ValueError(f"Unsupported flight log version {version}")
+        self.index = self._load_index()
+        self.schema = {}
+        if len(self.index):
+            for _, kind, _, value in self._chunk_records(0):
+                if kind == KIND_SCHEMA:
+                    self.schema = value
+                    break
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def start_time(self) -> float:
+        return float(self.index["t_first"][0]) if len(self.index) else self.created
+
+    @property
+    def end_time(self) -> float:
+        return float(self.index["t_last"].max()) if len(self.index) else self.created
+
+    def _load_index(self) -> np.ndarray:
+        size = os.path.getsize(self.path)
+        idx_path = self.path + ".idx"
+        if os.path.exists(idx_path):
+            index = np.fromfile(idx_path, dtype=INDEX_DTYPE)
+            end = _FILE_HEADER.size
+            if len(index):
+                last = index[-1]
+                self._file.seek(int(last["offset"]))
+                header = self._file.read(_CHUNK_HEADER.size)
+                end = int(last["offset"]) + _CHUNK_HEADER.size + _CHUNK_HEADER.unpack(header)[5]
+            if end == size:
+                return index
+        return self._scan_index(size)
+
+    def _scan_index(self, size: int) -> np.ndarray:
+        """Rebuild the chunk index by hopping over the chunk headers"""
+        entries = []
+        offset = _FILE_HEADER.size
+        while offset + _CHUNK_HEADER.size <= size:
+            self._file.seek(offset)
+            magic, count, t_first, t_last, _, body_len, _ = _CHUNK_HEADER.unpack(
+                self._file.read(_CHUNK_HEADER.size))
+            if magic != CHUNK_MAGIC or offset + _CHUNK_HEADER.size + body_len > size:
+                break  # torn final chunk
+            entries.append((offset, t_first, t_last, count))
+            offset += _CHUNK_HEADER.size + body_len
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def _chunk_records(self, chunk: int):
+        self._file.seek(int(self.index["offset"][chunk]))
+        magic, count, _, _, raw_len, body_len, crc = _CHUNK_HEADER.unpack(
+            self._file.read(_CHUNK_HEADER.size))
+        body = self._file.read(body_len)
+        if zlib.crc32(body) != crc:
+            raise ValueError(f"Corrupt chunk {chunk} in {self.path}")
+        raw = memoryview(zlib.decompress(body))
+        offset = 0
+        for _ in range(count):
+            t, kind, encoding, name_len, body_len = _RECORD.unpack_from(raw, offset)
+            offset += _RECORD.size
+            topic = bytes(raw[offset:offset + name_len]).decode("utf-8")
+            offset += name_len
+            payload = raw[offset:offset + body_len]
+            offset += body_len
+            if encoding == ENC_F64:
+                value = np.frombuffer(payload, dtype="<f8").tolist()
+            else:
+                value = json.loads(bytes(payload))
+            if kind == KIND_TELEMETRY:
+                value = self._sample(topic, value)
+            yield t, kind, topic, value
+
+    def _sample(self, topic: str, values: list):
+        """Field values -> the dict (or scalar) the API serves"""
+        if topic not in self.schema:
+            return values
+        fields = self.schema[topic]
+        if fields is None:
+            return values[0]
+        return dict(zip(fields, values))
+
+    def read_chunk(self, chunk: int) -> list:
+        """All records of one chunk; cheap enough to run in a worker thread"""
+        return list(self._chunk_records(chunk))
+
+    def find_chunk(self, t: float) -> int:
+        """Index of the first chunk that may contain samples at or after ``t``"""
+        return int(np.searchsorted(self.index["t_last"], t, side="left"))
+
+    def records(self, since: float | None = None, until: float | None = None, kinds=None):
+        """Yield ``(t, kind, topic, value)`` in file order within a time window"""
+        first = 0 if since is None else self.find_chunk(since)
+        for chunk in range(first, len(self.index)):
+            if until is not None and self.index["t_first"][chunk] > until:
+                break
+            for t, kind, topic, value in self._chunk_records(chunk):
+                if since is not None and t < since:
+                    continue
+                if until is not None and t > until:
+                    continue
+                if kinds is None or kind in kinds:
+                    yield t, kind, topic, value
@@ -0,0 +1,257 @@
+"""Shared-memory ring of decoded video frames, written by ``video_hub.py``.
+
+The hub writes every decoded BGR frame into a ring of slots in a
+``multiprocessing.shared_memory`` segment:
+
+    header | slot table | consumer table | slot 0 | slot 1 | ...
+
+Readers keep their own cursor and get numpy views straight into the ring,
+so attaching costs no decoding and no copies. The writer never waits for
+readers: a reader that falls more than a ring behind skips ahead and counts
+the frames it missed. Each slot carries a sequence number that is cleared
+while the slot is being rewritten, so a reader can check afterwards that a
+view it used was not overwritten underneath it.
+
+Only numpy is needed, so the viewers and the API's MJPEG output attach
+without pulling in the decoder.
+"""
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_NAME = "control_station_video"
+DEFAULT_SLOTS = 8
+MAX_CONSUMERS = 16
+MAGIC = b"CVHB"
+VERSION = 2
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"), ("version", "<u4"), ("slots", "<u4"), ("max_consumers", "<u4"),
+    ("slot_bytes", "<u8"), ("write_seq", "<u8"), ("writer_pid", "<u4"), ("decoded", "<u4"),
+    ("started", "<f8"),
+])
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"),             # 0 while the slot is being written
+    ("width", "<u4"), ("height", "<u4"),
+    ("received", "<f8"),        # time.monotonic() the frame's last RTP packet arrived
+    ("decoded", "<f8"),         # time.monotonic() it was written
+    ("rtp_timestamp", "<u8"),
+    ("captured", "<f8"),        # sender's time.time() at capture (RTCP), 0 if unknown
+])
+CONSUMER_DTYPE = np.dtype([
+    ("pid", "<u4"), ("pad", "<u4"), ("cursor", "<u8"), ("read", "<u8"), ("dropped", "<u8"),
+    ("last_read", "<f8"),
+])
+
+
+def _align(n: int, to: int = 4096) -> int:
+    return (n + to - 1) // to * to
+
+
+class RingLayout:
+    """Numpy views of the header, slot table, consumer table and slot data"""
+
+    def __init__(self, buf, slots: int, slot_bytes: int):
+        offset = 0
+        self.header = np.ndarray((), HEADER_DTYPE, buf, offset)
+        offset += _align(HEADER_DTYPE.itemsize, 64)
+        self.slots = np.ndarray((slots,), SLOT_DTYPE, buf, offset)
+        offset += _align(SLOT_DTYPE.itemsize * slots, 64)
+        self.consumers = np.ndarray((MAX_CONSUMERS,), CONSUMER_DTYPE, buf, offset)
+        offset = _align(offset + CONSUMER_DTYPE.itemsize * MAX_CONSUMERS)
+        self.data = np.ndarray((slots, slot_bytes), np.uint8, buf, offset)
+
+    @staticmethod
+    def size(slots: int, slot_bytes: int) -> int:
+        meta = (_align(HEADER_DTYPE.itemsize, 64) + _align(SLOT_DTYPE.itemsize * slots, 64)
+                + CONSUMER_DTYPE.itemsize * MAX_CONSUMERS)
+        return _align(meta) + slots * slot_bytes
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class FrameRingWriter:
+    """The hub's side of the ring; frames up to ``max_width`` x ``max_height`` BGR"""
+
+    def __init__(self, name: str = DEFAULT_NAME, slots: int = DEFAULT_SLOTS,
+                 max_width: int = 1920, max_height: int = 1080):
+        slot_bytes = _align(max_width * max_height * 3)
+        size = RingLayout.size(slots, slot_bytes)
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            old = shared_memory.SharedMemory(name)
+            pid = int(np.ndarray((), HEADER_DTYPE, old.buf)["writer_pid"])
+            old.close()
+            if pid and pid != os.getpid() and _alive(pid):
+                raise RuntimeError(f"video hub already running (pid {pid})")
+            print(f"🧹 Removing stale video hub segment {name}")
+            shared_memory.SharedMemory(name).unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.layout = RingLayout(self.shm.buf, slots, slot_bytes)
+        self.layout.slots[:] = 0
+        self.layout.consumers[:] = 0
+        header = self.layout.header
+        header["magic"], header["version"], header["slots"] = MAGIC, VERSION, slots
+        header["max_consumers"], header["slot_bytes"] = MAX_CONSUMERS, slot_bytes
+        header["write_seq"], header["writer_pid"], header["started"] = 0, os.getpid(), time.time()
+        self.seq = 0
+
+    def slot(self, width: int, height: int) -> tuple[int, np.ndarray]:
+        """Claim the next slot; returns its sequence number and an ``(h, w, 3)`` view to fill"""
+        if width * height * 3 > self.layout.data.shape[1]:
+            raise ValueError(f"{width}x{height} frame does not fit the hub's slots")
+        seq = self.seq + 1
+        meta = self.layout.slots[seq % len(self.layout.slots)]
+        meta["seq"] = 0
+        view = self.layout.data[seq % len(self.layout.slots), :width * height * 3].reshape(height, width, 3)
+        return seq, view
+
+    def publish(self, seq: int, width: int, height: int, received: float, rtp_timestamp: int = 0,
+                captured: float = 0.0):
+        """Make the slot filled after ``slot()`` visible to readers"""
+        meta = self.layout.slots[seq % len(self.layout.slots)]
+        meta["width"], meta["height"] = width, height
+        meta["received"], meta["decoded"], meta["rtp_timestamp"] = received, time.monotonic(), rtp_timestamp
+        meta["captured"] = captured
+        meta["seq"] = seq
+        self.layout.header["write_seq"] = seq
+        self.seq = seq
+
+    def close(self):
+        self.layout = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class HubFrame(NamedTuple):
+    seq: int
+    image: np.ndarray           # view into the ring unless read with copy=True
+    received: float             # time.monotonic() the last RTP packet arrived
+    decoded: float              # time.monotonic() the hub finished writing it
+    rtp_timestamp: int
+    captured: float             # sender's wall clock at capture, 0.0 without RTCP
+    meta: np.ndarray            # the slot's table entry, for valid()
+
+    def valid(self) -> bool:
+        """False if the hub has started overwriting this frame's slot"""
+        return int(self.meta["seq"]) == self.seq
+
+
+class FrameRingReader:
+    """One consumer of the ring, with its own cursor"""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name)
+        # Attaching registers the segment with this process's resource
+        # tracker, which would unlink it when we exit; the hub owns it
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        header = np.ndarray((), HEADER_DTYPE, self.shm.buf)
+        if bytes(header["magic"]) != MAGIC or int(header["version"]) != VERSION:
+            self.shm.close()
+            raise RuntimeError(f"{name} is not a video hub segment")
+        self.layout = RingLayout(self.shm.buf, int(header["slots"]), int(header["slot_bytes"]))
+        self.cursor = int(self.layout.header["write_seq"])
+        self.dropped = 0
+        self.read_count = 0
+        self._consumer = self._claim()
+
+    def _claim(self) -> np.ndarray | None:
+        for consumer in self.layout.consumers:
+            pid = int(consumer["pid"])
+            if pid == 0 or not _alive(pid):
+                consumer["pid"] = os.getpid()
+                consumer["cursor"] = consumer["read"] = consumer["dropped"] = 0
+                return consumer
+        return None  # table full: still works, just not listed in --stats
+
+    @property
+    def latest(self) -> int:
+        return int(self.layout.header["write_seq"])
+
+    def wait(self, timeout: float = 1.0, poll: float = 0.001) -> bool:
+        """Until there is a frame after the cursor"""
+        deadline = time.monotonic() + timeout
+        while self.latest <= self.cursor:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def read(self, newest: bool = True, copy: bool = False) -> HubFrame | None:
+        """Next frame after the cursor (or the newest one), None if nothing new"""
+        latest = self.latest
+        if latest <= self.cursor:
+            return None
+        slots = len(self.layout.slots)
+        seq = latest if newest else max(self.cursor + 1, latest - slots + 2)
+        meta = self.layout.slots[seq % slots]
+        if int(meta["seq"]) != seq:
+            seq = latest  # overtaken while choosing; take the newest
+            meta = self.layout.slots[seq % slots]
+        width, height = int(meta["width"]), int(meta["height"])
+        image = self.layout.data[seq % slots, :width * height * 3].reshape(height, width, 3)
+        if copy:
+            image = image.copy()
+        frame = HubFrame(seq, image, float(meta["received"]), float(meta["decoded"]),
+                         int(meta["rtp_timestamp"]), float(meta["captured"]), meta)
+        if not frame.valid():
+            return None
+        self.dropped += seq - self.cursor - 1
+        self.read_count += 1
+        self.cursor = seq
+        if self._consumer is not None:
+            self._consumer["cursor"], self._consumer["read"] = seq, self.read_count
+            self._consumer["dropped"], self._consumer["last_read"] = self.dropped, time.monotonic()
+        return frame
+
+    def close(self):
+        if self._consumer is not None:
+            self._consumer["pid"] = 0
+            self._consumer = None
+        self.layout = None
+        self.shm.close()
+
+
+class HubCapture:
+    """``cv2.VideoCapture``-style wrapper, so the viewers can swap it in"""
+
+    def __init__(self, name: str = DEFAULT_NAME, timeout: float = 1.0):
+        self.timeout = timeout
+        self.last: HubFrame | None = None  # timing of the frame read() returned last
+        try:
+            self.reader = FrameRingReader(name)
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"❌ Video hub not available: {e}")
+            self.reader = None
+
+    def isOpened(self) -> bool:
+        return self.reader is not None
+
+    def read(self):
+        if self.reader is None or not self.reader.wait(self.timeout):
+            return False, None
+        frame = self.reader.read(newest=True, copy=True)
+        if frame is None:
+            return False, None
+        self.last = frame
+        return True, frame.image
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def release(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
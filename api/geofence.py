@@ -0,0 +1,270 @@
+"""Ground-side geofence with a grid index over the fence polygons.
+
+Polygons are projected once to metres around the fence centre. A uniform
+grid maps every cell to the polygons whose bounding box overlaps it, and
+each cell caches the concatenated edges of those polygons. A check then
+costs one dictionary lookup per point and a single vectorised crossing-
+number test against the candidate edges, however many polygons the fence has.
+
+``GeofenceMonitor`` checks every position update, together with points
+predicted along the current velocity, and reports status changes.
+"""
+import math
+import time
+from typing import Callable
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8
+INCLUSION, EXCLUSION = "inclusion", "exclusion"
+OK, WARNING, BREACH = "ok", "warning", "breach"
+MAX_GRID_CELLS = 256      # per axis
+
+
+class FencePolygon:
+    def __init__(self, points, kind: str = EXCLUSION, name: str | None = None,
+                 min_alt: float | None = None, max_alt: float | None = None):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+            raise ValueError("a fence polygon needs at least 3 [lat, lon] points")
+        if kind not in (INCLUSION, EXCLUSION):
+            raise ValueError(f"kind must be '{INCLUSION}' or '{EXCLUSION}'")
+        self.points = points        # lat, lon
+        self.kind = kind
+        self.name = name
+        # Altitude band above home the polygon applies to
+        self.min_alt = -math.inf if min_alt is None else min_alt
+        self.max_alt = math.inf if max_alt is None else max_alt
+
+    def summary(self) -> dict:
+        return {"name": self.name, "kind": self.kind, "points": len(self.points),
+                "min_alt": None if math.isinf(self.min_alt) else self.min_alt,
+                "max_alt": None if math.isinf(self.max_alt) else self.max_alt}
+
+
+class Geofence:
+    """Inclusion/exclusion polygons plus altitude limits above home"""
+
+    def __init__(self, polygons: list[FencePolygon], max_altitude: float | None = None,
+                 min_altitude: float | None = None, cell_size: float | None = None):
+        self.polygons = polygons
+        self.max_altitude = max_altitude
+        self.min_altitude = min_altitude
+        self.has_inclusion = any(p.kind == INCLUSION for p in polygons)
+        self.exclusion = np.array([p.kind == EXCLUSION for p in polygons], dtype=bool)
+        self.min_alt = np.array([p.min_alt for p in polygons])
+        self.max_alt = np.array([p.max_alt for p in polygons])
+
+        if polygons:
+            vertices = np.vstack([p.points for p in polygons])
+            self.origin = (vertices[:, 0].min() + vertices[:, 0].max()) / 2, \
+                          (vertices[:, 1].min() + vertices[:, 1].max()) / 2
+        else:
+            self.origin = (0.0, 0.0)
+        self._scale = np.radians(1.0) * EARTH_RADIUS * np.array([1.0, math.cos(math.radians(self.origin[0]))])
+
+        # Closed edge lists: (x1, y1, x2, y2, dx/dy) in metres, polygons back to back
+        edges, offsets, boxes = [], [], []
+        count = 0
+        for polygon in polygons:
+            xy = self.project(polygon.points)
+            start, end = xy, np.roll(xy, -1, axis=0)
+            dy = end[:, 1] - start[:, 1]
+            # Horizontal edges never straddle a point, so their slope is unused
+            slope = np.divide(end[:, 0] - start[:, 0], dy, out=np.zeros_like(dy), where=dy != 0)
+            edges.append(np.column_stack([start, end, slope]))
+            offsets.append(count)
+            count += len(xy)
+            boxes.append((*xy.min(axis=0), *xy.max(axis=0)))
+        self.edges = np.vstack(edges) if edges else np.zeros((0, 5))
+        self.edge_offsets = np.array(offsets + [count], dtype=np.int64)
+        self.boxes = np.array(boxes) if boxes else np.zeros((0, 4))
+
+        # Grid over the union of the bounding boxes
+        if polygons:
+            self.grid_min = self.boxes[:, :2].min(axis=0)
+            extent = (self.boxes[:, 2:].max(axis=0) - self.grid_min).max()
+            self.cell = cell_size or max(extent / MAX_GRID_CELLS, 1.0)
+        else:
+            self.grid_min = np.zeros(2)
+            self.cell = cell_size or 1.0
+        self.grid: dict[tuple[int, int], list[int]] = {}
+        # Polygons spanning much of the grid (e.g. the operating area) are
+        # candidates everywhere instead of being written into every cell
+        self.wide: list[int] = []
+        for index, box in enumerate(self.boxes):
+            lo = np.floor((box[:2] - self.grid_min) / self.cell).astype(int)
+            hi = np.floor((box[2:] - self.grid_min) / self.cell).astype(int)
+            if (hi - lo + 1).prod() > MAX_GRID_CELLS ** 2 // 16:
+                self.wide.append(index)
+                continue
+            for ix in range(lo[0], hi[0] + 1):
+                for iy in range(lo[1], hi[1] + 1):
+                    self.grid.setdefault((ix, iy), []).append(index)
+        self._cell_edges: dict[tuple, tuple] = {}
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "Geofence":
+        polygons = [FencePolygon(**polygon) for polygon in spec.get("polygons") or []]
+        return cls(polygons, spec.get("max_altitude"), spec.get("min_altitude"), spec.get("cell_size"))
+
+    def project(self, latlon) -> np.ndarray:
+        """``(N, 2)`` lat/lon -> ``(N, 2)`` north/east metres from the fence centre"""
+        return (np.asarray(latlon, dtype=np.float64) - self.origin) * self._scale
+
+    def _candidates(self, key: tuple) -> tuple:
+        """Polygon ids, their edges and reduceat offsets for a set of cells"""
+        cached = self._cell_edges.get(key)
+        if cached is None:
+            candidates = {p for cell in key for p in self.grid.get(cell, ())}
+            polygons = np.array(sorted(candidates.union(self.wide)), dtype=np.int64)
+            if len(polygons):
+                starts, ends = self.edge_offsets[polygons], self.edge_offsets[polygons + 1]
+                index = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+                offsets = np.concatenate([[0], np.cumsum(ends - starts)[:-1]])
+                cached = (polygons, self.edges[index].T, offsets)
+            else:
+                cached = (polygons, None, None)
+            if len(self._cell_edges) < 4096:
+                self._cell_edges[key] = cached
+        return cached
+
+    def contains(self, points) -> tuple[np.ndarray, np.ndarray]:
+        """``(P, 2)`` metres -> candidate polygon ids and a ``(P, C)`` inside matrix"""
+        cells = np.floor((points - self.grid_min) / self.cell).astype(int)
+        key = tuple(sorted(set(zip(*cells.T.tolist()))))
+        polygons, edges, offsets = self._candidates(key)
+        if not len(polygons):
+            return polygons, np.zeros((len(points), 0), dtype=bool)
+        x1, y1, _, y2, slope = edges
+        px, py = points[:, :1], points[:, 1:]
+        # Crossing number: edges straddling the point's y, crossed on its +x side
+        crossings = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * slope)
+        inside = np.add.reduceat(crossings, offsets, axis=1) % 2 == 1
+        return polygons, inside
+
+    def check(self, latlon, alt: np.ndarray | None) -> list[list[str]]:
+        """Violations for each point; ``alt`` is above home (None if unknown)"""
+        points = self.project(latlon)
+        polygons, inside = self.contains(points)
+        if alt is not None:
+            inside &= (alt[:, None] >= self.min_alt[polygons]) & (alt[:, None] <= self.max_alt[polygons])
+        exclusion = self.exclusion[polygons]
+        excluded = inside & exclusion
+        bad = excluded.any(axis=1)
+        if self.has_inclusion:
+            bad |= ~(inside & ~exclusion).any(axis=1)
+        if alt is not None:
+            if self.max_altitude is not None:
+                bad |= alt > self.max_altitude
+            if self.min_altitude is not None:
+                bad |= alt < self.min_altitude
+
+        violations = [[] for _ in range(len(points))]
+        for i in np.flatnonzero(bad):
+            for p in polygons[excluded[i]]:
+                violations[i].append(f"inside exclusion zone {self.polygons[p].name or p}")
+            if self.has_inclusion and not (inside[i] & ~exclusion).any():
+                violations[i].append("outside inclusion zone")
+            if alt is not None:
+                if self.max_altitude is not None and alt[i] > self.max_altitude:
+                    violations[i].append(f"above {self.max_altitude:g} m")
+                if self.min_altitude is not None and alt[i] < self.min_altitude:
+                    violations[i].append(f"below {self.min_altitude:g} m")
+        return violations
+
+    def summary(self) -> dict:
+        return {
+            "polygons": [p.summary() for p in self.polygons],
+            "max_altitude": self.max_altitude,
+            "min_altitude": self.min_altitude,
+            "grid_cells": len(self.grid),
+            "wide_polygons": len(self.wide),
+            "cell_size_m": round(self.cell, 1),
+        }
+
+
+class GeofenceMonitor:
+    """Checks each position sample; calls ``on_status(status, details)`` on changes.
+
+    The current position is checked together with ``steps`` points along
+    the velocity vector up to ``lookahead_s`` ahead. A predicted violation
+    is a ``warning``; a current one is a ``breach``.
+    """
+
+    def __init__(self, state, on_status: Callable[[str, dict], None],
+                 lookahead_s: float = 5.0, steps: int = 5):
+        self.state = state
+        self.on_status = on_status
+        self.fence: Geofence | None = None
+        self.action = "rtl"
+        self.lookahead_s = lookahead_s
+        self.steps = steps
+        self.status = OK
+        self.details: dict = {}
+        self._last_violations = None
+        self.checks = 0
+        self.check_time = 0.0
+        self._velocity = state.record("velocity")
+        self._home = state.record("home")
+
+    # Topics the monitor needs the vehicle to stream
+    topics = frozenset({"position", "velocity", "home", "armed"})
+
+    def configure(self, fence: Geofence | None, action: str = "rtl", lookahead_s: float | None = None):
+        self.fence = fence if fence and (fence.polygons or fence.max_altitude is not None
+                                         or fence.min_altitude is not None) else None
+        self.action = action
+        if lookahead_s is not None:
+            self.lookahead_s = lookahead_s
+        self._set_status(OK, {})
+
+    def telemetry(self, topic: str, record):
+        """``TelemetryState`` listener"""
+        if topic != "position" or self.fence is None:
+            return
+        started = time.perf_counter()
+        lat, lon, abs_alt = record.values
+        if not (lat or lon):
+            return
+        north, east, down = self._velocity.values
+        times = np.linspace(0.0, self.lookahead_s, self.steps + 1) if self.lookahead_s > 0 else np.zeros(1)
+        # Small-offset conversion is plenty for a few seconds of flight
+        latlon = np.column_stack([
+            lat + np.degrees(north * times / EARTH_RADIUS),
+            lon + np.degrees(east * times / (EARTH_RADIUS * math.cos(math.radians(lat)))),
+        ])
+        home_lat, home_lon, home_alt = self._home.values
+        alt = abs_alt - home_alt - down * times if (home_lat or home_lon) else None
+        violations = self.fence.check(latlon, alt)
+        self.checks += 1
+        self.check_time += time.perf_counter() - started
+
+        if violations[0]:
+            self._set_status(BREACH, {"violations": violations[0]})
+        else:
+            ahead = next((i for i, v in enumerate(violations) if v), None)
+            if ahead is not None:
+                self._set_status(WARNING, {"violations": violations[ahead],
+                                           "in_s": round(float(times[ahead]), 1)})
+            else:
+                self._set_status(OK, {})
+
+    def _set_status(self, status: str, details: dict):
+        previous = self.status
+        self.status, self.details = status, details
+        if status != previous or (status != OK and details.get("violations") != self._last_violations):
+            self._last_violations = details.get("violations")
+            self.on_status(status, {"previous": previous, **details})
+
+    def summary(self) -> dict:
+        return {
+            "enabled": self.fence is not None,
+            "status": self.status,
+            **self.details,
+            "action": self.action,
+            "lookahead_s": self.lookahead_s,
+            "checks": self.checks,
+            "mean_check_us": round(1e6 * self.check_time / self.checks, 1) if self.checks else None,
+            "fence": self.fence.summary() if self.fence else None,
+        }
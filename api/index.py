@@ -1,25 +1,58 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import (APIRouter, Depends, FastAPI, UploadFile, File, HTTPException, Request, Response, Query,
+                     WebSocket, WebSocketDisconnect)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import socketio
 import asyncio
 import random
 import os
-from datetime import datetime
-from api.drone_controller import DroneController
-
-# -----------------------------
-# Shared Drone State
-# -----------------------------
-drone_data = {
-    "velocity": {"x": 0.0, "y": 0.0, "z": 0.0},
-    "battery": {"level": 100.0, "voltage": 12.4, "temperature": 25.0},
-    "camera": {"last_frame": None, "timestamp": None},
-    "position": {"lat": 0.0, "lon": 0.0, "abs_alt": 0.0},
-    "attitude": {"roll": 0.0, "pitch": 0.0, "yaw": 0.0, "heading": 0.0},
-    "health": "starting"
+import time
+from api.camera import DEFAULT_CAPACITY, MAX_FRAME_BYTES, Frame
+from api.drone_controller import TELEMETRY_STREAMS
+from api.telemetry_clients import parse_subscription
+from api.telemetry_codec import MEDIA_TYPES, encode_topic, negotiate
+from api.telemetry_history import DECIMATORS, MAX_POINTS, query_rows
+from api.geofence import Geofence
+from api.log_ingest import TelemetryArchive
+from api.mission import MissionError, MissionPlan, plan_mission
+from api.replay import FlightLogReplay
+from api.setpoint_scheduler import Hold, WaypointTrajectory
+from api.video_gateway import DEFAULT_PORT as DEFAULT_VIDEO_PORT, MJPEG_MEDIA_TYPE, VideoGateway, mjpeg_part
+from api.vehicles import (DEFAULT_MAVSDK_PORT, DEFAULT_SYSTEM_ID, TELEMETRY_TOPICS,
+                          Vehicle, VehicleRegistry, parse_vehicles)
+from api import telemetry_log
+
+# Replay a recorded flight log instead of connecting to a vehicle:
+#   CONTROL_STATION_REPLAY=flight_logs/vehicle_1/flight_....cvfl CONTROL_STATION_REPLAY_SPEED=10
+REPLAY_PATH = os.environ.get("CONTROL_STATION_REPLAY")
+replay: FlightLogReplay | None = None
+
+# Flight recorder; set CONTROL_STATION_FLIGHT_LOG_DIR="" to disable.
+# Replays are never re-recorded.
+FLIGHT_LOG_DIR = "" if REPLAY_PATH else os.environ.get("CONTROL_STATION_FLIGHT_LOG_DIR", "flight_logs")
+
+# Camera frames: the last CONTROL_STATION_CAMERA_FRAMES are kept in memory.
+# Set CONTROL_STATION_CAMERA_DIR to also spool them to disk, keeping at most
+# CONTROL_STATION_CAMERA_RETENTION_MB / _FILES per vehicle.
+CAMERA_DIR = os.environ.get("CONTROL_STATION_CAMERA_DIR", "")
+CAMERA_OPTIONS = {
+    "capacity": int(os.environ.get("CONTROL_STATION_CAMERA_FRAMES", DEFAULT_CAPACITY)),
+    "max_spool_bytes": int(float(os.environ.get("CONTROL_STATION_CAMERA_RETENTION_MB", "512")) * 1024 * 1024),
+    "max_spool_files": int(os.environ.get("CONTROL_STATION_CAMERA_RETENTION_FILES", "10000")),
 }
-controller: DroneController | None = None
+
+# Video gateway UDP port for the vehicle's RTP/H.264 stream; "" disables it
+# (e.g. to let video_viewer.py own the port). With video_hub.py running, point
+# this at the hub's --forward port and set CONTROL_STATION_VIDEO_HUB so MJPEG
+# uses the hub's decoded frames
+VIDEO_PORT = os.environ.get("CONTROL_STATION_VIDEO_PORT", str(DEFAULT_VIDEO_PORT))
+video = VideoGateway(
+    int(VIDEO_PORT or 0),
+    mjpeg_quality=int(os.environ.get("CONTROL_STATION_VIDEO_MJPEG_QUALITY", "80")),
+    mjpeg_fps=float(os.environ.get("CONTROL_STATION_VIDEO_MJPEG_FPS", "30")),
+    hub=os.environ.get("CONTROL_STATION_VIDEO_HUB", ""),
+)
 
 # -----------------------------
 # FastAPI + Socket.IO Setup
@@ -40,6 +73,49 @@ sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
 
 socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 
+# Socket.IO sid -> namespace, so a vehicle's client hub can reach its clients
+socket_namespaces: dict[str, str] = {}
+
+
+async def emit_to_client(event, data, sid, callback=None):
+    await sio.emit(event, data, to=sid, namespace=socket_namespaces.get(sid, "/"), callback=callback)
+
+# -----------------------------
+# Vehicles
+# -----------------------------
+# CONTROL_STATION_VEHICLES="1:50051,2:50052" maps MAVLink system IDs to
+# mavsdk_server ports. The simulator backend defaults to one vehicle per
+# CONTROL_STATION_SIM_VEHICLES.
+def _vehicle_spec() -> dict[int, int]:
+    spec = os.environ.get("CONTROL_STATION_VEHICLES")
+    if spec:
+        return parse_vehicles(spec)
+    if os.environ.get("CONTROL_STATION_BACKEND") == "sim":
+        count = int(os.environ.get("CONTROL_STATION_SIM_VEHICLES", "1"))
+        return {i: DEFAULT_MAVSDK_PORT - 1 + i for i in range(1, count + 1)}
+    return {DEFAULT_SYSTEM_ID: DEFAULT_MAVSDK_PORT}
+
+
+vehicles = VehicleRegistry(emit_to_client, log_dir=FLIGHT_LOG_DIR,
+                           camera_dir=CAMERA_DIR, camera_options=CAMERA_OPTIONS)
+for _system_id, _port in _vehicle_spec().items():
+    vehicles.add(_system_id, _port)
+
+
+def get_vehicle(vehicle_id: int | None = None) -> Vehicle:
+    """Vehicle from the route; un-namespaced routes use the default vehicle"""
+    if vehicle_id is None:
+        return vehicles.default
+    vehicle = vehicles.get(vehicle_id)
+    if vehicle is None:
+        raise HTTPException(status_code=404, detail=f"Unknown vehicle {vehicle_id}")
+    return vehicle
+
+
+# Per-vehicle routes, mounted at /api/vehicles/{vehicle_id} and, for the
+# default vehicle, at /api
+vehicle_router = APIRouter()
+
 # -----------------------------
 # Pydantic Models
 # -----------------------------
@@ -55,124 +131,650 @@ class Battery(BaseModel):
     temperature: float
 
 
+class StreamRate(BaseModel):
+    rate_hz: float
+
+
+class ReplayControl(BaseModel):
+    speed: float
+
+
+class MissionRequest(BaseModel):
+    # [lat, lon, alt above home]
+    waypoints: list[list[float]]
+    speed: float | list[float] = 5.0
+    loiter: float | list[float] = 0.0
+    acceptance_radius: float = 2.0
+    # [lat, lon, absolute alt]; defaults to the vehicle's home position
+    home: list[float] | None = None
+    upload: bool = False
+
+
+class MissionStart(BaseModel):
+    mode: str = "mission"   # "mission" (autopilot) or "offboard" (setpoint stream)
+
+
+class GeofencePolygon(BaseModel):
+    points: list[list[float]]           # [lat, lon]
+    kind: str = "exclusion"             # or "inclusion"
+    name: str | None = None
+    min_alt: float | None = None        # altitude band above home
+    max_alt: float | None = None
+
+
+class GeofenceConfig(BaseModel):
+    polygons: list[GeofencePolygon] = []
+    max_altitude: float | None = None
+    min_altitude: float | None = None
+    lookahead_s: float = 5.0
+    action: str = "rtl"                 # "rtl" or "alert"
+
+
+class OffboardTrajectory(BaseModel):
+    # NED metres from home: [north, east, down] or [north, east, down, yaw_deg]
+    waypoints: list[list[float]] | None = None
+    speed: float = 5.0
+    loop: bool = False
+    hold: list[float] | None = None
+
+
+class LoggingConfig(BaseModel):
+    level: str | None = None
+    telemetry_level: str | None = None
+    default_rate: float | None = None
+    topics: dict[str, float] | None = None
+
+
 # -----------------------------
 # REST Endpoints
 # -----------------------------
+def telemetry_response(request: Request, topic: str, data):
+    """Return ``data`` as JSON, or MessagePack/struct if the Accept header asks."""
+    encoding = negotiate(request.headers.get("accept"))
+    if encoding == "json":
+        return data
+    return Response(encode_topic(topic, data, encoding), media_type=MEDIA_TYPES[encoding])
+
+
+async def history_query(source, fields, now: float, topic: str, since, until, decimate, method, field):
+    """Validate a history request and run it on a ``TelemetryHistory`` or archive"""
+    if fields is None:
+        raise HTTPException(status_code=404, detail=f"No history for '{topic}'")
+    if method not in DECIMATORS:
+        raise HTTPException(status_code=400, detail=f"Unknown decimation method '{method}'")
+    if field and field not in fields:
+        raise HTTPException(status_code=400, detail=f"Unknown field '{field}'")
+    since = now + since if since is not None and since < 0 else since
+    until = now + until if until is not None and until < 0 else until
+    rows = source.window(topic, since, until)
+    # Decimating and listing a whole ring takes up to a few hundred ms; keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(
+        None, query_rows, topic, rows, fields, decimate, method, field)
+
+
 @app.get("/api/python")
 async def hello_world():
     return {"message": "Hello, World!"}
 
 
 # Velocity ----------------------------------------------------------
-@app.post("/api/velocity")
-async def post_velocity(payload: Velocity):
-    drone_data["velocity"] = payload.dict()
+@vehicle_router.post("/velocity")
+async def post_velocity(payload: Velocity, vehicle: Vehicle = Depends(get_vehicle)):
+    vehicle.state.update_fields("velocity", payload.dict())
     return {"status": "success"}
 
 
-@app.get("/api/velocity")
-async def get_velocity():
-    return drone_data["velocity"]
+@vehicle_router.get("/velocity")
+async def get_velocity(request: Request, vehicle: Vehicle = Depends(get_vehicle)):
+    vehicle.keep_streaming("velocity")
+    return telemetry_response(request, "velocity", vehicle.state.snapshot("velocity"))
 
 
 # Battery -----------------------------------------------------------
-@app.post("/api/battery")
-async def post_battery(payload: Battery):
-    drone_data["battery"] = payload.dict()
+@vehicle_router.post("/battery")
+async def post_battery(payload: Battery, vehicle: Vehicle = Depends(get_vehicle)):
+    vehicle.state.update_fields("battery", payload.dict())
     return {"status": "success"}
 
 
-@app.get("/api/battery")
-async def get_battery():
-    return drone_data["battery"]
+@vehicle_router.get("/battery")
+async def get_battery(request: Request, vehicle: Vehicle = Depends(get_vehicle)):
+    vehicle.keep_streaming("battery")
+    return telemetry_response(request, "battery", vehicle.state.snapshot("battery"))
 
 
 # Camera ------------------------------------------------------------
-@app.post("/api/camera")
-async def post_camera(frame: UploadFile = File(...)):
+# Frames go to the vehicle's in-memory ring (and the spooler, if enabled).
+# Upload a multipart "frame" file, a raw image body to /camera/frame, or a
+# stream of binary messages over the /camera/ws WebSocket.
+async def read_limited(chunks) -> bytes:
+    data = bytearray()
+    async for chunk in chunks:
+        data += chunk
+        if len(data) > MAX_FRAME_BYTES:
+            raise HTTPException(status_code=413, detail=f"Frame larger than {MAX_FRAME_BYTES} bytes")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty frame")
+    return bytes(data)
+
+
+def frame_response(frame: Frame, request: Request) -> Response:
+    etag = f'"{frame.seq}"'
+    headers = {"ETag": etag, "X-Frame-Seq": str(frame.seq), "X-Frame-Timestamp": f"{frame.timestamp:.6f}",
+               "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(frame.data, media_type=frame.content_type, headers=headers)
+
+
+@vehicle_router.post("/camera")
+async def post_camera(frame: UploadFile = File(...), vehicle: Vehicle = Depends(get_vehicle)):
     if not frame.filename:
         raise HTTPException(status_code=400, detail="Empty frame")
 
-    filename = f"frame_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.jpg"
-    filepath = os.path.join("/tmp", filename)
+    async def chunks():
+        while chunk := await frame.read(256 * 1024):
+            yield chunk
 
-    # Save uploaded image
-    with open(filepath, "wb") as dst:
-        dst.write(await frame.read())
+    stored = vehicle.camera.add(await read_limited(chunks()), frame.content_type or "image/jpeg")
+    return {"status": "success", "seq": stored.seq}
+
+
+@vehicle_router.post("/camera/frame")
+async def post_camera_frame(request: Request, vehicle: Vehicle = Depends(get_vehicle)):
+    """Raw image body, read as it streams in"""
+    data = await read_limited(request.stream())
+    content_type = request.headers.get("content-type", "image/jpeg").split(";")[0]
+    stored = vehicle.camera.add(data, content_type)
+    return {"status": "success", "seq": stored.seq}
+
+
+@vehicle_router.websocket("/camera/ws")
+async def camera_socket(websocket: WebSocket, vehicle: Vehicle = Depends(get_vehicle)):
+    """One binary message per frame; text messages set the content type"""
+    await websocket.accept()
+    content_type = "image/jpeg"
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text"):
+                content_type = message["text"]
+            elif message.get("bytes"):
+                if len(message["bytes"]) > MAX_FRAME_BYTES:
+                    await websocket.close(code=1009)
+                    break
+                vehicle.camera.add(message["bytes"], content_type)
+    except WebSocketDisconnect:
+        pass
+
+
+@vehicle_router.get("/camera")
+async def get_camera(vehicle: Vehicle = Depends(get_vehicle)):
+    return vehicle.state.snapshot("camera")
 
-    drone_data["camera"] = {"last_frame": filename, "timestamp": datetime.utcnow().isoformat()}
-    return {"status": "success"}
 
+@vehicle_router.get("/camera/latest")
+async def get_camera_latest(request: Request, vehicle: Vehicle = Depends(get_vehicle)):
+    frame = vehicle.camera.latest
+    if frame is None:
+        raise HTTPException(status_code=404, detail="No camera frames yet")
+    return frame_response(frame, request)
 
-@app.get("/api/camera")
-async def get_camera():
-    return drone_data["camera"]
 
+@vehicle_router.get("/camera/frames/{seq}")
+async def get_camera_frame(seq: int, request: Request, vehicle: Vehicle = Depends(get_vehicle)):
+    frame = vehicle.camera.get(seq)
+    if frame is None:
+        raise HTTPException(status_code=404, detail=f"Frame {seq} is no longer buffered")
+    return frame_response(frame, request)
+
+
+@vehicle_router.get("/camera/mjpeg")
+async def get_camera_mjpeg(vehicle: Vehicle = Depends(get_vehicle)):
+    """Uploaded frames as an MJPEG stream; each frame's part is built once for all viewers"""
+    latest = vehicle.camera.latest
+    initial = mjpeg_part(latest.data, latest.content_type) if latest else None
+    return StreamingResponse(vehicle.camera_mjpeg.stream(initial), media_type=MJPEG_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@vehicle_router.get("/camera/stats")
+async def get_camera_stats(vehicle: Vehicle = Depends(get_vehicle)):
+    return {**vehicle.camera.stats(), "mjpeg": vehicle.camera_mjpeg.stats()}
 
-# RTL ------------------------------------------------------------
-@app.post("/api/rtl")
-async def return_to_launch():
-    if controller:
-        success = await controller.return_to_launch()
-        return {"status": "RTL triggered" if success else "RTL failed"}
-    return {"status": "Controller not available"}
 
 # Drone Control Endpoints ----------------------------------------
-@app.post("/api/arm")
-async def arm_drone():
-    if controller:
-        success = await controller.arm_drone()
-        return {"status": "Armed successfully" if success else "Arm failed"}
-    return {"status": "Controller not available"}
-
-@app.post("/api/disarm")
-async def disarm_drone():
-    if controller:
-        success = await controller.disarm_drone()
-        return {"status": "Disarmed successfully" if success else "Disarm failed"}
-    return {"status": "Controller not available"}
-
-@app.post("/api/takeoff")
-async def takeoff_drone():
-    if controller:
-        success = await controller.takeoff_drone()
-        return {"status": "Takeoff initiated" if success else "Takeoff failed"}
-    return {"status": "Controller not available"}
-
-@app.post("/api/land")
-async def land_drone():
-    if controller:
-        success = await controller.land_drone()
-        return {"status": "Landing initiated" if success else "Landing failed"}
-    return {"status": "Controller not available"}
-
-# Video Status Endpoint (for UI compatibility) -----------------
+# Commands are queued and answered with 202 and a command ID; progress is
+# pushed to the vehicle's Socket.IO clients as "command" events.
+def submit_command(vehicle: Vehicle, name: str) -> dict:
+    controller = vehicle.controller
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not available")
+    command = controller.submit_command(name)
+    return {"status": command.status, "command_id": command.id, "command": name}
+
+
+@vehicle_router.post("/rtl", status_code=202)
+async def return_to_launch(vehicle: Vehicle = Depends(get_vehicle)):
+    return submit_command(vehicle, "rtl")
+
+@vehicle_router.post("/arm", status_code=202)
+async def arm_drone(vehicle: Vehicle = Depends(get_vehicle)):
+    return submit_command(vehicle, "arm")
+
+@vehicle_router.post("/disarm", status_code=202)
+async def disarm_drone(vehicle: Vehicle = Depends(get_vehicle)):
+    return submit_command(vehicle, "disarm")
+
+@vehicle_router.post("/takeoff", status_code=202)
+async def takeoff_drone(vehicle: Vehicle = Depends(get_vehicle)):
+    return submit_command(vehicle, "takeoff")
+
+@vehicle_router.post("/land", status_code=202)
+async def land_drone(vehicle: Vehicle = Depends(get_vehicle)):
+    return submit_command(vehicle, "land")
+
+
+def get_command(vehicle: Vehicle, command_id: int):
+    command = vehicle.controller.commands.get(command_id) if vehicle.controller else None
+    if command is None:
+        raise HTTPException(status_code=404, detail=f"Unknown command {command_id}")
+    return command
+
+
+@vehicle_router.get("/commands")
+async def list_commands(vehicle: Vehicle = Depends(get_vehicle)):
+    if not vehicle.controller:
+        return []
+    return [command.summary() for command in vehicle.controller.commands.commands.values()]
+
+@vehicle_router.get("/commands/{command_id}")
+async def get_command_status(command_id: int, vehicle: Vehicle = Depends(get_vehicle)):
+    return get_command(vehicle, command_id).summary()
+
+@vehicle_router.delete("/commands/{command_id}")
+async def cancel_command(command_id: int, vehicle: Vehicle = Depends(get_vehicle)):
+    command = get_command(vehicle, command_id)
+    if not vehicle.controller.commands.cancel(command_id):
+        raise HTTPException(status_code=409, detail=f"Command {command_id} already {command.status}")
+    return {"status": "cancelling", "command_id": command_id}
+
+# Missions --------------------------------------------------------
+def get_mission(vehicle: Vehicle) -> MissionPlan:
+    mission = vehicle.controller.mission if vehicle.controller else None
+    if mission is None:
+        raise HTTPException(status_code=404, detail="No mission planned")
+    return mission
+
+
+@vehicle_router.post("/mission")
+async def post_mission(payload: MissionRequest, vehicle: Vehicle = Depends(get_vehicle)):
+    """Validate and plan a waypoint mission; optionally queue its upload"""
+    controller = vehicle.controller
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not available")
+    if payload.home is not None:
+        if len(payload.home) != 3:
+            raise HTTPException(status_code=400, detail="home must be [lat, lon, alt]")
+        home = payload.home
+    else:
+        vehicle.keep_streaming("home")
+        home = vehicle.state.snapshot("home")
+        if not (home["lat"] or home["lon"]):
+            raise HTTPException(status_code=409, detail="Home position unknown; pass home")
+        home = (home["lat"], home["lon"], home["abs_alt"])
+
+    started = time.perf_counter()
+    try:
+        plan = plan_mission(payload.waypoints, home, payload.speed, payload.loiter,
+                            payload.acceptance_radius)
+    except MissionError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
+    planning_ms = (time.perf_counter() - started) * 1000
+
+    controller.mission = plan
+    response = {"status": "planned", "planning_ms": round(planning_ms, 3), **plan.summary()}
+    if payload.upload:
+        command = controller.upload_mission(plan)
+        response.update(status=command.status, command_id=command.id)
+    return response
+
+@vehicle_router.get("/mission")
+async def get_mission_summary(vehicle: Vehicle = Depends(get_vehicle)):
+    return get_mission(vehicle).summary()
+
+@vehicle_router.get("/mission/legs")
+async def get_mission_legs(
+    start: int = Query(0, ge=0),
+    count: int | None = Query(None, gt=0),
+    vehicle: Vehicle = Depends(get_vehicle),
+):
+    """Per-waypoint NED offsets, headings, leg lengths and ETA (columnar)"""
+    return get_mission(vehicle).legs(start, count)
+
+@vehicle_router.post("/mission/upload", status_code=202)
+async def upload_mission(vehicle: Vehicle = Depends(get_vehicle)):
+    command = vehicle.controller.upload_mission(get_mission(vehicle))
+    return {"status": command.status, "command_id": command.id, "command": command.name}
+
+@vehicle_router.post("/mission/start", status_code=202)
+async def start_mission(payload: MissionStart, vehicle: Vehicle = Depends(get_vehicle)):
+    plan = get_mission(vehicle)
+    if payload.mode == "offboard":
+        # The scheduler only starts once offboard mode is engaged (see DroneController.run)
+        if not get_setpoints(vehicle).running:
+            raise HTTPException(status_code=409, detail="Offboard setpoint stream is not running")
+        vehicle.controller.fly_mission_offboard(plan)
+        return {"status": "flying", "mode": "offboard", **plan.summary()}
+    if payload.mode != "mission":
+        raise HTTPException(status_code=400, detail="mode must be 'mission' or 'offboard'")
+    return submit_command(vehicle, "mission_start")
+
+@vehicle_router.post("/mission/pause", status_code=202)
+async def pause_mission(vehicle: Vehicle = Depends(get_vehicle)):
+    get_mission(vehicle)
+    return submit_command(vehicle, "mission_pause")
+
+@vehicle_router.delete("/mission")
+async def clear_mission(vehicle: Vehicle = Depends(get_vehicle)):
+    get_mission(vehicle)
+    vehicle.controller.mission = None
+    return {"status": "cleared"}
+
+# Link ------------------------------------------------------------
+@vehicle_router.get("/link")
+async def get_link(vehicle: Vehicle = Depends(get_vehicle)):
+    """Connection status, message rate, last-seen age and measured outages"""
+    if not vehicle.controller:
+        return {"status": "disconnected"}
+    return vehicle.controller.connection.stats()
+
+# Geofence --------------------------------------------------------
+@vehicle_router.get("/geofence")
+async def get_geofence(vehicle: Vehicle = Depends(get_vehicle)):
+    return vehicle.geofence.summary()
+
+@vehicle_router.put("/geofence")
+async def put_geofence(payload: GeofenceConfig, vehicle: Vehicle = Depends(get_vehicle)):
+    if payload.action not in ("rtl", "alert"):
+        raise HTTPException(status_code=400, detail="action must be 'rtl' or 'alert'")
+    if not 0 <= payload.lookahead_s <= 60:
+        raise HTTPException(status_code=400, detail="lookahead_s must be in [0, 60]")
+    try:
+        fence = Geofence.from_dict(payload.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    vehicle.set_geofence(fence, payload.action, payload.lookahead_s)
+    return vehicle.geofence.summary()
+
+@vehicle_router.delete("/geofence")
+async def clear_geofence(vehicle: Vehicle = Depends(get_vehicle)):
+    vehicle.set_geofence(None)
+    return vehicle.geofence.summary()
+
+# Offboard Setpoints ----------------------------------------------
+def get_setpoints(vehicle: Vehicle):
+    if not vehicle.controller:
+        raise HTTPException(status_code=503, detail="Controller not available")
+    return vehicle.controller.setpoints
+
+
+@vehicle_router.get("/offboard")
+async def get_offboard(vehicle: Vehicle = Depends(get_vehicle)):
+    """Setpoint stream state, jitter and missed-deadline statistics"""
+    return get_setpoints(vehicle).stats()
+
+@vehicle_router.put("/offboard/trajectory")
+async def put_offboard_trajectory(payload: OffboardTrajectory, vehicle: Vehicle = Depends(get_vehicle)):
+    setpoints = get_setpoints(vehicle)
+    try:
+        if payload.waypoints:
+            trajectory = WaypointTrajectory(payload.waypoints, payload.speed, payload.loop)
+        elif payload.hold and len(payload.hold) in (3, 4):
+            trajectory = Hold((*payload.hold, 0.0)[:4])
+        else:
+            raise ValueError("Give waypoints or a hold setpoint [north, east, down(, yaw)]")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    setpoints.set_trajectory(trajectory)
+    return setpoints.stats()
+
+@vehicle_router.delete("/offboard/trajectory")
+async def stop_offboard_trajectory(vehicle: Vehicle = Depends(get_vehicle)):
+    """Hold the current setpoint"""
+    setpoints = get_setpoints(vehicle)
+    setpoints.set_trajectory(None)
+    return setpoints.stats()
+
+@vehicle_router.put("/offboard/rate")
+async def put_offboard_rate(payload: StreamRate, vehicle: Vehicle = Depends(get_vehicle)):
+    if not 2.0 <= payload.rate_hz <= 100.0:
+        raise HTTPException(status_code=400, detail="rate_hz must be in [2, 100]")
+    setpoints = get_setpoints(vehicle)
+    setpoints.set_rate(payload.rate_hz)
+    return setpoints.stats()
+
+# Logging ---------------------------------------------------------
+@app.get("/api/logging")
+async def get_logging():
+    return telemetry_log.get_settings()
+
+
+@app.put("/api/logging")
+async def put_logging(payload: LoggingConfig):
+    """Adjust log level and per-topic telemetry log rates (lines/s, 0 mutes)"""
+    try:
+        if payload.level:
+            telemetry_log.set_level(payload.level)
+        if payload.telemetry_level:
+            telemetry_log.set_level(payload.telemetry_level, telemetry_log.telemetry_log.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    telemetry_log.telemetry_sampler.configure(payload.topics, payload.default_rate)
+    return telemetry_log.get_settings()
+
+# Flight Recorder -------------------------------------------------
+@vehicle_router.get("/flight-log")
+async def get_flight_log(vehicle: Vehicle = Depends(get_vehicle)):
+    if not vehicle.recorder:
+        return {"recording": False}
+    return vehicle.recorder.stats()
+
+@app.get("/api/replay")
+async def get_replay():
+    if not replay:
+        return {"running": False}
+    return replay.status()
+
+
+@app.put("/api/replay")
+async def put_replay(payload: ReplayControl):
+    if not replay:
+        raise HTTPException(status_code=404, detail="Not in replay mode")
+    if not 0 < payload.speed <= 1000:
+        raise HTTPException(status_code=400, detail="speed must be in (0, 1000]")
+    replay.set_speed(payload.speed)
+    return replay.status()
+
+# Video --------------------------------------------------------------
+# The gateway receives the vehicle's RTP/H.264 stream and serves it as
+# fMP4 (passthrough, for <video>), raw H.264 and MJPEG.
 @app.get("/api/video-status")
 async def get_video_status():
-    """Return video status - now handled by native Python viewer"""
-    return {
-        "status": "native_viewer", 
-        "message": "Use native Python video viewer: ./run_video_viewer.sh",
-        "port": 5600
-    }
+    return video.status()
+
+
+def video_response(broadcast, media_type: str) -> StreamingResponse:
+    if not video.listening:
+        raise HTTPException(status_code=503, detail=video.error or "Video gateway disabled")
+    return StreamingResponse(broadcast.stream(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/video-stream")
+@app.get("/api/video/mp4")
+async def get_video_mp4():
+    return video_response(video.mp4, "video/mp4")
+
+
+@app.get("/api/video/h264")
+async def get_video_h264():
+    return video_response(video.h264, "video/h264")
+
+
+@app.get("/api/video/mjpeg")
+async def get_video_mjpeg():
+    if video.encoder is None:
+        raise HTTPException(status_code=503, detail="MJPEG needs the av and opencv-python packages")
+    return video_response(video.mjpeg, MJPEG_MEDIA_TYPE)
 
 # -----------------------------
 # Socket.IO Handlers & Tasks
 # -----------------------------
-@sio.event
-async def connect(sid, environ):
-    print(f"Client connected: {sid}")
+class VehicleNamespace(socketio.AsyncNamespace):
+    """Telemetry subscriptions for one vehicle.
+
+    Each vehicle is served on ``/vehicles/<system id>``; the default namespace
+    ``/`` serves the default vehicle.
+    """
+
+    def __init__(self, namespace: str, vehicle: Vehicle):
+        super().__init__(namespace)
+        self.vehicle = vehicle
+
+    async def on_connect(self, sid, environ, auth=None):
+        print(f"Client connected: {sid} ({self.namespace})")
+        socket_namespaces[sid] = self.namespace
+        # Subscription may come in the Socket.IO auth payload or the query string;
+        # without one the client gets every topic, as before.
+        self.vehicle.clients.add(sid, auth or environ.get("QUERY_STRING", ""))
+
+    async def on_disconnect(self, sid):
+        self.vehicle.clients.remove(sid)
+        socket_namespaces.pop(sid, None)
+
+    async def on_subscribe(self, sid, data):
+        """Add or re-rate topics, e.g. {"topics": {"attitude": 10, "battery": 1}}.
+
+        ``{"snapshot": true}`` switches the client to one combined "telemetry"
+        event per send; add ``"delta": true`` to receive only changed fields.
+        ``"encoding"`` may be "json", "msgpack" or "struct" (binary frames).
+        """
+        clients = self.vehicle.clients
+        reply = clients.set_mode(sid, data)
+        if isinstance(data, dict) and "topics" in data:
+            subscription = parse_subscription(data, TELEMETRY_TOPICS)
+            reply["topics"] = clients.subscribe(sid, subscription)
+        else:
+            reply["topics"] = dict(clients.sessions[sid].subscription)
+        return reply
+
+    async def on_unsubscribe(self, sid, data):
+        topics = data.get("topics", []) if isinstance(data, dict) else data
+        return {"topics": self.vehicle.clients.unsubscribe(sid, topics)}
+
+
+sio.register_namespace(VehicleNamespace("/", vehicles.default))
+for _vehicle in vehicles:
+    sio.register_namespace(VehicleNamespace(f"/vehicles/{_vehicle.system_id}", _vehicle))
+
+
+@vehicle_router.get("/telemetry/clients")
+async def get_telemetry_clients(vehicle: Vehicle = Depends(get_vehicle)):
+    return {sid: session.stats() for sid, session in vehicle.clients.sessions.items()}
+
+
+@vehicle_router.get("/telemetry/streams")
+async def get_telemetry_streams(vehicle: Vehicle = Depends(get_vehicle)):
+    if not vehicle.controller:
+        return []
+    return vehicle.controller.stream_status()
+
+
+@vehicle_router.put("/telemetry/streams/{topic}")
+async def put_telemetry_stream(topic: str, payload: StreamRate, vehicle: Vehicle = Depends(get_vehicle)):
+    controller = vehicle.controller
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not available")
+    if topic not in TELEMETRY_STREAMS:
+        raise HTTPException(status_code=404, detail=f"Unknown stream '{topic}'")
+    applied = await controller.set_stream_rate(topic, payload.rate_hz)
+    return {"status": "applied" if applied else "saved", "topic": topic, "rate_hz": payload.rate_hz}
+
+
+@vehicle_router.get("/telemetry/{topic}")
+async def get_telemetry_history(
+    topic: str,
+    since: float | None = Query(None, description="Unix time; negative means seconds before now"),
+    until: float | None = Query(None, description="Unix time; negative means seconds before now"),
+    decimate: int | None = Query(None, gt=2, le=MAX_POINTS, description="Maximum number of points to return"),
+    method: str = Query("lttb", description="Decimation method: lttb or minmax"),
+    field: str | None = Query(None, description="Field that drives decimation"),
+    vehicle: Vehicle = Depends(get_vehicle),
+):
+    """Columnar history window of a telemetry topic."""
+    buffer = vehicle.history.buffers.get(topic)
+    if buffer is not None:
+        vehicle.keep_streaming(topic)  # a chart polling the window wants new rows
+    return await history_query(vehicle.history, buffer.fields if buffer is not None else None, time.time(),
+                         topic, since, until, decimate, method, field)
+
+
+# Ingested logs ---------------------------------------------------
+# Archives written by ``python -m api.log_ingest`` (memory-mapped on first use)
+ARCHIVE_DIR = os.environ.get("CONTROL_STATION_ARCHIVE_DIR", "flight_archive")
+archives: dict[str, TelemetryArchive] = {}
+
+
+def get_archive(name: str) -> TelemetryArchive:
+    if name not in archives:
+        path = os.path.join(ARCHIVE_DIR, os.path.basename(name))
+        if not os.path.isfile(os.path.join(path, "meta.json")):
+            raise HTTPException(status_code=404, detail=f"Unknown archive '{name}'")
+        archives[name] = TelemetryArchive.load(path)
+    return archives[name]
+
+
+@app.get("/api/archive")
+async def list_archives():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(name for name in os.listdir(ARCHIVE_DIR)
+                  if os.path.isfile(os.path.join(ARCHIVE_DIR, name, "meta.json")))
+
+
+@app.get("/api/archive/{name}")
+async def get_archive_info(name: str):
+    archive = get_archive(name)
+    return {**archive.meta, "start": archive.start_time, "end": archive.end_time}
+
+
+@app.get("/api/archive/{name}/{topic}")
+async def get_archive_history(
+    name: str,
+    topic: str,
+    since: float | None = Query(None, description="Log time; negative means seconds before the end"),
+    until: float | None = Query(None, description="Log time; negative means seconds before the end"),
+    decimate: int | None = Query(None, gt=2, le=MAX_POINTS, description="Maximum number of points to return"),
+    method: str = Query("lttb", description="Decimation method: lttb or minmax"),
+    field: str | None = Query(None, description="Field that drives decimation"),
+):
+    """Columnar window of an ingested log, same shape as the live history."""
+    archive = get_archive(name)
+    return await history_query(archive, archive.fields.get(topic), archive.end_time,
+                         topic, since, until, decimate, method, field)
+
+
+# Vehicle registry ------------------------------------------------
+@app.get("/api/vehicles")
+async def get_vehicles():
+    return [vehicle.summary() for vehicle in vehicles]
 
 
-async def emit_loop():
-    """Periodically push telemetry to all connected clients."""
-    while True:
-        await sio.emit("velocity", drone_data["velocity"])
-        await sio.emit("battery", drone_data["battery"])
-        await sio.emit("health", drone_data["health"])
-        await sio.emit("position", drone_data["position"])
-        await sio.emit("attitude", drone_data["attitude"])
-        await asyncio.sleep(1)  # 1 Hz
+app.include_router(vehicle_router, prefix="/api/vehicles/{vehicle_id}")
+app.include_router(vehicle_router, prefix="/api")
 
 
 # -----------------------------
@@ -180,10 +782,27 @@ async def emit_loop():
 # -----------------------------
 @app.on_event("startup")
 async def _on_startup():
-    global controller
-    controller = DroneController(drone_data)
-    asyncio.create_task(controller.run())
-    asyncio.create_task(emit_loop())
+    global replay
+    telemetry_log.setup_logging()
+    if VIDEO_PORT:
+        await video.start()
+    if REPLAY_PATH:
+        replay = FlightLogReplay(
+            vehicles.default.state, REPLAY_PATH,
+            speed=float(os.environ.get("CONTROL_STATION_REPLAY_SPEED", "1")),
+            loop=os.environ.get("CONTROL_STATION_REPLAY_LOOP", "0") == "1",
+        )
+        asyncio.create_task(replay.run())
+        return
+    for vehicle in vehicles:
+        asyncio.create_task(vehicle.start())
+
+@app.on_event("shutdown")
+async def _on_shutdown():
+    video.stop()
+    for vehicle in vehicles:
+        vehicle.stop()
+    telemetry_log.shutdown_logging()
 
 # -----------------------------
 # Entrypoint
@@ -0,0 +1,452 @@
+"""Bulk ingestion of MAVLink telemetry logs (``.tlog``) and PX4 ULogs (``.ulg``).
+
+Both formats are ingested in two passes. The first pass walks the record
+headers only and collects offsets. The second pass runs once per selected
+message type: it gathers all payloads of that type into one ``(n, size)``
+byte matrix, zero-pads truncated MAVLink 2 payloads, and reinterprets the
+matrix as a NumPy structured array with the message's wire layout. Each
+field is then a column, and the conversion to the API's telemetry schema is
+plain array arithmetic. No message is decoded on its own.
+
+The result is a ``TelemetryArchive``: one float64 ``(t, *fields)`` array
+per topic, the same row layout ``TelemetryHistory`` keeps in memory. An
+archive can be saved as ``.npy`` files and memory-mapped back, queried like
+the history API, and replayed through ``FlightLogReplay``.
+
+    python -m api.log_ingest flight.tlog -o flight_archive/flight1
+"""
+import argparse
+import json
+import os
+import re
+import time
+from array import array
+
+import numpy as np
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.flight_log import INDEX_DTYPE, KIND_TELEMETRY, FlightLogReader
+from api.mavlink_router import MESSAGE_IDS
+from api.telemetry_history import query_rows
+from api.telemetry_state import TELEMETRY_SCHEMA
+
+GATHER_BLOCK = 1 << 16  # rows gathered per block, bounds the index matrix size
+
+
+def numeric_fields(topic: str) -> tuple[str, ...]:
+    """Fields of ``topic`` that an archive keeps (the numeric ones)"""
+    return tuple(name for name, default in TELEMETRY_SCHEMA[topic].items()
+                 if isinstance(default, (int, float)))
+
+
+def _gather(data: np.ndarray, starts: np.ndarray, lengths: np.ndarray, itemsize: int) -> np.ndarray:
+    """``(n, itemsize)`` bytes copied from ``data[start:start + length]``, zero-padded"""
+    out = np.zeros((len(starts), itemsize), dtype=np.uint8)
+    columns = np.arange(itemsize)
+    last = len(data) - 1
+    for lo in range(0, len(starts), GATHER_BLOCK):
+        hi = lo + GATHER_BLOCK
+        index = starts[lo:hi, None] + columns
+        block = data[np.minimum(index, last)]
+        block[columns >= lengths[lo:hi, None]] = 0
+        out[lo:hi] = block
+    return out
+
+
+def _records(data, starts, lengths, dtype: np.dtype) -> np.ndarray:
+    raw = _gather(data, starts, lengths, dtype.itemsize)
+    return raw.view(dtype).ravel()
+
+
+class TelemetryArchive:
+    """Columnar telemetry of one log: ``rows[topic]`` is ``(n, 1 + fields)`` float64"""
+
+    def __init__(self, rows: dict[str, np.ndarray], meta: dict | None = None):
+        self.rows = rows
+        self.meta = meta or {}
+        self.fields = {topic: numeric_fields(topic) for topic in rows}
+
+    @property
+    def topics(self) -> tuple[str, ...]:
+        return tuple(self.rows)
+
+    @property
+    def start_time(self) -> float:
+        return min((float(r[0, 0]) for r in self.rows.values() if len(r)), default=0.0)
+
+    @property
+    def end_time(self) -> float:
+        return max((float(r[-1, 0]) for r in self.rows.values() if len(r)), default=0.0)
+
+    def query(self, topic: str, since: float | None = None, until: float | None = None,
+              points: int | None = None, method: str = "lttb", field: str | None = None) -> dict:
+        """Same result as ``TelemetryHistory.query``"""
+        return query_rows(topic, self.window(topic, since, until), self.fields[topic], points, method, field)
+
+    def window(self, topic: str, since: float | None = None, until: float | None = None) -> np.ndarray:
+        """Rows of ``topic`` in the window (a view; archives are never written)"""
+        rows = self.rows[topic]
+        t = rows[:, 0]
+        lo = 0 if since is None else np.searchsorted(t, since, side="left")
+        hi = len(t) if until is None else np.searchsorted(t, until, side="right")
+        return rows[lo:hi]
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for topic, rows in self.rows.items():
+            np.save(os.path.join(directory, f"{topic}.npy"), rows)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({**self.meta, "topics": {t: len(r) for t, r in self.rows.items()}}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "TelemetryArchive":
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        rows = {topic: np.load(os.path.join(directory, f"{topic}.npy"), mmap_mode="r" if mmap else None)
+                for topic in meta["topics"]}
+        return cls(rows, meta)
+
+
+def _topic_rows(t: np.ndarray, columns) -> np.ndarray:
+    rows = np.empty((len(t), 1 + len(columns)))
+    rows[:, 0] = t
+    for i, column in enumerate(columns, start=1):
+        rows[:, i] = column
+    if len(t) > 1 and np.any(np.diff(t) < 0):
+        rows = rows[np.argsort(t, kind="stable")]
+    return rows
+
+
+# -----------------------------
+# MAVLink telemetry logs
+# -----------------------------
+_FORMAT_TOKEN = re.compile(r"(\d*)([a-zA-Z?])")
+_STRUCT_TO_NUMPY = {"b": "i1", "B": "u1", "h": "<i2", "H": "<u2", "i": "<i4", "I": "<u4",
+                    "q": "<i8", "Q": "<u8", "f": "<f4", "d": "<f8", "c": "S1"}
+
+
+def mavlink_dtype(message_class) -> np.dtype:
+    """Wire layout of a pymavlink message class as a packed structured dtype"""
+    tokens = _FORMAT_TOKEN.findall(message_class.unpacker.format.lstrip("<"))
+    fields = []
+    for name, (count, code) in zip(message_class.ordered_fieldnames, tokens):
+        count = int(count) if count else 1
+        if code == "s":
+            fields.append((name, f"S{count}"))
+        elif count > 1:
+            fields.append((name, _STRUCT_TO_NUMPY[code], (count,)))
+        else:
+            fields.append((name, _STRUCT_TO_NUMPY[code]))
+    return np.dtype(fields)
+
+
+def _mavlink_attitude(m):
+    roll, pitch, yaw = (np.degrees(m[name].astype(np.float64)) for name in ("roll", "pitch", "yaw"))
+    return roll, pitch, yaw, (yaw + 360.0) % 360.0
+
+
+def _mavlink_battery(m):
+    cells = m["voltages"].astype(np.float64)
+    voltage = np.where(m["voltages"] != 0xFFFF, cells, 0.0).sum(axis=1) / 1000.0
+    temperature = np.where(m["temperature"] != 0x7FFF, m["temperature"] / 100.0, 25.0)
+    return np.maximum(m["battery_remaining"], 0), voltage, temperature
+
+
+def _mavlink_rc(m):
+    rssi = np.where(m["rssi"] == 255, 0.0, m["rssi"] * 100.0 / 254.0)
+    return m["chancount"] > 0, rssi
+
+
+# topic -> (MAVLink message, vectorised converter to numeric_fields(topic))
+MAVLINK_TOPICS = {
+    "position": ("GLOBAL_POSITION_INT", lambda m: (m["lat"] / 1e7, m["lon"] / 1e7, m["alt"] / 1000.0)),
+    "velocity": ("LOCAL_POSITION_NED", lambda m: (m["vx"], m["vy"], m["vz"])),
+    "attitude": ("ATTITUDE", _mavlink_attitude),
+    "battery": ("BATTERY_STATUS", _mavlink_battery),
+    "gps_info": ("GPS_RAW_INT", lambda m: (m["satellites_visible"],)),
+    "home": ("HOME_POSITION", lambda m: (m["latitude"] / 1e7, m["longitude"] / 1e7, m["altitude"] / 1000.0)),
+    "rc_status": ("RC_CHANNELS", _mavlink_rc),
+}
+
+
+def scan_tlog(buf: bytes) -> np.ndarray:
+    """Offsets of the ``timestamp + frame`` records in a tlog (header walk only)"""
+    offsets = array("q")
+    append = offsets.append
+    i, end = 0, len(buf)
+    while i + 16 <= end:
+        magic = buf[i + 8]
+        if magic == 0xFD:
+            size = 12 + buf[i + 9] + (13 if buf[i + 10] & 1 else 0)
+        elif magic == 0xFE:
+            size = 8 + buf[i + 9]
+        else:
+            i += 1  # resynchronise on garbage
+            continue
+        if i + 8 + size > end:
+            break
+        append(i)
+        i += 8 + size
+    return np.frombuffer(offsets, dtype=np.int64)
+
+
+def ingest_tlog(path: str, system_id: int | None = None, topics=None) -> TelemetryArchive:
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        buf = f.read()
+    data = np.frombuffer(buf, dtype=np.uint8)
+    offsets = scan_tlog(buf)
+    frame = offsets + 8
+    v2 = data[frame] == 0xFD
+    length = data[frame + 1].astype(np.int64)
+    sysid = np.where(v2, data[frame + 5], data[frame + 3])
+    msgid = np.where(
+        v2,
+        data[frame + 7].astype(np.int64) | data[frame + 8].astype(np.int64) << 8
+        | data[frame + 9].astype(np.int64) << 16,
+        data[frame + 5],
+    )
+    payload = frame + np.where(v2, 10, 6)
+    # Big-endian microsecond timestamps written by the GCS
+    stamp_bytes = _gather(data, offsets, np.full(len(offsets), 8), 8)
+    t = stamp_bytes.view(">u8").ravel() / 1e6
+
+    selected = {topic: MAVLINK_TOPICS[topic] for topic in (topics or MAVLINK_TOPICS)}
+    ids = {name: MESSAGE_IDS[name] for name, _ in selected.values()}
+    if system_id is None:
+        wanted = np.isin(msgid, [ids[name] for name, _ in selected.values()])
+        candidates = sysid[wanted & (sysid != 255)]
+        system_id = int(np.bincount(candidates).argmax()) if len(candidates) else 1
+    from_vehicle = sysid == system_id
+
+    rows, counts = {}, {}
+    for topic, (name, convert) in selected.items():
+        mask = from_vehicle & (msgid == ids[name])
+        if not mask.any():
+            continue
+        message_class = mavlink.mavlink_map[ids[name]]
+        records = _records(data, payload[mask], length[mask], mavlink_dtype(message_class))
+        rows[topic] = _topic_rows(t[mask], convert(records))
+        counts[name] = int(mask.sum())
+    elapsed = time.perf_counter() - started
+    return TelemetryArchive(rows, {
+        "source": os.path.abspath(path), "format": "tlog", "time_base": "utc",
+        "system_id": system_id, "messages": len(offsets), "decoded": counts,
+        "ingest_seconds": round(elapsed, 3),
+    })
+
+
+# -----------------------------
+# PX4 ULog
+# -----------------------------
+ULOG_MAGIC = b"ULog\x01\x12\x35"
+_ULOG_TYPES = {"int8_t": "i1", "uint8_t": "u1", "int16_t": "<i2", "uint16_t": "<u2",
+               "int32_t": "<i4", "uint32_t": "<u4", "int64_t": "<i8", "uint64_t": "<u8",
+               "float": "<f4", "double": "<f8", "bool": "u1", "char": "S1"}
+_ULOG_FIELD = re.compile(r"^([\w]+)(?:\[(\d+)\])?\s+(\w+)$")
+
+
+def _ulog_dtype(name: str, formats: dict[str, str], cache: dict) -> np.dtype:
+    if name in cache:
+        return cache[name]
+    fields = []
+    for item in filter(None, formats[name].split(";")):
+        match = _ULOG_FIELD.match(item.strip())
+        if not match:
+            raise ValueError(f"Bad ULog field {item!r} in {name}")
+        type_name, count, field = match.groups()
+        base = _ULOG_TYPES.get(type_name) or _ulog_dtype(type_name, formats, cache)
+        fields.append((field, base, (int(count),)) if count else (field, base))
+    cache[name] = np.dtype(fields)
+    return cache[name]
+
+
+def _ulog_attitude(m):
+    w, x, y, z = (m["q"][:, i].astype(np.float64) for i in range(4))
+    roll = np.degrees(np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y)))
+    pitch = np.degrees(np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0)))
+    yaw = np.degrees(np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)))
+    return roll, pitch, yaw, (yaw + 360.0) % 360.0
+
+
+def _ulog_battery(m):
+    names = m.dtype.names
+    temperature = m["temperature"] if "temperature" in names else np.full(len(m), 25.0)
+    return m["remaining"] * 100.0, m["voltage_v"], np.nan_to_num(temperature, nan=25.0)
+
+
+# topic -> (ULog message names in order of preference, vectorised converter)
+ULOG_TOPICS = {
+    "position": (("vehicle_global_position",), lambda m: (m["lat"], m["lon"], m["alt"])),
+    "velocity": (("vehicle_local_position",), lambda m: (m["vx"], m["vy"], m["vz"])),
+    "attitude": (("vehicle_attitude",), _ulog_attitude),
+    "battery": (("battery_status",), _ulog_battery),
+    "gps_info": (("sensor_gps", "vehicle_gps_position"), lambda m: (m["satellites_used"],)),
+    "home": (("home_position",), lambda m: (m["lat"], m["lon"], m["alt"])),
+}
+ULOG_GPS = ("sensor_gps", "vehicle_gps_position")
+
+
+def scan_ulog(buf: bytes):
+    """Formats, subscriptions and the offsets/sizes of all data messages"""
+    if not buf.startswith(ULOG_MAGIC):
+        raise ValueError("Not a ULog file")
+    formats: dict[str, str] = {}
+    subscriptions: dict[int, tuple[str, int]] = {}  # msg_id -> (name, multi_id)
+    offsets, sizes = array("q"), array("q")
+    i, end = 16, len(buf)
+    while i + 3 <= end:
+        size = buf[i] | buf[i + 1] << 8
+        kind = buf[i + 2]
+        body = i + 3
+        if body + size > end:
+            break
+        if kind == 0x44:  # 'D'
+            offsets.append(body)
+            sizes.append(size)
+        elif kind == 0x46:  # 'F'
+            name, _, fields = buf[body:body + size].decode("ascii", "replace").partition(":")
+            formats[name] = fields
+        elif kind == 0x41:  # 'A'
+            multi_id = buf[body]
+            msg_id = buf[body + 1] | buf[body + 2] << 8
+            subscriptions[msg_id] = (buf[body + 3:body + size].decode("ascii", "replace"), multi_id)
+        i = body + size
+    return formats, subscriptions, np.frombuffer(offsets, np.int64), np.frombuffer(sizes, np.int64)
+
+
+def ingest_ulog(path: str, topics=None) -> TelemetryArchive:
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        buf = f.read()
+    data = np.frombuffer(buf, dtype=np.uint8)
+    formats, subscriptions, offsets, sizes = scan_ulog(buf)
+    msg_ids = data[offsets].astype(np.int64) | data[offsets + 1].astype(np.int64) << 8
+    by_name = {name: msg_id for msg_id, (name, multi_id) in subscriptions.items() if multi_id == 0}
+    cache: dict[str, np.dtype] = {}
+
+    def load(name):
+        mask = msg_ids == by_name[name]
+        return _records(data, offsets[mask] + 2, sizes[mask] - 2, _ulog_dtype(name, formats, cache))
+
+    # Boot time -> UTC from the GPS clock, when there is one
+    offset, time_base = 0.0, "boot"
+    for name in ULOG_GPS:
+        if name in by_name:
+            gps = load(name)
+            valid = gps["time_utc_usec"] > 0
+            if valid.any():
+                offset = float(np.median(gps["time_utc_usec"][valid].astype(np.float64)
+                                         - gps["timestamp"][valid]))
+                time_base = "utc"
+            break
+
+    rows, counts = {}, {}
+    for topic in topics or ULOG_TOPICS:
+        names, convert = ULOG_TOPICS[topic]
+        name = next((n for n in names if n in by_name), None)
+        if name is None:
+            continue
+        records = load(name)
+        try:
+            columns = convert(records)
+        except (KeyError, ValueError) as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            continue
+        rows[topic] = _topic_rows((records["timestamp"] + offset) / 1e6, columns)
+        counts[name] = len(records)
+    elapsed = time.perf_counter() - started
+    return TelemetryArchive(rows, {
+        "source": os.path.abspath(path), "format": "ulog", "time_base": time_base,
+        "messages": len(offsets), "decoded": counts, "ingest_seconds": round(elapsed, 3),
+    })
+
+
+def ingest(path: str, **kwargs) -> TelemetryArchive:
+    if path.endswith(".ulg"):
+        return ingest_ulog(path, **kwargs)
+    return ingest_tlog(path, **kwargs)
+
+
+# -----------------------------
+# Replay support
+# -----------------------------
+class ArchiveReader:
+    """``FlightLogReader``-compatible view of an archive for ``FlightLogReplay``.
+
+    All topics are merged into one time-ordered sequence once, then served in
+    fixed-size chunks.
+    """
+
+    def __init__(self, archive: TelemetryArchive, chunk_records: int = 4096):
+        self.archive = archive
+        self.topics = archive.topics
+        lengths = [len(archive.rows[topic]) for topic in self.topics]
+        t = np.concatenate([archive.rows[topic][:, 0] for topic in self.topics]) if lengths else np.empty(0)
+        which = np.repeat(np.arange(len(self.topics)), lengths)
+        position = np.concatenate([np.arange(n) for n in lengths]) if lengths else np.empty(0, np.int64)
+        order = np.argsort(t, kind="stable")
+        self._t, self._which, self._position = t[order], which[order], position[order]
+        starts = np.arange(0, len(order), chunk_records)
+        ends = np.minimum(starts + chunk_records, len(order))
+        self.index = np.zeros(len(starts), dtype=INDEX_DTYPE)
+        self.index["offset"] = starts
+        self.index["count"] = ends - starts
+        if len(starts):
+            self.index["t_first"] = self._t[starts]
+            self.index["t_last"] = self._t[ends - 1]
+        # Restore the state's field types (bool/int) from the schema
+        self._types = {topic: [type(TELEMETRY_SCHEMA[topic][name]) for name in archive.fields[topic]]
+                       for topic in self.topics}
+
+    @property
+    def start_time(self) -> float:
+        return float(self._t[0]) if len(self._t) else 0.0
+
+    @property
+    def end_time(self) -> float:
+        return float(self._t[-1]) if len(self._t) else 0.0
+
+    def find_chunk(self, t: float) -> int:
+        return int(np.searchsorted(self.index["t_last"], t, side="left"))
+
+    def read_chunk(self, chunk: int) -> list:
+        start = int(self.index["offset"][chunk])
+        end = start + int(self.index["count"][chunk])
+        records = []
+        for k in range(start, end):
+            topic = self.topics[self._which[k]]
+            values = self.archive.rows[topic][self._position[k], 1:].tolist()
+            sample = {name: cast(value) for name, cast, value
+                      in zip(self.archive.fields[topic], self._types[topic], values)}
+            records.append((float(self._t[k]), KIND_TELEMETRY, topic, sample))
+        return records
+
+    def close(self):
+        pass
+
+
+def open_log(path: str):
+    """Reader for a ``.cvfl`` flight log, an archive directory, or a raw tlog/ulog"""
+    if os.path.isdir(path):
+        return ArchiveReader(TelemetryArchive.load(path))
+    if path.endswith((".tlog", ".ulg")):
+        return ArchiveReader(ingest(path))
+    return FlightLogReader(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a .tlog or .ulg into a NumPy telemetry archive")
+    parser.add_argument("log")
+    parser.add_argument("-o", "--output", help="archive directory (default: flight_archive/<log name>)")
+    parser.add_argument("--system-id", type=int, help="MAVLink system ID to keep (tlog only)")
+    args = parser.parse_args()
+    kwargs = {"system_id": args.system_id} if args.system_id and not args.log.endswith(".ulg") else {}
+    archive = ingest(args.log, **kwargs)
+    output = args.output or os.path.join("flight_archive", os.path.splitext(os.path.basename(args.log))[0])
+    archive.save(output)
+    meta = archive.meta
+    rate = meta["messages"] / max(meta["ingest_seconds"], 1e-9)
+    print(f"📦 {meta['messages']} messages in {meta['ingest_seconds']} s ({rate:,.0f} msg/s) -> {output}")
+    for topic, rows in archive.rows.items():
+        print(f"   {topic}: {len(rows)} rows")
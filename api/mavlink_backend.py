@@ -0,0 +1,460 @@
+"""Direct MAVLink backend.
+
+``MavlinkSystem`` talks MAVLink over UDP from an asyncio ``DatagramProtocol``
+instead of going through mavsdk_server and gRPC. Like ``SimulatedSystem`` it
+exposes the part of the ``mavsdk.System`` API that ``DroneController`` uses.
+
+Incoming datagrams are split into frames by reading the MAVLink header. Only
+frames whose message ID has a subscriber (plus HEARTBEAT and COMMAND_ACK)
+are handed to pymavlink for decoding; every other message costs a few byte
+lookups.
+"""
+import asyncio
+import math
+import time
+from typing import Callable
+
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.simulator import (Battery, ConnectionState, EulerAngle, FixType, FlightMode,
+                           GpsInfo, Health, Position, RcStatus, VelocityNed)
+
+GCS_SYSTEM_ID = 255
+GCS_COMPONENT_ID = 190
+HEARTBEAT_TIMEOUT = 3.0
+COMMAND_TIMEOUT = 1.0
+COMMAND_RETRIES = 3
+
+MAGIC_V1 = 0xFE
+MAGIC_V2 = 0xFD
+
+MAV_RESULT_ACCEPTED = mavlink.MAV_RESULT_ACCEPTED
+MAV_RESULT_IN_PROGRESS = mavlink.MAV_RESULT_IN_PROGRESS
+MAV_MODE_FLAG_SAFETY_ARMED = mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+MAV_MODE_FLAG_CUSTOM_MODE_ENABLED = mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+
+# PX4 custom_mode: main mode in bits 16-23, auto sub mode in bits 24-31
+PX4_MAIN_MODES = {1: "MANUAL", 2: "ALTCTL", 3: "POSCTL", 5: "ACRO", 6: "OFFBOARD",
+                  7: "STABILIZED", 8: "RATTITUDE"}
+PX4_AUTO_MODES = {1: "READY", 2: "TAKEOFF", 3: "HOLD", 4: "MISSION", 5: "RETURN_TO_LAUNCH",
+                  6: "LAND", 8: "FOLLOW_ME"}
+PX4_MAIN_AUTO = 4
+PX4_MAIN_OFFBOARD = 6
+PX4_AUTO_LOITER = 3
+
+# Position + yaw only
+SETPOINT_TYPE_MASK = (
+    mavlink.POSITION_TARGET_TYPEMASK_VX_IGNORE | mavlink.POSITION_TARGET_TYPEMASK_VY_IGNORE
+    | mavlink.POSITION_TARGET_TYPEMASK_VZ_IGNORE | mavlink.POSITION_TARGET_TYPEMASK_AX_IGNORE
+    | mavlink.POSITION_TARGET_TYPEMASK_AY_IGNORE | mavlink.POSITION_TARGET_TYPEMASK_AZ_IGNORE
+    | mavlink.POSITION_TARGET_TYPEMASK_YAW_RATE_IGNORE
+)
+SETPOINT_RESEND = 0.1  # PX4 leaves offboard if setpoints stop for 0.5 s
+
+SENSOR_GYRO = mavlink.MAV_SYS_STATUS_SENSOR_3D_GYRO
+SENSOR_ACCEL = mavlink.MAV_SYS_STATUS_SENSOR_3D_ACCEL
+SENSOR_MAG = mavlink.MAV_SYS_STATUS_SENSOR_3D_MAG
+SENSOR_GPS = mavlink.MAV_SYS_STATUS_SENSOR_GPS
+
+
+# -----------------------------
+# Message -> sample converters
+# -----------------------------
+def _position(msg):
+    return Position(msg.lat / 1e7, msg.lon / 1e7, msg.alt / 1000.0, msg.relative_alt / 1000.0)
+
+
+def _home(msg):
+    return Position(msg.latitude / 1e7, msg.longitude / 1e7, msg.altitude / 1000.0, 0.0)
+
+
+def _velocity(msg):
+    return VelocityNed(msg.vx, msg.vy, msg.vz)
+
+
+def _attitude(msg):
+    return EulerAngle(math.degrees(msg.roll), math.degrees(msg.pitch), math.degrees(msg.yaw))
+
+
+def _battery(msg):
+    cells = [v for v in msg.voltages if v != 0xFFFF]
+    return Battery(float(max(msg.battery_remaining, 0)), sum(cells) / 1000.0)
+
+
+def _gps_info(msg):
+    return GpsInfo(msg.satellites_visible, FixType(min(msg.fix_type, FixType.RTK_FIXED.value)))
+
+
+def _rc_status(msg):
+    rssi = 0.0 if msg.rssi == 255 else msg.rssi * 100.0 / 254.0
+    return RcStatus(msg.chancount > 0, rssi)
+
+
+def _armed(msg):
+    return bool(msg.base_mode & MAV_MODE_FLAG_SAFETY_ARMED)
+
+
+def _flight_mode(msg):
+    if not msg.base_mode & MAV_MODE_FLAG_CUSTOM_MODE_ENABLED:
+        return FlightMode.UNKNOWN
+    main = (msg.custom_mode >> 16) & 0xFF
+    sub = (msg.custom_mode >> 24) & 0xFF
+    name = PX4_AUTO_MODES.get(sub) if main == PX4_MAIN_AUTO else PX4_MAIN_MODES.get(main)
+    return FlightMode[name] if name else FlightMode.UNKNOWN
+
+
+def _health(msg):
+    ok = msg.onboard_control_sensors_health & msg.onboard_control_sensors_enabled
+    gyro, accel, mag, gps = (bool(ok & bit) for bit in (SENSOR_GYRO, SENSOR_ACCEL, SENSOR_MAG, SENSOR_GPS))
+    return Health(gyro, accel, mag, gps, gps, gps, gyro and accel and gps)
+
+
+# mavsdk telemetry stream -> (MAVLink message ID, converter)
+STREAMS = {
+    "position": (mavlink.MAVLINK_MSG_ID_GLOBAL_POSITION_INT, _position),
+    "velocity_ned": (mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED, _velocity),
+    "attitude_euler": (mavlink.MAVLINK_MSG_ID_ATTITUDE, _attitude),
+    "battery": (mavlink.MAVLINK_MSG_ID_BATTERY_STATUS, _battery),
+    "gps_info": (mavlink.MAVLINK_MSG_ID_GPS_RAW_INT, _gps_info),
+    "home": (mavlink.MAVLINK_MSG_ID_HOME_POSITION, _home),
+    "rc_status": (mavlink.MAVLINK_MSG_ID_RC_CHANNELS, _rc_status),
+    "armed": (mavlink.MAVLINK_MSG_ID_HEARTBEAT, _armed),
+    "flight_mode": (mavlink.MAVLINK_MSG_ID_HEARTBEAT, _flight_mode),
+    "health": (mavlink.MAVLINK_MSG_ID_SYS_STATUS, _health),
+}
+
+ALWAYS_DECODED = {mavlink.MAVLINK_MSG_ID_HEARTBEAT, mavlink.MAVLINK_MSG_ID_COMMAND_ACK}
+
+
+def frames(data: bytes):
+    """Yield ``(offset, size, msgid, sysid)`` for each MAVLink frame in a datagram"""
+    offset, end = 0, len(data)
+    while offset + 8 <= end:
+        magic = data[offset]
+        if magic == MAGIC_V2:
+            length, incompat = data[offset + 1], data[offset + 2]
+            size = 12 + length + (13 if incompat & mavlink.MAVLINK_IFLAG_SIGNED else 0)
+        elif magic == MAGIC_V1:
+            size = 8 + data[offset + 1]
+        else:
+            return  # not MAVLink; drop the rest of the datagram
+        if offset + size > end:
+            return  # truncated; check before reading the header past byte 8
+        if magic == MAGIC_V2:
+            sysid = data[offset + 5]
+            msgid = data[offset + 7] | data[offset + 8] << 8 | data[offset + 9] << 16
+        else:
+            sysid = data[offset + 3]
+            msgid = data[offset + 5]
+        yield offset, size, msgid, sysid
+        offset += size
+
+
+class _Latest:
+    """Single-slot mailbox: a slow reader only ever gets the newest sample"""
+
+    __slots__ = ("value", "event")
+
+    def __init__(self):
+        self.value = None
+        self.event = asyncio.Event()
+
+    def put(self, value):
+        self.value = value
+        self.event.set()
+
+    async def get(self):
+        await self.event.wait()
+        self.event.clear()
+        return self.value
+
+
+class MavlinkProtocol(asyncio.DatagramProtocol):
+    """UDP endpoint that decodes only the subscribed message types"""
+
+    def __init__(self, system: "MavlinkSystem"):
+        self.system = system
+        self.transport = None
+        self.remote = None
+        self.mav = mavlink.MAVLink(self, srcSystem=GCS_SYSTEM_ID, srcComponent=GCS_COMPONENT_ID)
+        self.received = 0
+        self.decoded = 0
+        self.errors = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def write(self, buf):
+        """File interface for ``mavlink.MAVLink``: send to the vehicle"""
+        if self.transport and self.remote:
+            self.transport.sendto(buf, self.remote)
+
+    def datagram_received(self, data, addr):
+        system = self.system
+        wanted = system.wanted_ids
+        target = system.target_system
+        for offset, size, msgid, sysid in frames(data):
+            self.received += 1
+            if msgid not in wanted or (target is not None and sysid != target):
+                continue
+            try:
+                msg = self.mav.decode(bytearray(data[offset:offset + size]))
+            except Exception:
+                self.errors += 1
+                continue
+            self.decoded += 1
+            if msgid == mavlink.MAVLINK_MSG_ID_HEARTBEAT and target is None:
+                if msg.type == mavlink.MAV_TYPE_GCS or msg.autopilot == mavlink.MAV_AUTOPILOT_INVALID:
+                    continue
+                system.target_system = target = sysid
+                system.target_component = msg.get_srcComponent()
+            self.remote = addr
+            system.handle(msgid, msg)
+
+
+class _Core:
+    def __init__(self, system):
+        self._system = system
+
+    async def connection_state(self):
+        system = self._system
+        last = None
+        while True:
+            connected = time.monotonic() - system.last_heartbeat < HEARTBEAT_TIMEOUT
+            if connected != last:
+                last = connected
+                yield ConnectionState(connected)
+            await asyncio.sleep(0.2)
+
+
+class _Telemetry:
+    def __init__(self, system):
+        self._system = system
+
+    async def _set_rate(self, stream: str, rate_hz: float):
+        msgid = STREAMS[stream][0]
+        interval_us = 1e6 / rate_hz if rate_hz > 0 else -1
+        await self._system.command(mavlink.MAV_CMD_SET_MESSAGE_INTERVAL, msgid, interval_us)
+
+    async def set_rate_position(self, rate_hz):
+        await self._set_rate("position", rate_hz)
+
+    async def set_rate_velocity_ned(self, rate_hz):
+        await self._set_rate("velocity_ned", rate_hz)
+
+    async def set_rate_battery(self, rate_hz):
+        await self._set_rate("battery", rate_hz)
+
+    async def set_rate_attitude_euler(self, rate_hz):
+        await self._set_rate("attitude_euler", rate_hz)
+
+    async def set_rate_gps_info(self, rate_hz):
+        await self._set_rate("gps_info", rate_hz)
+
+    async def set_rate_home(self, rate_hz):
+        await self._set_rate("home", rate_hz)
+
+    async def set_rate_rc_status(self, rate_hz):
+        await self._set_rate("rc_status", rate_hz)
+
+    def position(self):
+        return self._system.subscribe("position")
+
+    def velocity_ned(self):
+        return self._system.subscribe("velocity_ned")
+
+    def attitude_euler(self):
+        return self._system.subscribe("attitude_euler")
+
+    def battery(self):
+        return self._system.subscribe("battery")
+
+    def gps_info(self):
+        return self._system.subscribe("gps_info")
+
+    def home(self):
+        return self._system.subscribe("home")
+
+    def rc_status(self):
+        return self._system.subscribe("rc_status")
+
+    def armed(self):
+        return self._system.subscribe("armed")
+
+    def flight_mode(self):
+        return self._system.subscribe("flight_mode")
+
+    def health(self):
+        return self._system.subscribe("health")
+
+
+class _Action:
+    def __init__(self, system):
+        self._system = system
+
+    async def arm(self):
+        await self._system.command(mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 1)
+
+    async def disarm(self):
+        await self._system.command(mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0)
+
+    async def takeoff(self):
+        # NaN altitude: PX4 uses MIS_TAKEOFF_ALT
+        nan = float("nan")
+        await self._system.command(mavlink.MAV_CMD_NAV_TAKEOFF, nan, 0, 0, nan, nan, nan, nan)
+
+    async def land(self):
+        nan = float("nan")
+        await self._system.command(mavlink.MAV_CMD_NAV_LAND, 0, 0, 0, nan, nan, nan, nan)
+
+    async def return_to_launch(self):
+        await self._system.command(mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH)
+
+
+class _Offboard:
+    def __init__(self, system):
+        self._system = system
+        self._setpoint = None
+        self._task: asyncio.Task | None = None
+
+    def _send(self):
+        system = self._system
+        sp = self._setpoint
+        system.protocol.mav.set_position_target_local_ned_send(
+            int(time.monotonic() * 1000) & 0xFFFFFFFF, system.target_system or 1,
+            system.target_component, mavlink.MAV_FRAME_LOCAL_NED, SETPOINT_TYPE_MASK,
+            sp.north_m, sp.east_m, sp.down_m, 0, 0, 0, 0, 0, 0, math.radians(sp.yaw_deg), 0)
+
+    async def _resend(self):
+        while True:
+            self._send()
+            await asyncio.sleep(SETPOINT_RESEND)
+
+    async def set_position_ned(self, setpoint):
+        self._setpoint = setpoint
+        self._send()
+
+    async def start(self):
+        if self._setpoint is None:
+            raise RuntimeError("Offboard start needs a setpoint first")
+        if self._task is None:
+            self._task = asyncio.create_task(self._resend())
+        await self._system.command(mavlink.MAV_CMD_DO_SET_MODE,
+                                   MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, PX4_MAIN_OFFBOARD)
+
+    async def stop(self):
+        await self._system.command(mavlink.MAV_CMD_DO_SET_MODE, MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
+                                   PX4_MAIN_AUTO, PX4_AUTO_LOITER)
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+class MavlinkSystem:
+    """Drop-in replacement for ``mavsdk.System`` speaking MAVLink directly"""
+
+    def __init__(self, address: str | None = None, system_id: int | None = None):
+        self.address = address
+        self.target_system = system_id
+        self.target_component = mavlink.MAV_COMP_ID_AUTOPILOT1
+        self.protocol = MavlinkProtocol(self)
+        self.last_heartbeat = float("-inf")
+        self.wanted_ids = set(ALWAYS_DECODED)
+        self._subscribers: dict[str, list[_Latest]] = {}
+        self._handlers: dict[int, list[tuple[str, Callable]]] = {}
+        self._acks: dict[int, list[asyncio.Future]] = {}  # oldest first
+        self._tasks: list[asyncio.Task] = []
+        self.core = _Core(self)
+        self.telemetry = _Telemetry(self)
+        self.action = _Action(self)
+        self.offboard = _Offboard(self)
+
+    async def connect(self, system_address: str = "udp://:14540"):
+        """Bind the UDP port the autopilot sends to (``udp://[host]:port``)"""
+        address = self.address or system_address
+        host, _, port = address.split("://", 1)[-1].rpartition(":")
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self.protocol, local_addr=(host or "0.0.0.0", int(port)))
+        self._tasks.append(loop.create_task(self._heartbeat()))
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self.protocol.transport:
+            self.protocol.transport.close()
+
+    async def _heartbeat(self):
+        """Announce ourselves as a GCS so the autopilot keeps the link up"""
+        while True:
+            self.protocol.mav.heartbeat_send(mavlink.MAV_TYPE_GCS, mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0)
+            await asyncio.sleep(1.0)
+
+    # Telemetry fan-out ------------------------------------------------
+    def handle(self, msgid: int, msg):
+        if msgid == mavlink.MAVLINK_MSG_ID_HEARTBEAT:
+            self.last_heartbeat = time.monotonic()
+        elif msgid == mavlink.MAVLINK_MSG_ID_COMMAND_ACK:
+            waiting = self._acks.get(msg.command)
+            if waiting and msg.result != MAV_RESULT_IN_PROGRESS:
+                future = waiting.pop(0)
+                if not future.done():
+                    future.set_result(msg.result)
+            return
+        for stream, convert in self._handlers.get(msgid, ()):
+            sample = convert(msg)
+            for mailbox in self._subscribers[stream]:
+                mailbox.put(sample)
+
+    def _refresh_handlers(self):
+        handlers: dict[int, list] = {}
+        for stream, mailboxes in self._subscribers.items():
+            if mailboxes:
+                msgid, convert = STREAMS[stream]
+                handlers.setdefault(msgid, []).append((stream, convert))
+        self._handlers = handlers
+        self.wanted_ids = ALWAYS_DECODED | set(handlers)
+
+    async def subscribe(self, stream: str):
+        """Async generator of converted samples for one telemetry stream"""
+        mailbox = _Latest()
+        self._subscribers.setdefault(stream, []).append(mailbox)
+        self._refresh_handlers()
+        try:
+            while True:
+                yield await mailbox.get()
+        finally:
+            self._subscribers[stream].remove(mailbox)
+            self._refresh_handlers()
+
+    # Commands ---------------------------------------------------------
+    async def command(self, command: int, *params):
+        """Send COMMAND_LONG and wait for its ACK; raises if it is not accepted"""
+        params = (list(params) + [0] * 7)[:7]
+        future = asyncio.get_running_loop().create_future()
+        waiting = self._acks.setdefault(command, [])
+        waiting.append(future)
+        try:
+            for attempt in range(COMMAND_RETRIES):
+                self.protocol.mav.command_long_send(
+                    self.target_system or 1, self.target_component, command, attempt, *params)
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(future), COMMAND_TIMEOUT)
+                    break
+                except asyncio.TimeoutError:
+                    continue
+            else:
+                raise RuntimeError(f"Command {command} timed out")
+        finally:
+            if future in waiting:
+                waiting.remove(future)
+        if result != MAV_RESULT_ACCEPTED:
+            raise RuntimeError(f"Command {command} rejected (result {result})")
+
+    def stats(self) -> dict:
+        return {
+            "received": self.protocol.received,
+            "decoded": self.protocol.decoded,
+            "errors": self.protocol.errors,
+            "target_system": self.target_system,
+        }
@@ -0,0 +1,165 @@
+"""Asyncio MAVLink router.
+
+Owns the UDP link to the vehicle and fans its packets out to local endpoints
+(mavsdk_server, QGroundControl, the station's MAVLink backend, ...). Packets
+from any endpoint go back to the vehicle, so every client shares one
+autopilot stream instead of each requesting its own.
+
+Datagrams are forwarded as-is when an endpoint has no filter. With a filter,
+the frames are sliced out of the datagram with ``memoryview`` and only the
+kept ones are joined, which costs one copy. Nothing is decoded.
+"""
+import asyncio
+import time
+
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.mavlink_backend import frames
+
+MESSAGE_IDS = {cls.msgname: msgid for msgid, cls in mavlink.mavlink_map.items()}
+
+
+def message_ids(names) -> set[int]:
+    """``["ATTITUDE", "33"]`` -> ``{30, 33}``"""
+    ids = set()
+    for name in names:
+        name = name.strip().upper()
+        if not name:
+            continue
+        if name.isdigit():
+            ids.add(int(name))
+        elif name in MESSAGE_IDS:
+            ids.add(MESSAGE_IDS[name])
+        else:
+            raise ValueError(f"Unknown MAVLink message {name!r}")
+    return ids
+
+
+class Endpoint(asyncio.DatagramProtocol):
+    """One local MAVLink client, reached from its own UDP socket.
+
+    ``allow`` keeps only the listed message IDs, ``block`` drops them, and
+    ``rates`` caps a message ID at a number of packets per second.
+    """
+
+    def __init__(self, name: str, address: tuple[str, int], allow: set[int] | None = None,
+                 block: set[int] | None = None, rates: dict[int, float] | None = None):
+        self.name = name
+        self.address = address
+        self.allow = allow
+        self.block = block or set()
+        self.min_interval = {msgid: 1.0 / hz for msgid, hz in (rates or {}).items() if hz > 0}
+        self.router: "MavlinkRouter | None" = None
+        self.transport = None
+        self._last_sent: dict[int, float] = {}
+        self.forwarded = 0
+        self.dropped = 0
+        self.uplink = 0
+
+    @property
+    def filtered(self) -> bool:
+        return self.allow is not None or bool(self.block) or bool(self.min_interval)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        # Anything the client sends (commands, setpoints, stream requests)
+        self.uplink += 1
+        self.router.to_vehicle(data)
+
+    def _keep(self, msgid: int, now: float) -> bool:
+        if self.allow is not None and msgid not in self.allow:
+            return False
+        if msgid in self.block:
+            return False
+        interval = self.min_interval.get(msgid)
+        if interval is not None:
+            if now - self._last_sent.get(msgid, float("-inf")) < interval:
+                return False
+            self._last_sent[msgid] = now
+        return True
+
+    def send(self, data: bytes):
+        if self.transport is None:
+            return
+        if not self.filtered:
+            self.transport.sendto(data, self.address)
+            self.forwarded += 1
+            return
+        now = time.monotonic()
+        view = memoryview(data)
+        kept = []
+        total = 0
+        for offset, size, msgid, _ in frames(data):
+            total += 1
+            if self._keep(msgid, now):
+                kept.append(view[offset:offset + size])
+        self.dropped += total - len(kept)
+        self.forwarded += len(kept)
+        if not kept:
+            return
+        if len(kept) == total:
+            self.transport.sendto(data, self.address)
+        else:
+            self.transport.sendto(b"".join(kept), self.address)
+
+    def stats(self) -> dict:
+        return {"address": f"{self.address[0]}:{self.address[1]}", "forwarded": self.forwarded,
+                "dropped": self.dropped, "uplink": self.uplink}
+
+
+class VehicleLink(asyncio.DatagramProtocol):
+    """UDP port the autopilot sends to; the sender address is learnt"""
+
+    def __init__(self, router: "MavlinkRouter"):
+        self.router = router
+        self.transport = None
+        self.remote = None
+        self.received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.remote != addr:
+            print(f"🔗 Vehicle link from {addr[0]}:{addr[1]}")
+            self.remote = addr
+        self.received += 1
+        self.router.from_vehicle(data)
+
+
+class MavlinkRouter:
+    def __init__(self, listen: tuple[str, int], endpoints: list[Endpoint], monitor=None):
+        self.listen = listen
+        self.endpoints = endpoints
+        self.monitor = monitor  # optional callable(data) for local inspection
+        self.link = VehicleLink(self)
+        self.uplink_dropped = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self.link, local_addr=self.listen)
+        for endpoint in self.endpoints:
+            endpoint.router = self
+            await loop.create_datagram_endpoint(lambda e=endpoint: e, local_addr=("0.0.0.0", 0))
+        print(f"🛰️ Routing MAVLink from {self.listen[0]}:{self.listen[1]} to "
+              + ", ".join(f"{e.name} ({e.address[0]}:{e.address[1]})" for e in self.endpoints))
+
+    def from_vehicle(self, data: bytes):
+        for endpoint in self.endpoints:
+            endpoint.send(data)
+        if self.monitor:
+            self.monitor(data)
+
+    def to_vehicle(self, data: bytes):
+        if self.link.remote is None:
+            self.uplink_dropped += 1
+            return
+        self.link.transport.sendto(data, self.link.remote)
+
+    def stats(self) -> dict:
+        return {
+            "vehicle": {"received": self.link.received, "uplink_dropped": self.uplink_dropped},
+            **{endpoint.name: endpoint.stats() for endpoint in self.endpoints},
+        }
@@ -0,0 +1,209 @@
+"""Waypoint missions: validation and vectorised planning.
+
+``plan_mission`` turns a list of ``[lat, lon, alt]`` waypoints (altitude
+relative to home) into a ``MissionPlan``. All per-waypoint numbers come out of
+whole-array NumPy operations:
+
+- north/east offsets from home on the WGS84 tangent plane (through ECEF);
+  down is minus the altitude above home, as in PX4's local frame
+- great-circle (haversine) leg lengths and initial bearings
+- 3D leg lengths and the ETA at each waypoint
+
+A plan can be uploaded through MAVSDK's mission plugin (``to_mavsdk``) or
+flown by the offboard setpoint scheduler (``trajectory``).
+"""
+import time
+
+import numpy as np
+
+from api.setpoint_scheduler import WaypointTrajectory
+
+# WGS84
+EARTH_A = 6378137.0
+EARTH_E2 = 6.69437999014e-3
+EARTH_RADIUS = 6371008.8  # mean radius for great-circle distances
+
+MAX_WAYPOINTS = 10000
+MAX_ALTITUDE_M = 500.0
+MAX_RANGE_M = 20000.0     # from home
+MIN_SPEED, MAX_SPEED = 0.5, 30.0
+
+
+class MissionError(ValueError):
+    """Invalid mission; ``errors`` lists what is wrong"""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _indices(mask: np.ndarray, limit: int = 10) -> str:
+    index = np.flatnonzero(mask)
+    text = ", ".join(str(i) for i in index[:limit])
+    return text + (f" (+{len(index) - limit} more)" if len(index) > limit else "")
+
+
+def geodetic_to_ecef(lat_deg, lon_deg, alt_m) -> np.ndarray:
+    lat = np.radians(lat_deg)
+    lon = np.radians(lon_deg)
+    sin_lat = np.sin(lat)
+    n = EARTH_A / np.sqrt(1.0 - EARTH_E2 * sin_lat ** 2)
+    return np.stack([
+        (n + alt_m) * np.cos(lat) * np.cos(lon),
+        (n + alt_m) * np.cos(lat) * np.sin(lon),
+        (n * (1.0 - EARTH_E2) + alt_m) * sin_lat,
+    ], axis=-1)
+
+
+def geodetic_to_ned(lat_deg, lon_deg, alt_m, home) -> np.ndarray:
+    """``(N, 3)`` north/east/down metres from ``home = (lat, lon, alt)``"""
+    home_lat, home_lon, home_alt = home
+    delta = geodetic_to_ecef(lat_deg, lon_deg, alt_m) - geodetic_to_ecef(home_lat, home_lon, home_alt)
+    lat, lon = np.radians(home_lat), np.radians(home_lon)
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+    rotation = np.array([
+        [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+        [-sin_lon, cos_lon, 0.0],
+        [-cos_lat * cos_lon, -cos_lat * sin_lon, -sin_lat],
+    ])
+    return delta @ rotation.T
+
+
+def great_circle(lat1, lon1, lat2, lon2) -> tuple[np.ndarray, np.ndarray]:
+    """Haversine distance (m) and initial bearing (deg, 0-360) per pair"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    bearing = np.degrees(np.arctan2(
+        np.sin(dlambda) * np.cos(phi2),
+        np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda),
+    )) % 360
+    return distance, bearing
+
+
+class MissionPlan:
+    """Validated waypoints with everything the vehicle and the UI need"""
+
+    def __init__(self, waypoints: np.ndarray, home: tuple[float, float, float], speed: np.ndarray,
+                 loiter: np.ndarray, acceptance_radius: float):
+        self.waypoints = waypoints      # (N, 3) lat, lon, alt above home
+        self.home = home                # lat, lon, absolute alt
+        self.speed = speed              # (N,) m/s on the leg into each waypoint
+        self.loiter = loiter            # (N,) s
+        self.acceptance_radius = acceptance_radius
+        self.created = time.time()
+        lat, lon, alt = waypoints.T
+
+        self.ned = geodetic_to_ned(lat, lon, np.full_like(alt, home[2]), home)
+        self.ned[:, 2] = -alt
+        # Leg i flies from waypoint i-1 (home for i = 0) to waypoint i
+        lat0 = np.concatenate([[home[0]], lat[:-1]])
+        lon0 = np.concatenate([[home[1]], lon[:-1]])
+        self.ground_distance, self.heading = great_circle(lat0, lon0, lat, lon)
+        climb = np.diff(np.concatenate([[0.0], alt]))
+        self.leg_distance = np.hypot(self.ground_distance, climb)
+        self.eta = np.cumsum(self.leg_distance / speed + loiter)
+
+    def __len__(self):
+        return len(self.waypoints)
+
+    @property
+    def distance(self) -> float:
+        return float(self.leg_distance.sum())
+
+    @property
+    def duration(self) -> float:
+        return float(self.eta[-1])
+
+    def summary(self) -> dict:
+        return {
+            "waypoints": len(self),
+            "home": self.home,
+            "distance_m": round(self.distance, 1),
+            "duration_s": round(self.duration, 1),
+            "max_range_m": round(float(np.hypot(self.ned[:, 0], self.ned[:, 1]).max()), 1),
+            "max_altitude_m": float(self.waypoints[:, 2].max()),
+            "created": self.created,
+        }
+
+    def legs(self, start: int = 0, count: int | None = None) -> dict:
+        """Columnar per-waypoint data, like the telemetry history endpoints"""
+        window = slice(start, None if count is None else start + count)
+        return {
+            "fields": ["lat", "lon", "alt", "north", "east", "down", "heading", "leg_m", "eta_s"],
+            "start": start,
+            "columns": [
+                self.waypoints[window, 0].tolist(), self.waypoints[window, 1].tolist(),
+                self.waypoints[window, 2].tolist(),
+                *(np.round(self.ned[window, axis], 2).tolist() for axis in range(3)),
+                np.round(self.heading[window], 1).tolist(),
+                np.round(self.leg_distance[window], 2).tolist(),
+                np.round(self.eta[window], 1).tolist(),
+            ],
+        }
+
+    def to_mavsdk(self):
+        """``mavsdk.mission.MissionPlan`` for the mission plugin"""
+        from mavsdk.mission import MissionItem, MissionPlan as MavsdkMissionPlan
+
+        items = [
+            MissionItem(lat, lon, alt, speed, loiter == 0, float("nan"), float("nan"),
+                        MissionItem.CameraAction.NONE, loiter, float("nan"),
+                        self.acceptance_radius, float("nan"), float("nan"),
+                        MissionItem.VehicleAction.NONE)
+            for (lat, lon, alt), speed, loiter in zip(self.waypoints.tolist(), self.speed.tolist(),
+                                                      self.loiter.tolist())
+        ]
+        return MavsdkMissionPlan(items)
+
+    def trajectory(self) -> WaypointTrajectory:
+        """Offboard trajectory through the NED waypoints at the mean plan speed.
+
+        Starts with a climb over home unless the first waypoint is above it.
+        """
+        points = self.ned
+        if np.hypot(*points[0, :2]) > self.acceptance_radius:
+            points = np.vstack([[0.0, 0.0, points[0, 2]], points])
+        return WaypointTrajectory(points, float(self.speed.mean()))
+
+
+def plan_mission(waypoints, home, speed=5.0, loiter=0.0, acceptance_radius: float = 2.0,
+                 max_range: float = MAX_RANGE_M) -> MissionPlan:
+    """Validate ``[[lat, lon, alt], ...]`` and precompute the plan.
+
+    ``speed`` and ``loiter`` are scalars or one value per waypoint. Raises
+    ``MissionError`` listing every problem found.
+    """
+    points = np.asarray(waypoints, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 3 or not len(points):
+        raise MissionError(["waypoints must be a non-empty list of [lat, lon, alt]"])
+    if len(points) > MAX_WAYPOINTS:
+        raise MissionError([f"at most {MAX_WAYPOINTS} waypoints are supported"])
+    home = tuple(float(v) for v in home)
+    try:
+        speed = np.broadcast_to(np.asarray(speed, dtype=np.float64), len(points)).copy()
+        loiter = np.broadcast_to(np.asarray(loiter, dtype=np.float64), len(points)).copy()
+    except ValueError:
+        raise MissionError(["speed and loiter must be one value or one per waypoint"])
+    lat, lon, alt = points.T
+
+    checks = [
+        (~np.isfinite(points).all(axis=1), "non-finite coordinates"),
+        (np.abs(lat) > 90, "latitude out of range"),
+        (np.abs(lon) > 180, "longitude out of range"),
+        ((alt < 0) | (alt > MAX_ALTITUDE_M), f"altitude outside 0-{MAX_ALTITUDE_M:g} m"),
+        (~((speed >= MIN_SPEED) & (speed <= MAX_SPEED)), f"speed outside {MIN_SPEED:g}-{MAX_SPEED:g} m/s"),
+        (~((loiter >= 0) & np.isfinite(loiter)), "negative loiter time"),
+    ]
+    errors = [f"{message} at waypoint {_indices(mask)}" for mask, message in checks if mask.any()]
+    if not errors:
+        distance, _ = great_circle(home[0], home[1], lat, lon)
+        too_far = distance > max_range
+        if too_far.any():
+            errors.append(f"more than {max_range:g} m from home at waypoint {_indices(too_far)}")
+    if errors:
+        raise MissionError(errors)
+    return MissionPlan(points, home, speed, loiter, acceptance_radius)
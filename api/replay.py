@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from api.flight_log import KIND_TELEMETRY
+from api.log_ingest import open_log
+from api.telemetry_state import TelemetryState
+
+
+class FlightLogReplay:
+    """Play a recorded flight log back into a ``TelemetryState``.
+
+    ``path`` may be a ``.cvfl`` flight log, an ingested archive directory or a
+    raw ``.tlog``/``.ulg`` (ingested on the fly, see ``api.log_ingest``).
+
+    Samples are applied at their recorded spacing divided by ``speed``, so the
+    telemetry bus, Socket.IO fan-out and history see the same update pattern
+    as during the flight. Chunks are read and decompressed in a worker thread,
+    one chunk ahead of playback.
+    """
+
+    def __init__(self, state: TelemetryState, path: str, speed: float = 1.0,
+                 loop: bool = False, start_offset: float = 0.0):
+        self.state = state
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.start_offset = start_offset
+        self.position = 0.0      # seconds into the log
+        self.duration = 0.0
+        self.samples = 0
+        self.late = 0            # samples applied more than 50 ms behind schedule
+        self.running = False
+        self._rebase = False
+
+    def set_speed(self, speed: float):
+        """Change playback speed without jumping in the log"""
+        self.speed = max(speed, 1e-3)
+        self._rebase = True
+
+    def status(self) -> dict:
+        return {
+            "path": self.path,
+            "running": self.running,
+            "speed": self.speed,
+            "loop": self.loop,
+            "position": round(self.position, 3),
+            "duration": round(self.duration, 3),
+            "samples": self.samples,
+            "late": self.late,
+        }
+
+    def _apply(self, topic: str, value):
+        if topic not in self.state.records:
+            return
+        if isinstance(value, dict):
+            self.state.update_fields(topic, value)
+        else:
+            self.state.set(topic, value)
+        self.samples += 1
+
+    async def run(self):
+        self.running = True
+        print(f"⏯️ Replaying {self.path} at {self.speed}x")
+        try:
+            while True:
+                await self._play_once()
+                if not self.loop:
+                    break
+        except Exception as e:
+            print(f"❌ Replay error: {e}")
+        finally:
+            self.running = False
+            print("⏹ Replay finished")
+
+    async def _play_once(self):
+        reader = open_log(self.path)
+        try:
+            log_start = reader.start_time
+            self.duration = reader.end_time - log_start
+            since = log_start + self.start_offset
+            chunk = reader.find_chunk(since)
+            if chunk >= len(reader.index):
+                return
+            clock = time.monotonic
+            anchor_log, anchor_wall = since, clock()
+            executor = asyncio.get_running_loop().run_in_executor
+            pending = executor(None, reader.read_chunk, chunk)
+            while pending is not None:
+                records = await pending
+                chunk += 1
+                pending = executor(None, reader.read_chunk, chunk) if chunk < len(reader.index) else None
+                for t, kind, topic, value in records:
+                    if kind != KIND_TELEMETRY or t < since:
+                        continue
+                    if self._rebase:
+                        anchor_log, anchor_wall = self.position + log_start, clock()
+                        self._rebase = False
+                    delay = anchor_wall + (t - anchor_log) / self.speed - clock()
+                    if delay > 0.001:
+                        await asyncio.sleep(delay)
+                    elif delay < -0.05:
+                        self.late += 1
+                    self.position = t - log_start
+                    self._apply(topic, value)
+                # Let the rest of the loop run even when far behind schedule
+                await asyncio.sleep(0)
+        finally:
+            reader.close()
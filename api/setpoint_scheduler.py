@@ -0,0 +1,254 @@
+"""Fixed-cadence offboard setpoint stream.
+
+PX4 drops out of offboard mode when setpoints arrive slower than 2 Hz, so
+the stream must not depend on how long each send takes or on what else the
+event loop is doing. ``SetpointScheduler`` wakes up on deadlines taken from
+the loop's monotonic clock (``deadline += period``, never ``sleep(period)``
+after the work) and hands each setpoint to a send task. When a send is still
+in flight at the next deadline that tick is skipped rather than queued, and
+a late wake-up realigns to the next deadline instead of bursting.
+
+A trajectory is anything with ``setpoint(t) -> (north, east, down, yaw) | None``,
+where ``t`` is seconds since the trajectory started; ``None`` means done and
+the last setpoint is held.
+"""
+import asyncio
+import math
+import random
+from typing import Awaitable, Callable, Iterable
+
+import numpy as np
+
+Setpoint = tuple[float, float, float, float]  # north, east, down (m), yaw (deg)
+
+STATS_WINDOW = 1024
+
+
+class Hold:
+    """Stay at one setpoint"""
+
+    def __init__(self, point: Setpoint):
+        self.point = tuple(float(v) for v in point)
+
+    def setpoint(self, t: float) -> Setpoint:
+        return self.point
+
+    def summary(self) -> dict:
+        return {"type": "hold", "setpoint": self.point}
+
+
+class WaypointTrajectory:
+    """Fly through NED waypoints in straight lines at ``speed`` m/s.
+
+    Waypoints are ``(north, east, down)`` or ``(north, east, down, yaw)``;
+    without a yaw the vehicle faces along the leg.
+    """
+
+    def __init__(self, waypoints, speed: float = 5.0, loop: bool = False):
+        points = np.asarray(waypoints, dtype=np.float64)
+        if points.ndim != 2 or points.shape[0] < 1 or points.shape[1] not in (3, 4):
+            raise ValueError("waypoints must be a list of [north, east, down(, yaw)]")
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        if loop and len(points) > 1:
+            points = np.vstack([points, points[:1]])
+        self.points = points[:, :3]
+        self.speed = speed
+        self.loop = loop
+        legs = np.diff(self.points, axis=0)
+        lengths = np.linalg.norm(legs, axis=1)
+        # Cumulative distance at each waypoint
+        self.distance = np.concatenate([[0.0], np.cumsum(lengths)])
+        if points.shape[1] == 4:
+            self.yaw = points[:, 3]
+        else:
+            heading = np.degrees(np.arctan2(legs[:, 1], legs[:, 0])) % 360 if len(legs) else np.zeros(0)
+            # Each waypoint keeps the heading of the leg that leaves it
+            self.yaw = np.append(heading, heading[-1] if len(heading) else 0.0)
+
+    @property
+    def length(self) -> float:
+        return float(self.distance[-1])
+
+    @property
+    def duration(self) -> float:
+        return self.length / self.speed
+
+    def setpoint(self, t: float) -> Setpoint | None:
+        s = self.speed * t
+        if s > self.length:
+            if not self.loop or self.length == 0:
+                return None
+            s %= self.length
+        leg = min(int(np.searchsorted(self.distance, s, side="right")) - 1, len(self.points) - 1)
+        north, east, down = (np.interp(s, self.distance, self.points[:, axis]) for axis in range(3))
+        return float(north), float(east), float(down), float(self.yaw[leg])
+
+    def summary(self) -> dict:
+        return {"type": "waypoints", "waypoints": len(self.points), "speed": self.speed,
+                "loop": self.loop, "length_m": self.length, "duration_s": self.duration}
+
+
+class GeneratorTrajectory:
+    """Take the next setpoint from an iterable on every tick"""
+
+    def __init__(self, setpoints: Iterable[Setpoint], name: str = "generator"):
+        self.setpoints = iter(setpoints)
+        self.name = name
+
+    def setpoint(self, t: float) -> Setpoint | None:
+        return next(self.setpoints, None)
+
+    def summary(self) -> dict:
+        return {"type": self.name}
+
+
+def random_walk(altitude: float, step: float = 1.5, seed: int | None = None):
+    """Wander around the take-off point, facing away from it"""
+    rng = random.Random(seed)
+    north = east = 0.0
+    while True:
+        north += rng.uniform(-step, step)
+        east += rng.uniform(-step, step)
+        yaw = (math.degrees(math.atan2(east, north)) + 360) % 360
+        yield north, east, -altitude, yaw
+
+
+class _Window:
+    """Last ``STATS_WINDOW`` durations, summarised in milliseconds"""
+
+    def __init__(self):
+        self.values = np.zeros(STATS_WINDOW)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.values[self.count % STATS_WINDOW] = seconds
+        self.count += 1
+
+    def summary(self) -> dict:
+        values = self.values[:min(self.count, STATS_WINDOW)] * 1000
+        if not len(values):
+            return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(values.max()), 3)}
+
+
+class SetpointScheduler:
+    def __init__(self, send: Callable[[Setpoint], Awaitable], rate_hz: float = 10.0,
+                 trajectory=None):
+        self.send = send            # async send(setpoint)
+        self.rate_hz = rate_hz
+        self.trajectory = trajectory
+        self.last: Setpoint | None = None
+        self._started_at = 0.0      # loop time the trajectory started
+        self._inflight: asyncio.Task | None = None
+        self._task: asyncio.Task | None = None
+        self.reset_stats()
+
+    @property
+    def period(self) -> float:
+        return 1.0 / self.rate_hz
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_rate(self, rate_hz: float):
+        if rate_hz <= 0:
+            raise ValueError("rate must be positive")
+        self.rate_hz = rate_hz
+
+    def set_trajectory(self, trajectory):
+        """Switch trajectories at the next tick; ``None`` holds the last setpoint"""
+        if trajectory is None and self.last is not None:
+            trajectory = Hold(self.last)
+        self.trajectory = trajectory
+        self._started_at = asyncio.get_running_loop().time() if self.running else 0.0
+
+    def start(self) -> asyncio.Task:
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._inflight:
+            self._inflight.cancel()
+
+    async def run(self):
+        print(f"🚁 Starting setpoint stream at {self.rate_hz:g} Hz...")
+        loop = asyncio.get_running_loop()
+        self._started_at = loop.time()
+        deadline = loop.time()
+        while True:
+            now = loop.time()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                now = loop.time()
+            self._jitter.record(now - deadline)
+            self.ticks += 1
+            self._tick(now)
+
+            deadline += self.period
+            now = loop.time()
+            if now >= deadline:
+                # Late: skip the deadlines we can no longer meet
+                missed = int((now - deadline) // self.period) + 1
+                self.missed += missed
+                deadline += missed * self.period
+
+    def _tick(self, now: float):
+        if self.trajectory is not None:
+            try:
+                point = self.trajectory.setpoint(now - self._started_at)
+            except Exception as e:
+                print(f"❌ Trajectory error: {e}")
+                point = None
+            if point is None:
+                if self.last is not None:
+                    self.trajectory = Hold(self.last)
+            else:
+                self.last = point
+        if self.last is None:
+            return
+        if self._inflight is not None and not self._inflight.done():
+            self.skipped += 1
+            return
+        self._inflight = asyncio.ensure_future(self._send(self.last, now))
+
+    async def _send(self, point: Setpoint, started: float):
+        try:
+            await self.send(point)
+            self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+        finally:
+            self._latency.record(asyncio.get_running_loop().time() - started)
+
+    # Statistics -------------------------------------------------------
+    def reset_stats(self):
+        self.ticks = self.sent = self.missed = self.skipped = self.errors = 0
+        self.last_error: str | None = None
+        self._jitter = _Window()    # wake-up time minus deadline
+        self._latency = _Window()   # send duration
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "rate_hz": self.rate_hz,
+            "ticks": self.ticks,
+            "sent": self.sent,
+            "missed_deadlines": self.missed,
+            "skipped_sends": self.skipped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "jitter": self._jitter.summary(),
+            "send_latency": self._latency.summary(),
+            "setpoint": self.last,
+            "trajectory": self.trajectory.summary() if self.trajectory else None,
+        }
@@ -0,0 +1,405 @@
+"""Deterministic kinematic drone simulator.
+
+``SimulatedSystem`` exposes the subset of the ``mavsdk.System`` API that
+``DroneController`` uses (``core``, ``telemetry``, ``action``, ``offboard``),
+so it can be passed as the controller's ``drone`` backend without touching
+the controller logic. One ``KinematicSimulator`` integrates any number of
+vehicles with vectorised NumPy steps at a fixed timestep, so runs with the
+same seed produce the same trajectories.
+"""
+import asyncio
+import math
+import time
+from enum import Enum
+from typing import NamedTuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6378137.0
+GRAVITY = 9.80665
+
+
+# -----------------------------
+# MAVSDK-compatible sample types
+# -----------------------------
+class FixType(Enum):
+    NO_GPS = 0
+    NO_FIX = 1
+    FIX_2D = 2
+    FIX_3D = 3
+    FIX_DGPS = 4
+    RTK_FLOAT = 5
+    RTK_FIXED = 6
+
+
+class FlightMode(Enum):
+    UNKNOWN = 0
+    READY = 1
+    TAKEOFF = 2
+    HOLD = 3
+    MISSION = 4
+    RETURN_TO_LAUNCH = 5
+    LAND = 6
+    OFFBOARD = 7
+    FOLLOW_ME = 8
+    MANUAL = 9
+    ALTCTL = 10
+    POSCTL = 11
+    ACRO = 12
+    STABILIZED = 13
+    RATTITUDE = 14
+
+
+class ConnectionState(NamedTuple):
+    is_connected: bool
+
+
+class Position(NamedTuple):
+    latitude_deg: float
+    longitude_deg: float
+    absolute_altitude_m: float
+    relative_altitude_m: float
+
+
+class VelocityNed(NamedTuple):
+    north_m_s: float
+    east_m_s: float
+    down_m_s: float
+
+
+class Battery(NamedTuple):
+    remaining_percent: float
+    voltage_v: float
+
+
+class EulerAngle(NamedTuple):
+    roll_deg: float
+    pitch_deg: float
+    yaw_deg: float
+
+
+class GpsInfo(NamedTuple):
+    num_satellites: int
+    fix_type: FixType
+
+
+class Health(NamedTuple):
+    is_gyrometer_calibration_ok: bool
+    is_accelerometer_calibration_ok: bool
+    is_magnetometer_calibration_ok: bool
+    is_local_position_ok: bool
+    is_global_position_ok: bool
+    is_home_position_ok: bool
+    is_armable: bool
+
+
+class RcStatus(NamedTuple):
+    is_available: bool
+    signal_strength_percent: float
+
+
+# -----------------------------
+# Physics
+# -----------------------------
+class KinematicSimulator:
+    """Point-mass multicopter model for ``vehicles`` drones.
+
+    Each vehicle flies towards its NED setpoint with limited speed and
+    acceleration; attitude is derived from the commanded acceleration, and the
+    battery drains with time and speed. In ``wander`` mode airborne vehicles
+    pick a new seeded random setpoint whenever they reach the current one.
+    """
+
+    def __init__(self, vehicles: int = 1, seed: int = 0, physics_hz: float = 200.0,
+                 home=(41.0082, 28.9784, 40.0), spacing_m: float = 10.0,
+                 max_speed: float = 8.0, max_accel: float = 4.0, wander: bool = False):
+        self.n = vehicles
+        self.dt = 1.0 / physics_hz
+        self.rng = np.random.default_rng(seed)
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        self.wander = wander
+        self.home_lat, self.home_lon, self.home_alt = home
+        self.sim_time = 0.0
+        self.steps = 0
+        # Vehicle i starts spaced out along the east axis
+        self.origin = np.zeros((vehicles, 3))
+        self.origin[:, 1] = np.arange(vehicles) * spacing_m
+        self.pos = self.origin.copy()
+        self.vel = np.zeros((vehicles, 3))
+        self.acc = np.zeros((vehicles, 3))
+        self.target = self.origin.copy()
+        self.yaw = np.zeros(vehicles)
+        self.target_yaw = np.zeros(vehicles)
+        self.battery = np.full(vehicles, 100.0)
+        self.armed = np.zeros(vehicles, dtype=bool)
+        self.mode = [FlightMode.READY] * vehicles
+        self._task: asyncio.Task | None = None
+
+    # Stepping ---------------------------------------------------------
+    def step(self, steps: int = 1):
+        """Advance every vehicle by ``steps`` fixed timesteps"""
+        dt = self.dt
+        for _ in range(steps):
+            error = self.target - self.pos
+            desired = error * 1.0  # P-controller on position
+            speed = np.linalg.norm(desired, axis=1, keepdims=True)
+            desired *= np.minimum(1.0, self.max_speed / np.maximum(speed, 1e-9))
+            acc = (desired - self.vel) / 0.5
+            norm = np.linalg.norm(acc, axis=1, keepdims=True)
+            acc *= np.minimum(1.0, self.max_accel / np.maximum(norm, 1e-9))
+            acc[~self.armed] = 0.0
+            self.acc = acc
+            self.vel += acc * dt
+            self.vel[~self.armed] = 0.0
+            self.pos += self.vel * dt
+            # Can't go below ground (down is positive)
+            grounded = self.pos[:, 2] > 0.0
+            self.pos[grounded, 2] = 0.0
+            self.vel[grounded, 2] = np.minimum(self.vel[grounded, 2], 0.0)
+            yaw_error = (self.target_yaw - self.yaw + 180.0) % 360.0 - 180.0
+            self.yaw += np.clip(yaw_error, -90.0 * dt, 90.0 * dt)
+            drain = 0.05 + 0.005 * np.linalg.norm(self.vel, axis=1)
+            self.battery = np.maximum(self.battery - drain * dt * self.armed, 0.0)
+            self.sim_time += dt
+            self.steps += 1
+            if self.wander:
+                self._wander()
+
+    def _wander(self):
+        airborne = self.armed & (self.pos[:, 2] < -1.0)
+        reached = np.linalg.norm(self.target - self.pos, axis=1) < 1.0
+        pick = np.flatnonzero(airborne & reached)
+        if len(pick):
+            offsets = self.rng.uniform(-50.0, 50.0, size=(len(pick), 2))
+            self.target[pick, :2] = self.origin[pick, :2] + offsets
+            self.target_yaw[pick] = self.rng.uniform(0.0, 360.0, size=len(pick))
+
+    async def run(self):
+        """Step in real time against a monotonic clock"""
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.dt
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                self.step()
+            else:
+                # Behind schedule: catch up in one vectorised burst
+                missed = int(-delay / self.dt) + 1
+                self.step(missed)
+                next_tick += (missed - 1) * self.dt
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    # Sampling ---------------------------------------------------------
+    def position(self, i: int) -> Position:
+        north, east, down = self.pos[i]
+        lat = self.home_lat + math.degrees(north / EARTH_RADIUS_M)
+        lon = self.home_lon + math.degrees(east / (EARTH_RADIUS_M * math.cos(math.radians(self.home_lat))))
+        return Position(lat, lon, self.home_alt - down, -down)
+
+    def home(self, i: int) -> Position:
+        north, east, _ = self.origin[i]
+        lat = self.home_lat + math.degrees(north / EARTH_RADIUS_M)
+        lon = self.home_lon + math.degrees(east / (EARTH_RADIUS_M * math.cos(math.radians(self.home_lat))))
+        return Position(lat, lon, self.home_alt, 0.0)
+
+    def velocity(self, i: int) -> VelocityNed:
+        return VelocityNed(*map(float, self.vel[i]))
+
+    def attitude(self, i: int) -> EulerAngle:
+        yaw = math.radians(self.yaw[i])
+        a_n, a_e, _ = self.acc[i]
+        # Body-frame forward/right acceleration -> small-angle tilt
+        forward = a_n * math.cos(yaw) + a_e * math.sin(yaw)
+        right = -a_n * math.sin(yaw) + a_e * math.cos(yaw)
+        pitch = -math.degrees(math.atan2(forward, GRAVITY))
+        roll = math.degrees(math.atan2(right, GRAVITY))
+        return EulerAngle(roll, pitch, (self.yaw[i] + 180.0) % 360.0 - 180.0)
+
+    def battery_state(self, i: int) -> Battery:
+        level = float(self.battery[i])
+        return Battery(level, 12.6 - 2.4 * (1.0 - level / 100.0))
+
+
+# -----------------------------
+# mavsdk.System look-alike
+# -----------------------------
+STREAM_DEFAULT_HZ = 10.0
+
+
+class _Core:
+    def __init__(self, system):
+        self._system = system
+
+    async def connection_state(self):
+        while True:
+            yield ConnectionState(True)
+            await asyncio.sleep(1.0)
+
+
+class _Telemetry:
+    """Async generators with per-stream rates, like ``mavsdk.telemetry``"""
+
+    def __init__(self, system):
+        self._system = system
+        self._rates: dict[str, float] = {}
+
+    def _rate(self, stream: str) -> float:
+        return self._rates.get(stream, self._system.default_rate)
+
+    async def _stream(self, stream: str, sample):
+        next_tick = time.monotonic()
+        while True:
+            yield sample()
+            next_tick += 1.0 / self._rate(stream)
+            await asyncio.sleep(max(next_tick - time.monotonic(), 0.0))
+
+    def _on_change(self, stream: str, sample, poll_hz: float = 5.0):
+        """Streams MAVSDK only emits on change (flight mode, armed, ...)"""
+        async def gen():
+            last = None
+            while True:
+                value = sample()
+                if value != last:
+                    last = value
+                    yield value
+                await asyncio.sleep(1.0 / poll_hz)
+        return gen()
+
+    # Rate setters
+    async def _set_rate(self, stream: str, rate_hz: float):
+        self._rates[stream] = min(max(rate_hz, 0.1), 200.0)
+
+    async def set_rate_position(self, rate_hz):
+        await self._set_rate("position", rate_hz)
+
+    async def set_rate_velocity_ned(self, rate_hz):
+        await self._set_rate("velocity_ned", rate_hz)
+
+    async def set_rate_battery(self, rate_hz):
+        await self._set_rate("battery", rate_hz)
+
+    async def set_rate_attitude_euler(self, rate_hz):
+        await self._set_rate("attitude_euler", rate_hz)
+
+    async def set_rate_gps_info(self, rate_hz):
+        await self._set_rate("gps_info", rate_hz)
+
+    async def set_rate_home(self, rate_hz):
+        await self._set_rate("home", rate_hz)
+
+    async def set_rate_rc_status(self, rate_hz):
+        await self._set_rate("rc_status", rate_hz)
+
+    # Streams
+    def position(self):
+        sim, i = self._system.sim, self._system.index
+        return self._stream("position", lambda: sim.position(i))
+
+    def velocity_ned(self):
+        sim, i = self._system.sim, self._system.index
+        return self._stream("velocity_ned", lambda: sim.velocity(i))
+
+    def battery(self):
+        sim, i = self._system.sim, self._system.index
+        return self._stream("battery", lambda: sim.battery_state(i))
+
+    def attitude_euler(self):
+        sim, i = self._system.sim, self._system.index
+        return self._stream("attitude_euler", lambda: sim.attitude(i))
+
+    def gps_info(self):
+        return self._stream("gps_info", lambda: GpsInfo(12, FixType.FIX_3D))
+
+    def home(self):
+        sim, i = self._system.sim, self._system.index
+        return self._stream("home", lambda: sim.home(i))
+
+    def rc_status(self):
+        return self._stream("rc_status", lambda: RcStatus(True, 100.0))
+
+    def flight_mode(self):
+        sim, i = self._system.sim, self._system.index
+        return self._on_change("flight_mode", lambda: sim.mode[i])
+
+    def armed(self):
+        sim, i = self._system.sim, self._system.index
+        return self._on_change("armed", lambda: bool(sim.armed[i]))
+
+    def health(self):
+        return self._on_change("health", lambda: Health(True, True, True, True, True, True, True))
+
+
+class _Action:
+    def __init__(self, system):
+        self._system = system
+
+    async def arm(self):
+        sim, i = self._system.sim, self._system.index
+        sim.armed[i] = True
+        sim.target[i] = sim.pos[i]
+
+    async def disarm(self):
+        sim, i = self._system.sim, self._system.index
+        if sim.pos[i, 2] < -0.5:
+            raise RuntimeError("Cannot disarm in air")
+        sim.armed[i] = False
+        sim.mode[i] = FlightMode.READY
+
+    async def takeoff(self):
+        sim, i = self._system.sim, self._system.index
+        if not sim.armed[i]:
+            raise RuntimeError("Not armed")
+        sim.target[i] = sim.pos[i]
+        sim.target[i, 2] = -self._system.takeoff_altitude
+        sim.mode[i] = FlightMode.TAKEOFF
+
+    async def land(self):
+        sim, i = self._system.sim, self._system.index
+        sim.target[i] = sim.pos[i]
+        sim.target[i, 2] = 0.0
+        sim.mode[i] = FlightMode.LAND
+
+    async def return_to_launch(self):
+        sim, i = self._system.sim, self._system.index
+        sim.target[i] = sim.origin[i]
+        sim.target[i, 2] = 0.0
+        sim.mode[i] = FlightMode.RETURN_TO_LAUNCH
+
+
+class _Offboard:
+    def __init__(self, system):
+        self._system = system
+
+    async def set_position_ned(self, setpoint):
+        sim, i = self._system.sim, self._system.index
+        sim.target[i] = sim.origin[i] + (setpoint.north_m, setpoint.east_m, setpoint.down_m)
+        sim.target_yaw[i] = setpoint.yaw_deg
+
+    async def start(self):
+        self._system.sim.mode[self._system.index] = FlightMode.OFFBOARD
+
+    async def stop(self):
+        self._system.sim.mode[self._system.index] = FlightMode.HOLD
+
+
+class SimulatedSystem:
+    """Drop-in replacement for ``mavsdk.System`` backed by a simulator vehicle"""
+
+    def __init__(self, sim: KinematicSimulator, index: int = 0,
+                 default_rate: float = STREAM_DEFAULT_HZ, takeoff_altitude: float = 10.0):
+        self.sim = sim
+        self.index = index
+        self.default_rate = default_rate
+        self.takeoff_altitude = takeoff_altitude
+        self.core = _Core(self)
+        self.telemetry = _Telemetry(self)
+        self.action = _Action(self)
+        self.offboard = _Offboard(self)
+
+    async def connect(self, system_address=None):
+        self.sim.start()
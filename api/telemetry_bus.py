@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+Subscriber = Callable[[str, Any], Awaitable[None]]
+
+_UNSET = object()
+_FROM_SOURCE = object()
+
+
+class TelemetryBus:
+    """Publish/subscribe fan-out for telemetry topics.
+
+    Telemetry coroutines call ``publish`` whenever a sample arrives. Each topic
+    is flushed to the subscribers by its own short-lived task, no faster than
+    the topic's rate cap. Samples published while a send is still in flight are
+    coalesced, so subscribers only ever see the newest value, and a topic whose
+    value has not changed costs nothing.
+
+    With a ``source`` (e.g. ``TelemetryState.snapshot``), producers can call
+    ``notify`` instead of ``publish``; the value is then read from the source
+    only when it is actually sent, so coalesced samples are never built.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None,
+                 default_rate: float = 10.0,
+                 source: Callable[[str], Any] | None = None):
+        self.rates = dict(rates or {})
+        self.source = source
+        self.default_rate = default_rate
+        self._subscribers: list[Subscriber] = []
+        self._pending: dict[str, Any] = {}
+        self._last_sent: dict[str, Any] = {}
+        self._last_send_time: dict[str, float] = {}
+        self._flushers: dict[str, asyncio.Task] = {}
+
+    def subscribe(self, callback: Subscriber):
+        """Register an async ``callback(topic, data)``"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def set_rate(self, topic: str, hz: float):
+        """Cap ``topic`` at ``hz`` sends per second (0 disables the cap)"""
+        self.rates[topic] = hz
+
+    def rate(self, topic: str) -> float:
+        return self.rates.get(topic, self.default_rate)
+
+    def publish(self, topic: str, data: Any):
+        """Queue ``data`` for ``topic``; never blocks the caller"""
+        if topic not in self._flushers and self._last_sent.get(topic, _UNSET) == data:
+            return
+        self._pending[topic] = data
+        if topic not in self._flushers:
+            loop = asyncio.get_running_loop()
+            self._flushers[topic] = loop.create_task(self._flush(topic))
+
+    def notify(self, topic: str, *args):
+        """Mark ``topic`` as changed; its value is read from ``source`` at send time"""
+        self._pending[topic] = _FROM_SOURCE
+        if topic not in self._flushers:
+            loop = asyncio.get_running_loop()
+            self._flushers[topic] = loop.create_task(self._flush(topic))
+
+    async def _flush(self, topic: str):
+        try:
+            while topic in self._pending:
+                hz = self.rate(topic)
+                if hz > 0:
+                    due = self._last_send_time.get(topic, 0.0) + 1.0 / hz
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                data = self._pending.pop(topic)
+                if data is _FROM_SOURCE:
+                    data = self.source(topic)
+                if data == self._last_sent.get(topic, _UNSET):
+                    continue
+                self._last_sent[topic] = data
+                self._last_send_time[topic] = time.monotonic()
+                await asyncio.gather(
+                    *(callback(topic, data) for callback in list(self._subscribers)),
+                    return_exceptions=True,
+                )
+        finally:
+            self._flushers.pop(topic, None)
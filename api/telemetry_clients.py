@@ -0,0 +1,349 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qs
+
+from api.telemetry_codec import encode_snapshot, encode_topic, normalise_encoding
+
+# emit(event, data, sid, callback=None)
+Emitter = Callable[..., Awaitable[None]]
+
+SNAPSHOT_EVENT = "telemetry"
+MAX_UNACKED_SNAPSHOTS = 16
+
+_TRUE = ("1", "true", "yes", "on")
+
+
+def _normalise_request(request) -> dict:
+    """Accept a dict payload or a connect query string and return a dict"""
+    if isinstance(request, dict):
+        return dict(request)
+    if not isinstance(request, str):
+        return {}  # None or a malformed payload
+    query = parse_qs(request)
+    normalised = {}
+    if "topics" in query:
+        normalised["topics"] = [t for v in query["topics"] for t in v.split(",") if t]
+    for key in ("rate", "snapshot", "delta", "encoding"):
+        if key in query:
+            normalised[key] = query[key][-1]
+    return normalised
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in _TRUE
+    return bool(value)
+
+
+def _rate(value, default: float) -> float:
+    """A client-supplied rate in Hz; anything but a finite number means ``default``"""
+    if value is None or isinstance(value, bool):
+        return default
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return default
+    return rate if math.isfinite(rate) else default
+
+
+def parse_topics(requested) -> list[str]:
+    """Topic names from a list, or a single (comma-separated) string"""
+    if isinstance(requested, str):
+        return [t for t in requested.split(",") if t]
+    if isinstance(requested, (list, tuple, set)):
+        return [t for t in requested if isinstance(t, str)]
+    return []
+
+
+def parse_subscription(request, topics, default_rate: float = 0.0) -> dict[str, float]:
+    """Turn a client subscription request into ``{topic: max_rate_hz}``.
+
+    Accepted shapes::
+
+        {"topics": {"attitude": 10, "position": 2}}
+        {"topics": ["attitude", "position"], "rate": 5}
+        "topics=attitude,position&rate=5"      (connect query string)
+
+    A rate of 0 means "as fast as the server publishes". Unknown topics are
+    ignored, and so are rates that aren't numbers (the default applies);
+    ``None`` or an empty request subscribes to everything.
+    """
+    request = _normalise_request(request)
+    rate = _rate(request.get("rate"), default_rate)
+    if "topics" not in request:
+        return {topic: rate for topic in topics}
+
+    requested = request["topics"]
+    if isinstance(requested, dict):
+        wanted = {t: _rate(r, 0.0) for t, r in requested.items()}
+    else:
+        wanted = {t: rate for t in parse_topics(requested)}
+    return {t: max(r, 0.0) for t, r in wanted.items() if t in topics}
+
+
+def parse_mode(request) -> dict:
+    """Extract the ``snapshot``/``delta``/``encoding`` delivery options"""
+    request = _normalise_request(request)
+    mode = {key: _flag(request[key]) for key in ("snapshot", "delta") if key in request}
+    if "encoding" in request:
+        mode["encoding"] = normalise_encoding(request["encoding"])
+    return mode
+
+
+def diff_topic(current, base):
+    """Fields of ``current`` that differ from ``base``; ``None`` if unchanged"""
+    if current == base:
+        return None
+    if isinstance(current, dict) and isinstance(base, dict):
+        return {k: v for k, v in current.items() if base.get(k) != v}
+    return current
+
+
+class ClientSession:
+    """Send state for one Socket.IO client.
+
+    Each subscribed topic has a single pending slot: a newer sample replaces
+    an older unsent one instead of queueing behind it, so a slow client only
+    ever falls behind by one sample per topic.
+
+    In snapshot mode every send is one ``telemetry`` event carrying all
+    subscribed topics::
+
+        {"seq": 12, "base": None, "data": {"attitude": {...}, ...}}
+
+    With ``delta`` enabled, once the client has acknowledged a snapshot (by
+    calling the Socket.IO ack callback), later frames carry ``base`` set to
+    that acknowledged ``seq`` and only the fields that differ from it. Clients
+    apply a delta on top of the snapshot named by ``base``.
+
+    ``encoding`` selects the wire format (see ``api.telemetry_codec``).
+    """
+
+    def __init__(self, sid: str, subscription: dict[str, float]):
+        self.sid = sid
+        self.subscription = subscription
+        self.pending: dict[str, Any] = {}
+        self.last_sent: dict[str, float] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        # Snapshot/delta delivery
+        self.snapshot = False
+        self.delta = False
+        self.encoding = "json"
+        self.seq = 0
+        self.view: dict[str, Any] = {}
+        self.unacked: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self.acked_seq: int | None = None
+        self.acked_view: dict[str, Any] = {}
+        self.last_view: dict[str, Any] | None = None
+
+    def configure(self, snapshot: bool | None = None, delta: bool | None = None,
+                  encoding: str | None = None):
+        if snapshot is not None:
+            self.snapshot = snapshot
+        if delta is not None:
+            self.delta = delta
+        if encoding is not None:
+            self.encoding = encoding
+        self.unacked.clear()
+        self.acked_seq = None
+        self.acked_view = {}
+        self.last_view = None
+
+    def offer(self, topic: str, data: Any):
+        if topic not in self.subscription:
+            return
+        if topic in self.pending:
+            self.dropped += 1
+        self.pending[topic] = data
+        self.wakeup.set()
+
+    def next_due(self, topic: str) -> float:
+        rate = self.subscription.get(topic, 0.0)
+        if rate <= 0:
+            return 0.0
+        return self.last_sent.get(topic, 0.0) + 1.0 / rate
+
+    def build_snapshot(self) -> dict | None:
+        """Assemble the next ``telemetry`` frame; ``None`` if nothing changed"""
+        view = {t: v for t, v in self.view.items() if t in self.subscription}
+        if self.delta and view == self.last_view:
+            return None
+        self.last_view = view
+        if self.delta and self.acked_seq is not None:
+            data = {}
+            for topic, value in view.items():
+                changed = diff_topic(value, self.acked_view.get(topic))
+                if changed is not None:
+                    data[topic] = changed
+            self.seq += 1
+            frame = {"seq": self.seq, "base": self.acked_seq, "data": data}
+        else:
+            self.seq += 1
+            frame = {"seq": self.seq, "base": None, "data": view}
+        if self.delta:
+            self.unacked[self.seq] = view
+            while len(self.unacked) > MAX_UNACKED_SNAPSHOTS:
+                self.unacked.popitem(last=False)
+        return frame
+
+    def ack(self, seq: int, *args):
+        """Client confirmed snapshot ``seq``; future deltas are relative to it"""
+        view = self.unacked.get(seq)
+        if view is None or (self.acked_seq is not None and seq <= self.acked_seq):
+            return
+        self.acked_seq = seq
+        self.acked_view = view
+        for older in [s for s in self.unacked if s <= seq]:
+            del self.unacked[older]
+
+    def stats(self) -> dict:
+        return {
+            "topics": dict(self.subscription),
+            "snapshot": self.snapshot,
+            "delta": self.delta,
+            "encoding": self.encoding,
+            "pending": len(self.pending),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+class ClientHub:
+    """Per-client telemetry fan-out with subscription and rate negotiation.
+
+    Registered as a ``TelemetryBus`` subscriber. Every connected client gets
+    its own sender task, so a client on a slow link only delays itself.
+    """
+
+    def __init__(self, emit: Emitter, topics, current: Callable[[str], Any],
+                 default_rate: float = 0.0,
+                 on_interest: Callable[[set[str]], None] | None = None):
+        self.emit = emit
+        self.on_interest = on_interest
+        self.topics = tuple(topics)
+        self.current = current
+        self.default_rate = default_rate
+        self.sessions: dict[str, ClientSession] = {}
+        # (topic, encoding) -> (sample, payload): encode each sample once
+        self._encoded: dict[tuple[str, str], tuple[Any, Any]] = {}
+
+    def add(self, sid: str, request=None) -> ClientSession:
+        subscription = parse_subscription(request, self.topics, self.default_rate)
+        session = ClientSession(sid, {})
+        session.configure(**parse_mode(request))
+        self.sessions[sid] = session
+        session.task = asyncio.get_running_loop().create_task(self._sender(session))
+        self.subscribe(sid, subscription)
+        return session
+
+    def subscribe(self, sid: str, subscription: dict[str, float]) -> dict[str, float]:
+        """Add or re-rate topics for ``sid``; new topics get the current value"""
+        session = self.sessions[sid]
+        added = [t for t in subscription if t not in session.subscription]
+        session.subscription.update(subscription)
+        for topic in added:
+            session.offer(topic, self.current(topic))
+        if added:
+            self._interest_changed()
+        return dict(session.subscription)
+
+    def unsubscribe(self, sid: str, topics) -> dict[str, float]:
+        session = self.sessions[sid]
+        for topic in parse_topics(topics):
+            session.subscription.pop(topic, None)
+            session.pending.pop(topic, None)
+            session.view.pop(topic, None)
+        self._interest_changed()
+        return dict(session.subscription)
+
+    def set_mode(self, sid: str, request) -> dict:
+        session = self.sessions[sid]
+        mode = parse_mode(request)
+        if mode:
+            session.configure(**mode)
+            # Start the new mode from a full frame
+            for topic in session.subscription:
+                session.offer(topic, self.current(topic))
+        return {"snapshot": session.snapshot, "delta": session.delta,
+                "encoding": session.encoding}
+
+    def remove(self, sid: str):
+        session = self.sessions.pop(sid, None)
+        if session and session.task:
+            session.task.cancel()
+        self._interest_changed()
+
+    def interest(self) -> set[str]:
+        """Topics that at least one client is subscribed to"""
+        topics = set()
+        for session in self.sessions.values():
+            topics.update(session.subscription)
+        return topics
+
+    def _interest_changed(self):
+        if self.on_interest:
+            self.on_interest(self.interest())
+
+    async def publish(self, topic: str, data: Any):
+        """Bus subscriber: hand the sample to every interested client"""
+        for session in self.sessions.values():
+            session.offer(topic, data)
+
+    def broadcast(self, event: str, data: Any):
+        """Send a one-off event (e.g. command progress) to every client now"""
+        loop = asyncio.get_running_loop()
+        for session in self.sessions.values():
+            loop.create_task(self._send(session, event, data))
+
+    def _encode_topic(self, topic: str, data: Any, encoding: str):
+        if encoding == "json":
+            return data
+        cached = self._encoded.get((topic, encoding))
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        payload = encode_topic(topic, data, encoding)
+        self._encoded[(topic, encoding)] = (data, payload)
+        return payload
+
+    async def _send(self, session: ClientSession, event: str, data: Any, callback=None):
+        try:
+            await self.emit(event, data, session.sid, callback=callback)
+            session.sent += 1
+        except Exception as e:
+            print(f"❌ Telemetry send to {session.sid} failed: {e}")
+
+    async def _sender(self, session: ClientSession):
+        while True:
+            await session.wakeup.wait()
+            session.wakeup.clear()
+            while session.pending:
+                now = time.monotonic()
+                due = [t for t in session.pending if session.next_due(t) <= now]
+                if not due:
+                    wait = min(session.next_due(t) for t in session.pending) - now
+                    await asyncio.sleep(wait)
+                    continue
+                batch = {}
+                for topic in due:
+                    session.last_sent[topic] = now
+                    batch[topic] = session.pending.pop(topic)
+                if session.snapshot:
+                    session.view.update(batch)
+                    frame = session.build_snapshot()
+                    if frame is None:
+                        continue
+                    callback = partial(session.ack, frame["seq"]) if session.delta else None
+                    payload = encode_snapshot(frame, session.encoding)
+                    await self._send(session, SNAPSHOT_EVENT, payload, callback)
+                    continue
+                for topic, data in batch.items():
+                    if topic in session.subscription:
+                        payload = self._encode_topic(topic, data, session.encoding)
+                        await self._send(session, topic, payload)
@@ -0,0 +1,167 @@
+"""Wire encodings for telemetry frames.
+
+Three encodings are available to Socket.IO clients (``encoding`` in the
+subscription request) and REST clients (``Accept`` header):
+
+* ``json``    - the default; plain dicts, handled by Socket.IO/FastAPI
+* ``msgpack`` - the same structure packed with MessagePack (optional dep)
+* ``struct``  - a fixed little-endian layout, described below
+
+Struct layout (schema version ``STRUCT_SCHEMA_VERSION``)::
+
+    frame   := version:u8 kind:u8 body
+    kind 0  := topic                          single topic event
+    kind 1  := seq:u32 base:u32 count:u8 topic*   "telemetry" snapshot
+    topic   := topic_id:u8 mask:u8 field*     fields present in mask order
+
+``base`` is 0xFFFFFFFF for a full snapshot. Bit ``i`` of ``mask`` is set when
+the ``i``-th field of the topic schema is present, which lets delta frames
+carry partial topics. Text fields are ``len:u8`` followed by UTF-8 bytes.
+"""
+import struct
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the msgpack encoding
+    msgpack = None
+
+STRUCT_SCHEMA_VERSION = 1
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "struct": "application/vnd.cevheri.telemetry+struct",
+}
+_ENCODING_BY_MEDIA_TYPE = {media_type: name for name, media_type in MEDIA_TYPES.items()}
+_ENCODING_BY_MEDIA_TYPE["application/x-msgpack"] = "msgpack"
+
+# topic -> (topic id, ((field, struct code), ...)); "s" is a short string.
+# Ids are part of the wire format: only ever append.
+TOPIC_SCHEMAS = {
+    "velocity": (1, (("x", "f"), ("y", "f"), ("z", "f"))),
+    "battery": (2, (("level", "f"), ("voltage", "f"), ("temperature", "f"))),
+    "position": (3, (("lat", "d"), ("lon", "d"), ("abs_alt", "f"))),
+    "attitude": (4, (("roll", "f"), ("pitch", "f"), ("yaw", "f"), ("heading", "f"))),
+    "health": (5, (("value", "s"),)),
+    "gps_info": (6, (("num_satellites", "B"), ("fix_type", "s"))),
+    "flight_mode": (7, (("value", "s"),)),
+    "armed": (8, (("value", "?"),)),
+    "vehicle_health": (9, tuple((name, "?") for name in (
+        "gyro_ok", "accel_ok", "mag_ok", "local_position_ok",
+        "global_position_ok", "home_position_ok", "armable"))),
+    "home": (10, (("lat", "d"), ("lon", "d"), ("abs_alt", "f"))),
+    "rc_status": (11, (("available", "?"), ("signal_strength", "f"))),
+}
+_TOPIC_BY_ID = {topic_id: (topic, fields) for topic, (topic_id, fields) in TOPIC_SCHEMAS.items()}
+_CODECS = {code: struct.Struct("<" + code) for code in ("f", "d", "?", "B")}
+
+_HEADER = struct.Struct("<BB")
+_SNAPSHOT = struct.Struct("<IIB")
+_TOPIC = struct.Struct("<BB")
+_NO_BASE = 0xFFFFFFFF
+
+KIND_TOPIC = 0
+KIND_SNAPSHOT = 1
+
+
+def available_encodings() -> tuple[str, ...]:
+    if msgpack is None:
+        return ("json", "struct")
+    return ("json", "msgpack", "struct")
+
+
+def normalise_encoding(name) -> str:
+    """Validate a requested encoding, falling back to json"""
+    name = str(name or "json").lower()
+    return name if name in available_encodings() else "json"
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick an encoding from an HTTP ``Accept`` header"""
+    if not accept:
+        return "json"
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        name = _ENCODING_BY_MEDIA_TYPE.get(media_type)
+        if name in available_encodings():
+            return name
+    return "json"
+
+
+def _pack_topic(topic: str, value) -> bytes:
+    topic_id, fields = TOPIC_SCHEMAS[topic]
+    if not isinstance(value, dict):
+        value = {fields[0][0]: value}
+    mask = 0
+    parts = []
+    for bit, (name, code) in enumerate(fields):
+        if name not in value or value[name] is None:
+            continue
+        mask |= 1 << bit
+        if code == "s":
+            raw = str(value[name]).encode("utf-8")[:255]
+            parts.append(bytes((len(raw),)) + raw)
+        else:
+            parts.append(_CODECS[code].pack(value[name]))
+    return _TOPIC.pack(topic_id, mask) + b"".join(parts)
+
+
+def _unpack_topic(buf: memoryview, offset: int):
+    topic_id, mask = _TOPIC.unpack_from(buf, offset)
+    offset += _TOPIC.size
+    topic, fields = _TOPIC_BY_ID[topic_id]
+    value = {}
+    for bit, (name, code) in enumerate(fields):
+        if not mask & (1 << bit):
+            continue
+        if code == "s":
+            length = buf[offset]
+            value[name] = bytes(buf[offset + 1:offset + 1 + length]).decode("utf-8")
+            offset += 1 + length
+        else:
+            value[name] = _CODECS[code].unpack_from(buf, offset)[0]
+            offset += _CODECS[code].size
+    if len(fields) == 1 and fields[0][0] == "value":
+        value = value.get(fields[0][0])
+    return topic, value, offset
+
+
+def encode_topic(topic: str, value, encoding: str):
+    """Encode one per-topic event payload; json returns ``value`` unchanged"""
+    if encoding == "msgpack":
+        return msgpack.packb(value)
+    if encoding == "struct" and topic in TOPIC_SCHEMAS:
+        return _HEADER.pack(STRUCT_SCHEMA_VERSION, KIND_TOPIC) + _pack_topic(topic, value)
+    return value
+
+
+def encode_snapshot(frame: dict, encoding: str):
+    """Encode a ``telemetry`` snapshot/delta frame"""
+    if encoding == "msgpack":
+        return msgpack.packb(frame)
+    if encoding == "struct":
+        topics = [(t, v) for t, v in frame["data"].items() if t in TOPIC_SCHEMAS]
+        base = _NO_BASE if frame["base"] is None else frame["base"]
+        head = _HEADER.pack(STRUCT_SCHEMA_VERSION, KIND_SNAPSHOT)
+        head += _SNAPSHOT.pack(frame["seq"], base, len(topics))
+        return head + b"".join(_pack_topic(t, v) for t, v in topics)
+    return frame
+
+
+def decode_struct(payload: bytes):
+    """Decode a struct frame; returns ``(topic, value)`` or a snapshot dict"""
+    buf = memoryview(payload)
+    version, kind = _HEADER.unpack_from(buf, 0)
+    if version != STRUCT_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported telemetry schema version {version}")
+    offset = _HEADER.size
+    if kind == KIND_TOPIC:
+        topic, value, _ = _unpack_topic(buf, offset)
+        return topic, value
+    seq, base, count = _SNAPSHOT.unpack_from(buf, offset)
+    offset += _SNAPSHOT.size
+    data = {}
+    for _ in range(count):
+        topic, value, offset = _unpack_topic(buf, offset)
+        data[topic] = value
+    return {"seq": seq, "base": None if base == _NO_BASE else base, "data": data}
@@ -0,0 +1,179 @@
+import numpy as np
+
+from api.telemetry_state import TelemetryState, TopicRecord
+
+DEFAULT_CAPACITY = 1 << 17  # rows per topic; ~1 MB per numeric field
+# Most points a decimated query may ask for; LTTB costs ~20 us per point
+MAX_POINTS = 10_000
+
+
+class RingBuffer:
+    """Preallocated ring of ``(timestamp, *fields)`` float64 rows.
+
+    Memory is reserved at construction but left uninitialised, so the OS
+    only commits pages as rows are written; an idle vehicle's history costs
+    next to nothing. Rows are written in timestamp order, so
+    each of the (at most two) contiguous segments of the ring is sorted and
+    can be searched with ``np.searchsorted`` without copying.
+    """
+
+    def __init__(self, fields, capacity: int = DEFAULT_CAPACITY):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.data = np.empty((capacity, len(self.fields) + 1))
+        self.head = 0   # next row to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp: float, values):
+        row = self.data[self.head]
+        row[0] = timestamp
+        row[1:] = values
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def segments(self) -> list[np.ndarray]:
+        """Chronological views of the stored rows (no copies)"""
+        if self.count < self.capacity:
+            return [self.data[:self.count]]
+        if self.head == 0:
+            return [self.data]
+        return [self.data[self.head:], self.data[:self.head]]
+
+    def window(self, since: float | None = None, until: float | None = None) -> np.ndarray:
+        """Rows with ``since <= t <= until``.
+
+        Returns a view when the window lies in one segment; only a window
+        that straddles the wrap point is copied.
+        """
+        parts = []
+        for segment in self.segments():
+            t = segment[:, 0]
+            lo = 0 if since is None else np.searchsorted(t, since, side="left")
+            hi = len(t) if until is None else np.searchsorted(t, until, side="right")
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        if not parts:
+            return self.data[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+
+def decimate_minmax(rows: np.ndarray, points: int, column: int = 1) -> np.ndarray:
+    """Keep the min and max row of ``column`` in each bucket, in time order"""
+    n = len(rows)
+    buckets = max(points // 2, 1)
+    if n <= points or n <= 2:
+        return rows
+    size = -(-n // buckets)  # ceil
+    full = (n // size) * size
+    picks = []
+    if full:
+        values = rows[:full, column].reshape(-1, size)
+        base = np.arange(0, full, size)
+        lo = base + np.argmin(values, axis=1)
+        hi = base + np.argmax(values, axis=1)
+        picks.append(np.sort(np.stack([lo, hi], axis=1), axis=1).ravel())
+    if full < n:
+        tail = rows[full:, column]
+        picks.append(np.unique(full + np.array([np.argmin(tail), np.argmax(tail)])))
+    index = np.concatenate(picks)
+    # A bucket whose min and max are the same row would appear twice
+    keep = np.ones(len(index), dtype=bool)
+    keep[1:] = index[1:] != index[:-1]
+    return rows[index[keep]]
+
+
+def decimate_lttb(rows: np.ndarray, points: int, column: int = 1) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling on ``column``"""
+    n = len(rows)
+    if points >= n or points < 3:
+        return rows
+    t = rows[:, 0]
+    y = rows[:, column]
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    index = np.empty(points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_start, nxt_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_t = t[nxt_start:nxt_end].mean() if nxt_end > nxt_start else t[-1]
+        avg_y = y[nxt_start:nxt_end].mean() if nxt_end > nxt_start else y[-1]
+        bucket_t = t[start:end]
+        bucket_y = y[start:end]
+        area = np.abs((t[a] - avg_t) * (bucket_y - y[a]) - (t[a] - bucket_t) * (avg_y - y[a]))
+        a = start + int(np.argmax(area)) if len(area) else start
+        index[i + 1] = a
+    return rows[index]
+
+
+DECIMATORS = {"minmax": decimate_minmax, "lttb": decimate_lttb}
+
+
+def query_rows(topic: str, rows: np.ndarray, fields, points: int | None = None,
+               method: str = "lttb", field: str | None = None) -> dict:
+    """Columnar response for ``(t, *fields)`` rows, decimated to ``points``"""
+    total = len(rows)
+    if points and total > points:
+        column = 1 + (list(fields).index(field) if field else 0)
+        rows = DECIMATORS[method](rows, points, column)
+    result = {"topic": topic, "count": len(rows), "total": total, "t": rows[:, 0].tolist()}
+    for i, name in enumerate(fields, start=1):
+        result[name] = rows[:, i].tolist()
+    return result
+
+
+class TelemetryHistory:
+    """One ``RingBuffer`` per numeric telemetry topic, fed from ``TelemetryState``.
+
+    Register ``record`` as a sample listener; every sample of a tracked topic
+    appends one row, repeated values included, so a steady signal is evenly
+    sampled. Text fields (e.g. the GPS fix type) are not kept.
+    ``topics`` are the ones given a capacity, which the history wants
+    streaming in flight.
+    """
+
+    def __init__(self, state: TelemetryState, capacities: dict[str, int] | None = None,
+                 default_capacity: int = DEFAULT_CAPACITY):
+        capacities = capacities or {}
+        self.topics = {topic for topic, capacity in capacities.items() if capacity}
+        self.buffers: dict[str, RingBuffer] = {}
+        self._columns: dict[str, list[int]] = {}
+        for topic, record in state.records.items():
+            columns = [i for i, value in enumerate(record.values)
+                       if isinstance(value, (int, float))]
+            if not columns or capacities.get(topic) == 0:
+                continue
+            fields = [record.fields[i] for i in columns]
+            self.buffers[topic] = RingBuffer(fields, capacities.get(topic, default_capacity))
+            self._columns[topic] = columns
+
+    def record(self, topic: str, record: TopicRecord):
+        buffer = self.buffers.get(topic)
+        if buffer is None:
+            return
+        columns = self._columns[topic]
+        values = record.values
+        if len(columns) == len(values):
+            buffer.append(record.timestamp, values)
+        else:
+            buffer.append(record.timestamp, [values[i] for i in columns])
+
+    def query(self, topic: str, since: float | None = None, until: float | None = None,
+              points: int | None = None, method: str = "lttb", field: str | None = None) -> dict:
+        """Columnar window of ``topic``, optionally decimated to ``points`` rows"""
+        return query_rows(topic, self.window(topic, since, until), self.buffers[topic].fields,
+                          points, method, field)
+
+    def window(self, topic: str, since: float | None = None, until: float | None = None) -> np.ndarray:
+        """Copy of the rows of ``topic`` in the window, safe to use off the event loop"""
+        return self.buffers[topic].window(since, until).copy()
+
+    def memory_bytes(self) -> int:
+        return sum(buffer.data.nbytes for buffer in self.buffers.values())
@@ -0,0 +1,129 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+LOGGER_NAME = "control_station"
+DEFAULT_SAMPLE_RATE = 0.2  # telemetry lines per topic per second
+
+log = logging.getLogger(LOGGER_NAME)
+telemetry_log = logging.getLogger(f"{LOGGER_NAME}.telemetry")
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.handlers.QueueHandler | None = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line, including the telemetry ``topic`` extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("topic", "suppressed"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TelemetrySampler:
+    """Per-topic rate limiter for telemetry log lines.
+
+    ``log`` is cheap when a line is suppressed: no formatting happens and only
+    a counter is bumped. The next line that gets through reports how many were
+    dropped in between.
+    """
+
+    def __init__(self, logger: logging.Logger, default_rate: float = DEFAULT_SAMPLE_RATE):
+        self.logger = logger
+        self.default_rate = default_rate
+        self.rates: dict[str, float] = {}
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def configure(self, rates: dict[str, float] | None = None, default_rate: float | None = None):
+        """Set lines/second per topic; 0 mutes a topic, a negative rate unthrottles it"""
+        if default_rate is not None:
+            self.default_rate = default_rate
+        if rates:
+            self.rates.update(rates)
+
+    def settings(self) -> dict:
+        return {"default_rate": self.default_rate, "topics": dict(self.rates)}
+
+    def log(self, topic: str, msg: str, *args, level: int = logging.INFO):
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = self.rates.get(topic, self.default_rate)
+        if rate == 0:
+            return
+        now = time.monotonic()
+        if rate > 0 and now - self._last.get(topic, float("-inf")) < 1.0 / rate:
+            self._suppressed[topic] = self._suppressed.get(topic, 0) + 1
+            return
+        self._last[topic] = now
+        suppressed = self._suppressed.pop(topic, 0)
+        if suppressed:
+            msg += " (+%d suppressed)"
+            args += (suppressed,)
+        self.logger.log(level, msg, *args, extra={"topic": topic, "suppressed": suppressed})
+
+
+telemetry_sampler = TelemetrySampler(telemetry_log)
+
+
+def setup_logging(level: str | None = None, fmt: str | None = None):
+    """Route the control station loggers through a background thread.
+
+    Records are put on a queue by the event loop and written to stderr by a
+    ``QueueListener`` thread, so a slow terminal or journald never stalls
+    telemetry. ``CONTROL_STATION_LOG_LEVEL`` and ``CONTROL_STATION_LOG_FORMAT``
+    (``text`` or ``json``) provide the defaults.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    level = level or os.environ.get("CONTROL_STATION_LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("CONTROL_STATION_LOG_FORMAT", "text")
+
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(StructuredFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(records)
+    log.addHandler(_queue_handler)
+    log.setLevel(level.upper())
+    log.propagate = False
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    global _listener, _queue_handler
+    if _listener is not None:
+        log.removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+
+def set_level(level: str, logger_name: str = LOGGER_NAME):
+    logging.getLogger(logger_name).setLevel(level.upper())
+
+
+def get_settings() -> dict:
+    return {
+        "level": logging.getLevelName(log.getEffectiveLevel()),
+        "telemetry_level": logging.getLevelName(telemetry_log.getEffectiveLevel()),
+        "sampling": telemetry_sampler.settings(),
+    }
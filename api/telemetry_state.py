@@ -0,0 +1,178 @@
+import time
+from array import array
+from typing import Callable
+
+# topic -> default sample. Dict defaults become multi-field records, anything
+# else is a scalar topic (e.g. the health string).
+TELEMETRY_SCHEMA = {
+    "velocity": {"x": 0.0, "y": 0.0, "z": 0.0},
+    "battery": {"level": 100.0, "voltage": 12.4, "temperature": 25.0},
+    "camera": {"last_frame": None, "timestamp": None},
+    "position": {"lat": 0.0, "lon": 0.0, "abs_alt": 0.0},
+    "attitude": {"roll": 0.0, "pitch": 0.0, "yaw": 0.0, "heading": 0.0},
+    "health": "starting",
+    "gps_info": {"num_satellites": 0, "fix_type": "NO_GPS"},
+    "flight_mode": "UNKNOWN",
+    "armed": False,
+    "vehicle_health": {
+        "gyro_ok": False, "accel_ok": False, "mag_ok": False,
+        "local_position_ok": False, "global_position_ok": False,
+        "home_position_ok": False, "armable": False,
+    },
+    "home": {"lat": 0.0, "lon": 0.0, "abs_alt": 0.0},
+    "rc_status": {"available": False, "signal_strength": 0.0},
+}
+
+Listener = Callable[[str, "TopicRecord"], None]
+
+
+class FrozenSample(dict):
+    """Read-only dict handed out as a snapshot.
+
+    It stays a ``dict`` subclass so JSON, MessagePack and FastAPI serialise
+    it directly.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("telemetry snapshots are read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+class TopicRecord:
+    """Latest sample of one topic, updated in place.
+
+    Numeric topics keep their values in a preallocated ``array('d')``; topics
+    with non-numeric fields use a fixed-length list. ``seq`` is the store-wide
+    sequence number of the last change and ``timestamp`` its wall-clock time
+    (that of the last sample, repeated or not, once sample listeners exist).
+    """
+
+    __slots__ = ("topic", "fields", "values", "scalar", "seq", "timestamp", "_snapshot", "_snapshot_seq")
+
+    def __init__(self, topic: str, default):
+        self.topic = topic
+        self.scalar = not isinstance(default, dict)
+        if self.scalar:
+            self.fields = ("value",)
+            self.values = [default]
+        else:
+            self.fields = tuple(default)
+            defaults = tuple(default.values())
+            numeric = all(isinstance(v, float) for v in defaults)
+            self.values = array("d", defaults) if numeric else list(defaults)
+        self.seq = 0
+        self.timestamp = 0.0
+        self._snapshot = None
+        self._snapshot_seq = -1
+
+    def assign(self, values) -> bool:
+        """Copy ``values`` (in field order) into the record; True if changed"""
+        changed = False
+        current = self.values
+        for i, value in enumerate(values):
+            if current[i] != value:
+                current[i] = value
+                changed = True
+        return changed
+
+    def snapshot(self):
+        """Immutable view of the record, rebuilt only after a change"""
+        if self._snapshot_seq != self.seq:
+            if self.scalar:
+                self._snapshot = self.values[0]
+            else:
+                self._snapshot = FrozenSample(zip(self.fields, self.values))
+            self._snapshot_seq = self.seq
+        return self._snapshot
+
+    def __str__(self) -> str:
+        # Lets loggers take the record itself and format it only if emitted
+        return str(self.snapshot())
+
+
+class TelemetryState:
+    """Typed store for the latest telemetry sample of every topic.
+
+    Writers update records in place; readers take cheap immutable snapshots.
+    Listeners registered with ``add_listener`` are called synchronously for
+    every change, which is how the telemetry bus learns what to send. Sample
+    listeners (``add_sample_listener``) also see repeated values, for
+    consumers such as the history that need a steady signal sampled evenly.
+    """
+
+    def __init__(self, schema: dict | None = None):
+        self.records = {topic: TopicRecord(topic, default)
+                        for topic, default in (schema or TELEMETRY_SCHEMA).items()}
+        self.seq = 0
+        self._listeners: list[Listener] = []
+        self._sample_listeners: list[Listener] = []
+
+    @property
+    def topics(self) -> tuple[str, ...]:
+        return tuple(self.records)
+
+    def add_listener(self, callback: Listener):
+        self._listeners.append(callback)
+
+    def add_sample_listener(self, callback: Listener):
+        """Call ``callback`` for every sample written, changed or not"""
+        self._sample_listeners.append(callback)
+
+    def remove_listener(self, callback: Listener):
+        for listeners in (self._listeners, self._sample_listeners):
+            if callback in listeners:
+                listeners.remove(callback)
+
+    def record(self, topic: str) -> TopicRecord:
+        return self.records[topic]
+
+    def update(self, topic: str, *values) -> bool:
+        """Set all fields of ``topic`` positionally; True if anything changed"""
+        record = self.records[topic]
+        changed = record.assign(values)
+        if changed:
+            self._changed(record)
+        elif self._sample_listeners:
+            record.timestamp = time.time()
+        if self._sample_listeners:
+            self._notify(self._sample_listeners, record)
+        return changed
+
+    def update_fields(self, topic: str, fields: dict) -> bool:
+        """Set the named fields of ``topic``; others keep their value"""
+        record = self.records[topic]
+        values = [fields.get(name, record.values[i]) for i, name in enumerate(record.fields)]
+        return self.update(topic, *values)
+
+    def set(self, topic: str, value) -> bool:
+        """Set a scalar topic such as ``health``"""
+        return self.update(topic, value)
+
+    def snapshot(self, topic: str | None = None):
+        """Snapshot of one topic, or of every topic when ``topic`` is None"""
+        if topic is not None:
+            return self.records[topic].snapshot()
+        return FrozenSample((t, r.snapshot()) for t, r in self.records.items())
+
+    def changed_since(self, seq: int) -> list[str]:
+        """Topics updated after store sequence number ``seq``"""
+        return [t for t, r in self.records.items() if r.seq > seq]
+
+    def __getitem__(self, topic: str):
+        return self.snapshot(topic)
+
+    def _changed(self, record: TopicRecord):
+        self.seq += 1
+        record.seq = self.seq
+        record.timestamp = time.time()
+        self._notify(self._listeners, record)
+
+    @staticmethod
+    def _notify(listeners: list[Listener], record: TopicRecord):
+        for callback in listeners:
+            try:
+                callback(record.topic, record)
+            except Exception as e:
+                print(f"❌ Telemetry listener error ({record.topic}): {e}")
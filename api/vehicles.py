@@ -0,0 +1,249 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from functools import partial
+
+from api.camera import Frame, FrameStore
+from api.telemetry_clients import ClientHub, Emitter
+from api.drone_controller import DroneController
+from api.drone_handler import create_drone, create_mavsdk_server
+from api.flight_log import FlightRecorder
+from api.geofence import BREACH, Geofence, GeofenceMonitor
+from api.telemetry_bus import TelemetryBus
+from api.telemetry_history import TelemetryHistory
+from api.telemetry_state import TelemetryState
+from api.video_gateway import Broadcast, mjpeg_part
+
+# Topics pushed over Socket.IO
+TELEMETRY_TOPICS = (
+    "velocity", "battery", "health", "position", "attitude",
+    "gps_info", "flight_mode", "armed", "vehicle_health", "home", "rc_status",
+)
+
+# Per-topic rate caps (Hz) for Socket.IO pushes; topics not listed use the
+# bus default. Updates are sent as soon as they change, never faster than this.
+TELEMETRY_RATES = {
+    "attitude": 30.0,
+    "velocity": 20.0,
+    "position": 10.0,
+    "battery": 2.0,
+    "health": 10.0,
+}
+
+# Bounded in-memory history (rows per topic); sized for ~2 h at the stream rates
+HISTORY_CAPACITY = {
+    "attitude": 1 << 18,
+    "velocity": 1 << 17,
+    "position": 1 << 17,
+    "battery": 1 << 13,
+}
+
+# A REST read keeps its topic's stream running this long, so polling clients see live values
+READ_LEASE_S = 30.0
+
+# Socket.IO event carrying command progress ({"command", "status", "id", ...})
+COMMAND_EVENT = "command"
+# Socket.IO event carrying geofence status changes ({"status", "violations", ...})
+GEOFENCE_EVENT = "geofence"
+
+DEFAULT_SYSTEM_ID = 1
+DEFAULT_MAVSDK_PORT = 50051
+
+
+class Vehicle:
+    """Everything the station keeps for one vehicle.
+
+    Each vehicle has its own state store, push bus, history, Socket.IO client
+    hub, flight recorder and controller. All of them share the process event
+    loop, and none of them does work while nothing changes or nobody listens.
+    """
+
+    def __init__(self, system_id: int, emit: Emitter, port: int = DEFAULT_MAVSDK_PORT,
+                 backend: str | None = None, index: int = 0, log_dir: str = "",
+                 camera_dir: str = "", camera_options: dict | None = None):
+        self.system_id = system_id
+        self.port = port
+        self.backend = backend
+        self.index = index
+        self.state = TelemetryState()
+        self.bus = TelemetryBus(TELEMETRY_RATES, source=self.state.snapshot)
+        self.state.add_listener(self.bus.notify)
+        self.history = TelemetryHistory(self.state, HISTORY_CAPACITY, default_capacity=1 << 13)
+        self.state.add_sample_listener(self.history.record)
+        self.state.add_listener(self._on_armed)
+        self._leases: dict[str, float] = {}     # topic -> monotonic time a REST read keeps it until
+        self._lease_timer: asyncio.TimerHandle | None = None
+        self.clients = ClientHub(emit, TELEMETRY_TOPICS, self.state.snapshot,
+                                 on_interest=self._on_interest_change)
+        self.bus.subscribe(self.clients.publish)
+        self.recorder = None
+        if log_dir:
+            directory = os.path.join(log_dir, f"vehicle_{system_id}")
+            self.recorder = FlightRecorder(directory, FlightRecorder.schema_for(self.state))
+        self.geofence = GeofenceMonitor(self.state, self._on_geofence)
+        self.state.add_listener(self.geofence.telemetry)
+        spool_dir = os.path.join(camera_dir, f"vehicle_{system_id}") if camera_dir else ""
+        self.camera = FrameStore(spool_dir=spool_dir, **(camera_options or {}))
+        self.camera.listeners.append(self._on_frame)
+        self.camera_mjpeg = Broadcast(max_pending=1)
+        self.controller: DroneController | None = None
+
+    def _wanted_streams(self) -> set[str]:
+        topics = self.clients.interest() | set(self._leases)
+        if self.state["armed"]:
+            # In flight the history and the flight log follow their topics with no client connected
+            topics |= self.history.topics
+            if self.recorder:
+                topics |= self.recorder.topics
+        if self.geofence.fence:
+            topics |= self.geofence.topics
+        return topics
+
+    def _on_interest_change(self, topics):
+        """Only keep the MAVSDK streams that a client, a recent REST read, the geofence or
+        (while armed) the history and recorder need"""
+        if self.controller:
+            self.controller.update_streams(self._wanted_streams())
+
+    def _on_armed(self, topic: str, record):
+        if topic == "armed":
+            self._on_interest_change(None)
+
+    def keep_streaming(self, *topics: str):
+        """Run the streams of ``topics`` for READ_LEASE_S after a REST read"""
+        until = time.monotonic() + READ_LEASE_S
+        new = [topic for topic in topics if topic not in self._leases]
+        for topic in topics:
+            self._leases[topic] = until
+        if new:
+            self._on_interest_change(None)
+        if self._lease_timer is None:
+            self._lease_timer = asyncio.get_running_loop().call_later(READ_LEASE_S, self._expire_leases)
+
+    def _expire_leases(self):
+        now = time.monotonic()
+        expired = [topic for topic, until in self._leases.items() if until <= now]
+        for topic in expired:
+            del self._leases[topic]
+        if expired:
+            self._on_interest_change(None)
+        self._lease_timer = None
+        if self._leases:
+            delay = min(self._leases.values()) - now
+            self._lease_timer = asyncio.get_running_loop().call_later(delay, self._expire_leases)
+
+    def set_geofence(self, fence: Geofence | None, action: str = "rtl", lookahead_s: float | None = None):
+        self.geofence.configure(fence, action, lookahead_s)
+        self._on_interest_change(None)
+
+    def _on_geofence(self, status: str, details: dict):
+        """Alert clients of every geofence status change; RTL on a breach"""
+        icon = {"ok": "✅", "warning": "⚠️"}.get(status, "🚨")
+        print(f"{icon} Vehicle {self.system_id} geofence {status}: {', '.join(details.get('violations', []))}")
+        self.clients.broadcast(GEOFENCE_EVENT, {"status": status, "vehicle": self.system_id,
+                                                "time": time.time(), **details})
+        if self.recorder:
+            self.recorder.event("geofence", status=status, **details)
+        if status == BREACH and self.geofence.action == "rtl" and self.controller and self.state["armed"]:
+            self.controller.submit_command("rtl")
+
+    def _on_frame(self, frame: Frame):
+        self.state.update("camera", frame.name, datetime.utcfromtimestamp(frame.timestamp).isoformat())
+        if self.camera_mjpeg.viewers:
+            self.camera_mjpeg.publish(mjpeg_part(frame.data, frame.content_type))
+
+    def _on_command(self, command: str, status: str, **details):
+        """Push command progress to this vehicle's Socket.IO clients"""
+        self.clients.broadcast(COMMAND_EVENT, {"command": command, "status": status,
+                                               "vehicle": self.system_id, "time": time.time(), **details})
+
+    def start(self):
+        """Create the controller and start recording; returns the controller's run()"""
+        factory = partial(create_drone, self.backend, vehicle=self.index, port=self.port)
+        server = create_mavsdk_server(self.backend, vehicle=self.index, port=self.port)
+        self.controller = DroneController(self.state, drone_factory=factory, server=server)
+        self.camera.start()
+        if self.recorder:
+            self.recorder.start()
+            self.state.add_listener(self.recorder.telemetry)
+            self.controller.command_listeners.append(self.recorder.command)
+        self.controller.command_listeners.append(self._on_command)
+        self.controller.update_streams(self._wanted_streams())
+        return self.controller.run()
+
+    def stop(self):
+        if self.controller:
+            self.controller.commands.stop()
+            self.controller.connection.stop()
+        self.camera.stop()
+        if self.recorder:
+            self.recorder.stop()
+
+    def summary(self) -> dict:
+        def streamed(topic):
+            # None rather than a stale default while the stream isn't running
+            return self.state[topic] if self.controller and self.controller.is_streaming(topic) else None
+
+        return {
+            "system_id": self.system_id,
+            "port": self.port,
+            "backend": self.backend or os.environ.get("CONTROL_STATION_BACKEND", "mavsdk"),
+            "health": self.state["health"],
+            "armed": streamed("armed"),
+            "flight_mode": streamed("flight_mode"),
+            "geofence": self.geofence.status,
+            "link": self.controller.connection.status if self.controller else None,
+            "clients": len(self.clients.sessions),
+        }
+
+
+def parse_vehicles(spec: str) -> dict[int, int]:
+    """``"1:50051,2:50052"`` -> ``{1: 50051, 2: 50052}``.
+
+    A bare system ID gets mavsdk_server port ``50050 + id``.
+    """
+    vehicles = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        system_id, _, port = item.partition(":")
+        system_id = int(system_id)
+        vehicles[system_id] = int(port) if port else DEFAULT_MAVSDK_PORT - 1 + system_id
+    return vehicles
+
+
+class VehicleRegistry:
+    """Vehicles keyed by MAVLink system ID"""
+
+    def __init__(self, emit: Emitter, log_dir: str = "", camera_dir: str = "",
+                 camera_options: dict | None = None):
+        self.emit = emit
+        self.log_dir = log_dir
+        self.camera_dir = camera_dir
+        self.camera_options = camera_options    # FrameStore capacity and retention limits
+        self.vehicles: dict[int, Vehicle] = {}
+
+    def add(self, system_id: int, port: int = DEFAULT_MAVSDK_PORT, backend: str | None = None) -> Vehicle:
+        if system_id in self.vehicles:
+            raise ValueError(f"Vehicle {system_id} already registered")
+        vehicle = Vehicle(system_id, self.emit, port, backend,
+                          index=len(self.vehicles), log_dir=self.log_dir,
+                          camera_dir=self.camera_dir, camera_options=self.camera_options)
+        self.vehicles[system_id] = vehicle
+        return vehicle
+
+    def get(self, system_id: int) -> Vehicle | None:
+        return self.vehicles.get(system_id)
+
+    @property
+    def default(self) -> Vehicle:
+        """The vehicle served by the un-namespaced routes (lowest system ID)"""
+        return self.vehicles[min(self.vehicles)]
+
+    def __iter__(self):
+        return iter(self.vehicles.values())
+
+    def __len__(self):
+        return len(self.vehicles)
@@ -0,0 +1,671 @@
+"""In-process video gateway: RTP/H.264 in, fMP4, raw H.264 and MJPEG out.
+
+The gateway receives the vehicle's RTP stream (UDP 5600) on the event loop
+and reassembles H.264 access units (RFC 6184: single NAL units, STAP-A and
+FU-A). Every output is produced once per frame and the same bytes are
+handed to all viewers:
+
+- ``mp4``: fragmented MP4, one ``moof``/``mdat`` per frame. The H.264 is
+  passed through untouched, so a ``<video>`` element plays it with no
+  transcoding on the station
+- ``h264``: the raw Annex-B elementary stream, for ffplay/VLC/GStreamer
+- ``mjpeg``: decoded and JPEG-encoded in a worker thread, only while
+  someone is watching. Needs the optional ``av`` (PyAV) and ``cv2``
+  packages; only the newest decoded picture is encoded. With a video hub
+  (``video_hub.py``) running, the hub's decoded frames are encoded instead
+  and only ``cv2`` is needed
+
+Each viewer has its own bounded queue. A slow H.264/MP4 viewer skips to
+the next keyframe, and a slow MJPEG viewer only ever gets the newest
+frame, so one bad connection never holds back the others.
+"""
+import asyncio
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple
+
+from api.frame_ring import FrameRingReader
+
+try:
+    import av
+except ImportError:  # optional: only needed for the MJPEG fallback
+    av = None
+
+try:
+    import cv2
+except ImportError:  # optional: only needed for the MJPEG fallback
+    cv2 = None
+
+DEFAULT_PORT = 5600
+RTP_CLOCK = 90000
+RECEIVE_BUFFER = 4 * 1024 * 1024
+MAX_PENDING_UNITS = 60          # per H.264/MP4 viewer, ~2 s at 30 fps
+MJPEG_BOUNDARY = "frame"
+
+NAL_IDR, NAL_SPS, NAL_PPS, NAL_AUD = 5, 7, 8, 9
+NAL_STAP_A, NAL_FU_A = 24, 28
+START_CODE = b"\x00\x00\x00\x01"
+
+_STOP = object()
+
+
+# -----------------------------
+# RTP depacketisation
+# -----------------------------
+class AccessUnit(NamedTuple):
+    timestamp: int          # RTP clock (90 kHz)
+    nals: list[bytes]
+    keyframe: bool
+    received: float         # time.monotonic() of the last packet
+
+
+def annexb(nals) -> bytes:
+    return b"".join(START_CODE + nal for nal in nals)
+
+
+class H264Depacketizer:
+    """RTP packets -> complete access units; units with lost packets are dropped"""
+
+    def __init__(self):
+        self.seq: int | None = None
+        self.timestamp: int | None = None
+        self.packets = 0
+        self.lost = 0
+        self.dropped = 0
+        self.invalid = 0
+        self._nals: list[bytes] = []
+        self._fragment: bytearray | None = None
+        self._broken = False
+
+    def push(self, packet: bytes) -> list[AccessUnit]:
+        if len(packet) < 12 or packet[0] >> 6 != 2:
+            self.invalid += 1
+            return []
+        self.packets += 1
+        offset = 12 + 4 * (packet[0] & 0x0F)
+        if packet[0] & 0x10:  # header extension
+            if len(packet) < offset + 4:
+                self.invalid += 1
+                return []
+            offset += 4 + 4 * struct.unpack_from(">H", packet, offset + 2)[0]
+        end = len(packet) - (packet[-1] if packet[0] & 0x20 else 0)
+        marker = packet[1] & 0x80
+        seq, timestamp = struct.unpack_from(">HI", packet, 2)
+
+        units = []
+        if self.seq is not None:
+            gap = (seq - self.seq - 1) & 0xFFFF
+            if gap >= 0x8000:
+                return []  # late or duplicate
+            if gap:
+                self.lost += gap
+                self._broken = True
+                self._fragment = None
+        self.seq = seq
+        if timestamp != self.timestamp and (self._nals or self._fragment or self._broken):
+            units += self._flush()
+        self.timestamp = timestamp
+        if offset < end:
+            self._payload(packet[offset:end])
+        if marker:
+            units += self._flush()
+        return units
+
+    def _payload(self, payload: bytes):
+        kind = payload[0] & 0x1F
+        if 1 <= kind <= 23:
+            self._nals.append(payload)
+        elif kind == NAL_STAP_A:
+            i = 1
+            while i + 2 <= len(payload):
+                size = struct.unpack_from(">H", payload, i)[0]
+                self._nals.append(payload[i + 2:i + 2 + size])
+                i += 2 + size
+        elif kind == NAL_FU_A and len(payload) > 2:
+            header = payload[1]
+            if header & 0x80:  # start
+                self._fragment = bytearray([(payload[0] & 0xE0) | (header & 0x1F)]) + payload[2:]
+            elif self._fragment is not None:
+                self._fragment += payload[2:]
+            else:
+                self._broken = True
+            if header & 0x40 and self._fragment is not None:  # end
+                self._nals.append(bytes(self._fragment))
+                self._fragment = None
+
+    def _flush(self) -> list[AccessUnit]:
+        nals, broken = self._nals, self._broken or self._fragment is not None
+        self._nals, self._fragment, self._broken = [], None, False
+        if broken:
+            self.dropped += 1
+            return []
+        if not nals:
+            return []
+        keyframe = any(nal[0] & 0x1F == NAL_IDR for nal in nals)
+        return [AccessUnit(self.timestamp, nals, keyframe, time.monotonic())]
+
+
+# -----------------------------
+# Fragmented MP4
+# -----------------------------
+class _Bits:
+    def __init__(self, data: bytes):
+        self.value = int.from_bytes(data, "big")
+        self.left = len(data) * 8
+
+    def read(self, n: int) -> int:
+        self.left -= n
+        if self.left < 0:
+            raise ValueError("truncated SPS")
+        return (self.value >> self.left) & ((1 << n) - 1)
+
+    def ue(self) -> int:
+        zeros = 0
+        while not self.read(1):
+            zeros += 1
+        return (1 << zeros) - 1 + self.read(zeros)
+
+    def se(self) -> int:
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def parse_sps(sps: bytes) -> tuple[int, int]:
+    """Picture width and height from an SPS NAL unit"""
+    bits = _Bits(sps[1:].replace(b"\x00\x00\x03", b"\x00\x00"))
+    profile = bits.read(8)
+    bits.read(16)               # constraint flags, level
+    bits.ue()                   # sps id
+    chroma = 1
+    if profile in (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+        chroma = bits.ue()
+        if chroma == 3:
+            bits.read(1)
+        bits.ue()
+        bits.ue()               # bit depths
+        bits.read(1)
+        if bits.read(1):        # scaling matrices
+            for i in range(12 if chroma == 3 else 8):
+                if bits.read(1):
+                    last = following = 8
+                    for _ in range(16 if i < 6 else 64):
+                        if following:
+                            following = (last + bits.se()) % 256
+                        last = following or last
+    bits.ue()                   # log2_max_frame_num
+    poc_type = bits.ue()
+    if poc_type == 0:
+        bits.ue()
+    elif poc_type == 1:
+        bits.read(1)
+        bits.se()
+        bits.se()
+        for _ in range(bits.ue()):
+            bits.se()
+    bits.ue()                   # max_num_ref_frames
+    bits.read(1)
+    width = (bits.ue() + 1) * 16
+    map_height = bits.ue() + 1
+    frame_mbs_only = bits.read(1)
+    if not frame_mbs_only:
+        bits.read(1)
+    bits.read(1)
+    height = (2 - frame_mbs_only) * map_height * 16
+    if bits.read(1):            # cropping
+        left, right, top, bottom = bits.ue(), bits.ue(), bits.ue(), bits.ue()
+        crop_x = 1 if chroma in (0, 3) else 2
+        crop_y = (1 if chroma in (0, 2, 3) else 2) * (2 - frame_mbs_only)
+        width -= (left + right) * crop_x
+        height -= (top + bottom) * crop_y
+    return width, height
+
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I", 8 + len(body)) + kind + body
+
+
+def _full_box(kind: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(kind, struct.pack(">I", version << 24 | flags), *payload)
+
+
+_MATRIX = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+class Fmp4Muxer:
+    """One H.264 track, one sample per fragment"""
+
+    def __init__(self, sps: bytes, pps: bytes):
+        self.sps, self.pps = sps, pps
+        self.width, self.height = parse_sps(sps)
+        self.sequence = 0
+        self.init_segment = self._init_segment()
+
+    def _init_segment(self) -> bytes:
+        w, h = self.width, self.height
+        avcc = _box(b"avcC", bytes([1, self.sps[1], self.sps[2], self.sps[3], 0xFF, 0xE1]),
+                    struct.pack(">H", len(self.sps)), self.sps, b"\x01",
+                    struct.pack(">H", len(self.pps)), self.pps)
+        avc1 = _box(b"avc1", bytes(6), struct.pack(">H", 1), bytes(16), struct.pack(">HHII", w, h, 0x480000, 0x480000),
+                    bytes(4), struct.pack(">H", 1), bytes(32), struct.pack(">Hh", 0x18, -1), avcc)
+        empty = struct.pack(">I", 0)
+        stbl = _box(b"stbl", _full_box(b"stsd", 0, 0, struct.pack(">I", 1), avc1),
+                    _full_box(b"stts", 0, 0, empty), _full_box(b"stsc", 0, 0, empty),
+                    _full_box(b"stsz", 0, 0, empty, empty), _full_box(b"stco", 0, 0, empty))
+        minf = _box(b"minf", _full_box(b"vmhd", 0, 1, bytes(8)),
+                    _box(b"dinf", _full_box(b"dref", 0, 0, struct.pack(">I", 1), _full_box(b"url ", 0, 1))),
+                    stbl)
+        mdia = _box(b"mdia", _full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, RTP_CLOCK, 0, 0x55C4, 0)),
+                    _full_box(b"hdlr", 0, 0, empty, b"vide", bytes(12), b"VideoHandler\x00"),
+                    minf)
+        tkhd = _full_box(b"tkhd", 0, 3, struct.pack(">IIIII", 0, 0, 1, 0, 0), bytes(8),
+                         struct.pack(">hhhH", 0, 0, 0, 0), _MATRIX, struct.pack(">II", w << 16, h << 16))
+        mvhd = _full_box(b"mvhd", 0, 0, struct.pack(">IIIIIH", 0, 0, 1000, 0, 0x10000, 0x100), bytes(10),
+                         _MATRIX, bytes(24), struct.pack(">I", 2))
+        mvex = _box(b"mvex", _full_box(b"trex", 0, 0, struct.pack(">IIIII", 1, 1, 0, 0, 0)))
+        ftyp = _box(b"ftyp", b"isom", struct.pack(">I", 0x200), b"isom", b"iso6", b"avc1", b"mp41")
+        return ftyp + _box(b"moov", mvhd, _box(b"trak", tkhd, mdia), mvex)
+
+    def fragment(self, nals, decode_time: int, duration: int, keyframe: bool) -> bytes:
+        self.sequence += 1
+        sample = b"".join(struct.pack(">I", len(nal)) + nal for nal in nals)
+        flags = 0x02000000 if keyframe else 0x01010000
+
+        def moof(data_offset: int) -> bytes:
+            return _box(b"moof", _full_box(b"mfhd", 0, 0, struct.pack(">I", self.sequence)),
+                        _box(b"traf", _full_box(b"tfhd", 0, 0x020000, struct.pack(">I", 1)),
+                             _full_box(b"tfdt", 1, 0, struct.pack(">Q", decode_time)),
+                             _full_box(b"trun", 0, 0x000701,
+                                       struct.pack(">IiIII", 1, data_offset, duration, len(sample), flags))))
+
+        header = moof(0)
+        return moof(len(header) + 8) + _box(b"mdat", sample)
+
+
+# -----------------------------
+# Fan-out to viewers
+# -----------------------------
+class Viewer:
+    def __init__(self, max_pending: int, keyframes: bool):
+        self.pending: deque[bytes] = deque()
+        self.max_pending = max_pending
+        self.keyframes = keyframes          # may only start at a keyframe
+        self.waiting = keyframes
+        self.event = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.connected = time.time()
+
+    def offer(self, chunk: bytes, keyframe: bool, header: bytes | None):
+        if self.waiting:
+            if not keyframe or header is None:
+                self.dropped += 1
+                return
+            self.waiting = False
+            chunk = header + chunk
+        elif len(self.pending) >= self.max_pending:
+            if self.keyframes:
+                # Everything queued depends on what came before; resume at
+                # the next keyframe (which may be this one)
+                self.dropped += len(self.pending)
+                self.pending.clear()
+                if not keyframe:
+                    self.dropped += 1
+                    self.waiting = True
+                    return
+            else:
+                self.pending.popleft()
+                self.dropped += 1
+        self.pending.append(chunk)
+        self.event.set()
+
+    async def next(self) -> bytes:
+        while not self.pending:
+            self.event.clear()
+            await self.event.wait()
+        self.sent += 1
+        return self.pending.popleft()
+
+
+class Broadcast:
+    """Publishes each chunk once to every viewer's own queue"""
+
+    def __init__(self, max_pending: int = 1, keyframes: bool = False):
+        self.max_pending = max_pending
+        self.keyframes = keyframes
+        self.viewers: set[Viewer] = set()
+        self.latest: bytes | None = None    # handed to new viewers when keyframes=False
+        self.published = 0
+        self.dropped = 0                    # by viewers that have left
+
+    def publish(self, chunk: bytes, keyframe: bool = True, header: bytes | None = b""):
+        self.published += 1
+        if not self.keyframes:
+            self.latest = chunk
+        for viewer in self.viewers:
+            viewer.offer(chunk, keyframe, header)
+
+    def resync(self):
+        """Restart every viewer at the next keyframe (e.g. after a resolution change)"""
+        for viewer in self.viewers:
+            viewer.pending.clear()
+            viewer.waiting = True
+
+    async def stream(self, initial: bytes | None = None):
+        """Async iterator of chunks for one viewer, for a ``StreamingResponse``"""
+        viewer = Viewer(self.max_pending, self.keyframes)
+        initial = initial or self.latest
+        if initial is not None:
+            viewer.offer(initial, True, b"")
+        self.viewers.add(viewer)
+        try:
+            while True:
+                yield await viewer.next()
+        finally:
+            self.viewers.discard(viewer)
+            self.dropped += viewer.dropped
+
+    def stats(self) -> dict:
+        return {
+            "viewers": len(self.viewers),
+            "published": self.published,
+            "dropped": self.dropped + sum(viewer.dropped for viewer in self.viewers),
+            "queued": [len(viewer.pending) for viewer in self.viewers],
+        }
+
+
+def mjpeg_part(jpeg: bytes, content_type: str = "image/jpeg") -> bytes:
+    """One part of a ``multipart/x-mixed-replace`` MJPEG stream"""
+    return (f"--{MJPEG_BOUNDARY}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg + b"\r\n"
+
+
+MJPEG_MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+
+
+class MjpegEncoder:
+    """Decodes access units in a thread; JPEG-encodes only the newest picture"""
+
+    def __init__(self, on_jpeg: Callable[[bytes], None], quality: int = 80, max_fps: float = 30.0):
+        self.on_jpeg = on_jpeg
+        self.quality = quality
+        self.max_fps = max_fps
+        self.decoded = 0
+        self.encoded = 0
+        self.errors = 0
+        self.overruns = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_PENDING_UNITS)
+        self._waiting = True
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @staticmethod
+    def available() -> bool:
+        return av is not None and cv2 is not None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._thread:
+            return
+        self._loop = loop
+        self._thread = threading.Thread(target=self._run, name="mjpeg-encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def feed(self, data: bytes, keyframe: bool):
+        """Called on the event loop; ``data`` is Annex-B with SPS/PPS before keyframes"""
+        if self._waiting and not keyframe:
+            return
+        self._waiting = False
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            # Decoder can't keep up; pick up again at the next keyframe
+            self.overruns += 1
+            self._waiting = True
+
+    def pause(self):
+        """No viewers: stop decoding until the next keyframe after ``feed`` resumes"""
+        self._waiting = True
+
+    def _run(self):
+        decoder = av.CodecContext.create("h264", "r")
+        latest = None
+        last_encode = 0.0
+        while True:
+            data = self._queue.get()
+            if data is _STOP:
+                return
+            try:
+                frames = decoder.decode(av.Packet(data))
+            except Exception:
+                self.errors += 1
+                continue
+            if frames:
+                latest = frames[-1]
+                self.decoded += len(frames)
+            now = time.monotonic()
+            # Some slack so jitter at the source rate does not halve it
+            if latest is None or not self._queue.empty() or now - last_encode < 0.75 / self.max_fps:
+                continue
+            ok, jpeg = cv2.imencode(".jpg", latest.to_ndarray(format="bgr24"),
+                                    [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            latest = None
+            if ok:
+                last_encode = now
+                self.encoded += 1
+                self._loop.call_soon_threadsafe(self.on_jpeg, jpeg.tobytes())
+
+    def stats(self) -> dict:
+        return {"decoded": self.decoded, "encoded": self.encoded, "errors": self.errors,
+                "overruns": self.overruns, "queued": self._queue.qsize()}
+
+
+class HubMjpegEncoder(MjpegEncoder):
+    """Encodes the video hub's already decoded frames instead of decoding again"""
+
+    def __init__(self, hub: str, on_jpeg: Callable[[bytes], None], quality: int = 80, max_fps: float = 30.0):
+        super().__init__(on_jpeg, quality, max_fps)
+        self.hub = hub
+        self.attached = False
+
+    @staticmethod
+    def available() -> bool:
+        return cv2 is not None
+
+    def feed(self, data: bytes, keyframe: bool):
+        self._waiting = False
+
+    def pause(self):
+        self._waiting = True
+
+    def _run(self):
+        reader = None
+        last_frame = last_encode = 0.0
+        while self._queue.empty():
+            if self._waiting:
+                time.sleep(0.05)
+                continue
+            if reader is None:
+                try:
+                    reader = FrameRingReader(self.hub)
+                    self.attached, last_frame = True, time.monotonic()
+                except (FileNotFoundError, RuntimeError):
+                    time.sleep(1.0)
+                    continue
+            if not reader.wait(0.1):
+                if time.monotonic() - last_frame > 2.0:
+                    # Hub gone or restarted with a new segment; attach again
+                    reader.close()
+                    reader, self.attached = None, False
+                continue
+            last_frame = time.monotonic()
+            delay = last_encode + 0.75 / self.max_fps - last_frame
+            if delay > 0:
+                time.sleep(delay)
+            frame = reader.read(newest=True)
+            if frame is None:
+                continue
+            self.decoded = reader.read_count
+            self.overruns = reader.dropped
+            ok, jpeg = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not frame.valid():
+                self.errors += 1  # overwritten while encoding
+                continue
+            if ok:
+                last_encode = time.monotonic()
+                self.encoded += 1
+                self._loop.call_soon_threadsafe(self.on_jpeg, jpeg.tobytes())
+        if reader:
+            reader.close()
+
+    def stats(self) -> dict:
+        return {"hub": self.hub, "attached": self.attached, **super().stats()}
+
+
+# -----------------------------
+# Gateway
+# -----------------------------
+class _Receiver(asyncio.DatagramProtocol):
+    def __init__(self, gateway: "VideoGateway"):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        for unit in self.gateway.depacketizer.push(data):
+            self.gateway._on_unit(unit)
+
+
+class VideoGateway:
+    """Receives one RTP/H.264 stream and serves it to any number of viewers"""
+
+    def __init__(self, port: int = DEFAULT_PORT, host: str = "0.0.0.0",
+                 mjpeg_quality: int = 80, mjpeg_fps: float = 30.0, hub: str = ""):
+        self.port = port
+        self.host = host
+        self.depacketizer = H264Depacketizer()
+        self.mp4 = Broadcast(MAX_PENDING_UNITS, keyframes=True)
+        self.h264 = Broadcast(MAX_PENDING_UNITS, keyframes=True)
+        self.mjpeg = Broadcast(max_pending=1)
+        if hub:
+            self.encoder = (HubMjpegEncoder(hub, self._on_jpeg, mjpeg_quality, mjpeg_fps)
+                            if HubMjpegEncoder.available() else None)
+        else:
+            self.encoder = MjpegEncoder(self._on_jpeg, mjpeg_quality, mjpeg_fps) if MjpegEncoder.available() else None
+        self.muxer: Fmp4Muxer | None = None
+        self.sps: bytes | None = None
+        self.pps: bytes | None = None
+        self.error: str | None = None
+        self.units = 0
+        self.last_unit = 0.0
+        self._arrivals: deque[float] = deque(maxlen=120)
+        self._transport = None
+        self._last_timestamp: int | None = None
+        self._decode_time = 0
+        self._duration = RTP_CLOCK // 30
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            sock.bind((self.host, self.port))
+        except OSError as e:
+            sock.close()
+            self.error = f"cannot bind UDP {self.port}: {e}"
+            print(f"❌ Video gateway disabled: {self.error}")
+            return
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _Receiver(self), sock=sock)
+        if self.encoder:
+            self.encoder.start(loop)
+        print(f"🎥 Video gateway listening for RTP/H.264 on UDP {self.port}")
+
+    def stop(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        if self.encoder:
+            self.encoder.stop()
+
+    @property
+    def listening(self) -> bool:
+        return self._transport is not None
+
+    @property
+    def streaming(self) -> bool:
+        return self.units > 0 and time.monotonic() - self.last_unit < 2.0
+
+    def fps(self) -> float:
+        now = time.monotonic()
+        recent = [t for t in self._arrivals if now - t < 4.0]
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6) if len(recent) > 1 else 0.0
+
+    def _on_unit(self, unit: AccessUnit):
+        self.units += 1
+        self.last_unit = unit.received
+        self._arrivals.append(unit.received)
+
+        sps = next((nal for nal in unit.nals if nal[0] & 0x1F == NAL_SPS), None)
+        pps = next((nal for nal in unit.nals if nal[0] & 0x1F == NAL_PPS), None)
+        if (sps and sps != self.sps) or (pps and pps != self.pps):
+            self.sps, self.pps = sps or self.sps, pps or self.pps
+            if self.sps and self.pps:
+                try:
+                    self.muxer = Fmp4Muxer(self.sps, self.pps)
+                    print(f"🎥 Video stream {self.muxer.width}x{self.muxer.height}")
+                except ValueError as e:
+                    print(f"❌ Unreadable SPS: {e}")
+                    self.muxer = None
+                self.mp4.resync()
+                self.h264.resync()
+
+        # RTP timestamps -> a decode timeline that never goes backwards
+        if self._last_timestamp is not None:
+            delta = (unit.timestamp - self._last_timestamp) & 0xFFFFFFFF
+            if 0 < delta < RTP_CLOCK:
+                self._duration = delta
+            self._decode_time += delta if 0 < delta < RTP_CLOCK else self._duration
+        self._last_timestamp = unit.timestamp
+
+        config = [self.sps, self.pps] if self.sps and self.pps else None
+        if self.mp4.viewers and self.muxer:
+            samples = [nal for nal in unit.nals if nal[0] & 0x1F not in (NAL_SPS, NAL_PPS, NAL_AUD)]
+            fragment = self.muxer.fragment(samples, self._decode_time, self._duration, unit.keyframe)
+            self.mp4.publish(fragment, unit.keyframe, self.muxer.init_segment)
+        if self.h264.viewers:
+            self.h264.publish(annexb(unit.nals), unit.keyframe, annexb(config) if config else None)
+        if self.encoder:
+            if self.mjpeg.viewers:
+                prefix = annexb(config) if unit.keyframe and config else b""
+                self.encoder.feed(prefix + annexb(unit.nals), unit.keyframe)
+            else:
+                self.encoder.pause()
+
+    def _on_jpeg(self, jpeg: bytes):
+        self.mjpeg.publish(mjpeg_part(jpeg))
+
+    def status(self) -> dict:
+        return {
+            "status": "streaming" if self.streaming else "waiting" if self.listening else "unavailable",
+            "source": f"udp:{self.port}",
+            "error": self.error,
+            "codec": "h264",
+            "width": self.muxer.width if self.muxer else None,
+            "height": self.muxer.height if self.muxer else None,
+            "fps": round(self.fps(), 1),
+            "frames": self.units,
+            "rtp": {"packets": self.depacketizer.packets, "lost": self.depacketizer.lost,
+                    "dropped_frames": self.depacketizer.dropped, "invalid": self.depacketizer.invalid},
+            "mp4": self.mp4.stats(),
+            "h264": self.h264.stats(),
+            "mjpeg": {"available": self.encoder is not None, **self.mjpeg.stats(),
+                      **(self.encoder.stats() if self.encoder else {})},
+        }
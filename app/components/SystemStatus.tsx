@@ -1,11 +1,31 @@
 "use client";
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { io, Socket } from "socket.io-client";
 
+// Progress of a queued command, pushed as the "command" Socket.IO event
+interface CommandEvent {
+  command: string;
+  status: string;   // queued, running, ok, failed, timeout, cancelled, superseded
+  id: number;
+  error?: string;
+}
+
+const FINAL_STATUSES = ['ok', 'failed', 'timeout', 'cancelled', 'superseded'];
+
+function reportCommand(action: string, event: CommandEvent) {
+  console.log(`${action} ${event.status}`, event);
+  if (event.status !== 'ok') {
+    alert(`${action} failed: ${event.error ?? event.status}`);
+  }
+}
+
 export default function DroneControls() {
   const [droneHealth, setDroneHealth] = useState("starting");
   const [isLoading, setIsLoading] = useState(false);
   const [socket, setSocket] = useState<Socket | null>(null);
+  // Commands this panel sent (ID -> action) and final events that arrived before the POST returned
+  const pendingCommands = useRef(new Map<number, string>());
+  const finishedCommands = useRef(new Map<number, CommandEvent>());
 
   useEffect(() => {
     const newSocket = io("http://localhost:5328");
@@ -17,6 +37,18 @@ export default function DroneControls() {
       setDroneHealth(health);
     });
 
+    // Commands are accepted with 202 and finish later; report the ones that fail
+    newSocket.on("command", (event: CommandEvent) => {
+      if (!FINAL_STATUSES.includes(event.status)) return;
+      const action = pendingCommands.current.get(event.id);
+      if (action === undefined) {
+        finishedCommands.current.set(event.id, event);
+        return;
+      }
+      pendingCommands.current.delete(event.id);
+      reportCommand(action, event);
+    });
+
     return () => {
       newSocket.disconnect();
     };
@@ -35,11 +67,17 @@ export default function DroneControls() {
       const result = await response.json();
       console.log(`${action} result:`, result);
       
-      // Show user feedback
-      if (result.status.includes('successfully') || result.status.includes('initiated') || result.status.includes('triggered')) {
-        // Success feedback could be added here
+      // 202 means queued; the outcome arrives as a "command" event
+      if (!response.ok) {
+        alert(`${action} failed: ${result.detail ?? response.statusText}`);
+        return;
+      }
+      const finished = finishedCommands.current.get(result.command_id);
+      finishedCommands.current.clear();
+      if (finished) {
+        reportCommand(action, finished);
       } else {
-        alert(`${action} failed: ${result.status}`);
+        pendingCommands.current.set(result.command_id, action);
       }
     } catch (error) {
       console.error(`${action} error:`, error);
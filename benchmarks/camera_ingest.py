@@ -0,0 +1,102 @@
+"""Camera upload throughput and event-loop stalls, old handler vs FrameStore.
+
+Uploads ``--frames`` JPEG-sized frames at ``--fps`` through an in-process
+ASGI client while a ticker on the same loop measures how late it wakes up
+(what a telemetry stream sharing the loop would see):
+
+- ``legacy``: the old handler, a blocking ``open().write()`` per frame
+- ``store``: ``FrameStore`` with the disk spooler enabled
+- ``store-ws``: the same store fed over a WebSocket-style loop (no HTTP)
+
+    PYTHONPATH=. python benchmarks/camera_ingest.py --fps 30 --size 300 --frames 600
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, File, Request, UploadFile
+
+from api.camera import FrameStore
+
+
+def make_app(directory: str, store: FrameStore) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/legacy")
+    async def legacy(frame: UploadFile = File(...)):
+        filename = f"frame_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.jpg"
+        with open(os.path.join(directory, filename), "wb") as dst:
+            dst.write(await frame.read())
+        return {"status": "success"}
+
+    @app.post("/store")
+    async def post_store(request: Request):
+        data = bytearray()
+        async for chunk in request.stream():
+            data += chunk
+        return {"status": "success", "seq": store.add(bytes(data)).seq}
+
+    return app
+
+
+async def ticker(lags: list, period: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + period
+        await asyncio.sleep(period)
+        lags.append(loop.time() - expected)
+
+
+async def run(mode: str, args, payload: bytes) -> dict:
+    directory = tempfile.mkdtemp(prefix="camera_bench_")
+    store = FrameStore(capacity=64, spool_dir=directory, max_spool_bytes=1 << 40)
+    store.start()
+    app = make_app(directory, store)
+    lags: list[float] = []
+    tick = asyncio.create_task(ticker(lags))
+    interval = 1.0 / args.fps
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(args.frames):
+            if mode == "legacy":
+                await client.post("/legacy", files={"frame": ("frame.jpg", payload, "image/jpeg")})
+            elif mode == "store":
+                await client.post("/store", content=payload, headers={"Content-Type": "image/jpeg"})
+            else:
+                store.add(payload)
+            delay = started + (i + 1) * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    elapsed = loop.time() - started
+    tick.cancel()
+    store.stop()
+    files = len(os.listdir(directory))
+    shutil.rmtree(directory)
+    lags_ms = np.array(lags) * 1000
+    return {"fps": args.frames / elapsed, "p50": np.percentile(lags_ms, 50),
+            "p99": np.percentile(lags_ms, 99), "max": lags_ms.max(), "files": files,
+            "spool_dropped": store.spool_dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--size", type=int, default=300, help="frame size in KB")
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+    payload = os.urandom(args.size * 1024)
+    print(f"{args.frames} frames of {args.size} KB at {args.fps:g} fps")
+    for mode in ("legacy", "store", "store-ws"):
+        r = asyncio.run(run(mode, args, payload))
+        print(f"{mode:>9}: {r['fps']:6.1f} fps, loop lag p50 {r['p50']:5.2f} ms, p99 {r['p99']:6.2f} ms, "
+              f"max {r['max']:6.2f} ms, {r['files']} files on disk, {r['spool_dropped']} spool drops")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Geofence check cost with and without the grid index.
+
+Scatters ``--polygons`` no-fly zones over a ``--area`` km square inside one
+inclusion polygon and times ``GeofenceMonitor``-sized checks (the current
+position plus the predicted points) at random positions. The unindexed
+fence is the same code with a single grid cell, i.e. every position tested
+against every polygon edge.
+
+    PYTHONPATH=. python benchmarks/geofence.py --polygons 500 --vertices 16
+"""
+import argparse
+import time
+
+import numpy as np
+
+from api.geofence import INCLUSION, FencePolygon, Geofence
+
+LAT, LON = 41.0, 29.0
+DEG_PER_M = 1 / 111_320
+
+
+def random_fence(count: int, vertices: int, area_km: float, seed: int = 0) -> list[FencePolygon]:
+    rng = np.random.default_rng(seed)
+    half = area_km * 500 * DEG_PER_M
+    polygons = [FencePolygon([[LAT - half, LON - half], [LAT + half, LON - half],
+                              [LAT + half, LON + half], [LAT - half, LON + half]], INCLUSION, "area")]
+    for i in range(count):
+        centre = (LAT + rng.uniform(-half, half), LON + rng.uniform(-half, half))
+        radius = rng.uniform(50, 300) * DEG_PER_M
+        angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+        ring = np.column_stack([centre[0] + radius * np.sin(angles), centre[1] + radius * np.cos(angles)])
+        polygons.append(FencePolygon(ring, name=f"nfz{i}", max_alt=120))
+    return polygons
+
+
+def positions(checks: int, points: int, area_km: float, seed: int = 1) -> np.ndarray:
+    """``(checks, points, 2)`` lat/lon: random positions plus points ahead of each"""
+    rng = np.random.default_rng(seed)
+    spread = area_km * 450 * DEG_PER_M
+    current = rng.uniform(-spread, spread, (checks, 2))
+    heading = rng.uniform(0, 2 * np.pi, checks)
+    direction = np.column_stack([np.cos(heading), np.sin(heading)])
+    ahead = np.linspace(0, 50 * DEG_PER_M, points)  # 10 m/s for 5 s
+    return np.array([LAT, LON]) + current[:, None, :] + direction[:, None, :] * ahead[None, :, None]
+
+
+def run(fence: Geofence, flight: np.ndarray, alt: np.ndarray):
+    results = []
+    started = time.perf_counter()
+    for latlon in flight:
+        results.append(fence.check(latlon, alt))
+    return (time.perf_counter() - started) / len(flight), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polygons", type=int, default=500)
+    parser.add_argument("--vertices", type=int, default=16)
+    parser.add_argument("--area", type=float, default=20.0, help="side of the operating area in km")
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=6, help="current position plus predicted points")
+    args = parser.parse_args()
+
+    polygons = random_fence(args.polygons, args.vertices, args.area)
+    flight = positions(args.checks, args.points, args.area)
+    alt = np.full(args.points, 60.0)
+
+    started = time.perf_counter()
+    indexed = Geofence(polygons, max_altitude=150)
+    build = time.perf_counter() - started
+    brute = Geofence(polygons, max_altitude=150, cell_size=1e9)
+
+    indexed_s, indexed_results = run(indexed, flight, alt)
+    brute_s, brute_results = run(brute, flight, alt)
+    breaches = sum(bool(r[0]) for r in indexed_results)
+    warnings = sum(any(r[1:]) and not r[0] for r in indexed_results)
+    print(f"{args.polygons} polygons x {args.vertices} vertices, {len(indexed.grid)} grid cells "
+          f"of {indexed.cell:.0f} m, built in {build * 1000:.1f} ms")
+    print(f"all edges:  {brute_s * 1e6:8.1f} us/check")
+    print(f"grid index: {indexed_s * 1e6:8.1f} us/check ({brute_s / indexed_s:.1f}x)")
+    print(f"{breaches} of {args.checks} positions in breach, {warnings} more predicted; "
+          f"results {'match' if indexed_results == brute_results else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Measure how long the station takes to recover from link failures.
+
+A fake autopilot process streams heartbeats and GLOBAL_POSITION_INT over
+UDP. The script runs a ``DroneController``'s connection supervisor against
+it and reports the outages the supervisor measured:
+
+- ``blip``: the autopilot goes silent for ``--blip`` seconds
+- ``server``: the managed mavsdk_server is killed (mavsdk backend only)
+
+    PYTHONPATH=. python benchmarks/link_recovery.py --backends mavlink,mavsdk --blip 4 --rounds 3
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from functools import partial
+
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.connection import MavsdkServer, find_mavsdk_server
+from api.drone_controller import DroneController
+from api.drone_handler import create_drone
+from api.telemetry_state import TelemetryState
+
+
+def autopilot(port: int, rate: float, silent, stop):
+    """Fake PX4 on ``port``; sends nothing while ``silent`` is set"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sock.bind(("127.0.0.1", 0))
+
+    class Out:
+        def write(self, buf):
+            if not silent.is_set():
+                sock.sendto(buf, ("127.0.0.1", port))
+
+    mav = mavlink.MAVLink(Out(), srcSystem=1, srcComponent=1)
+    parser = mavlink.MAVLink(None)
+    next_heartbeat = next_position = time.monotonic()
+    boot = time.monotonic()
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= next_heartbeat:
+            mav.heartbeat_send(mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_PX4,
+                               mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, 0, mavlink.MAV_STATE_ACTIVE)
+            next_heartbeat += 0.5
+        if now >= next_position:
+            ms = int((now - boot) * 1000)
+            mav.global_position_int_send(ms, 410082000 + ms % 1000, 289784000, 60000, 20000, 0, 0, 0, 0)
+            next_position += 1.0 / rate
+        try:
+            data, _ = sock.recvfrom(2048)
+            for msg in parser.parse_buffer(data) or []:
+                if msg.get_type() == "COMMAND_LONG" and not silent.is_set():
+                    mav.command_ack_send(msg.command, mavlink.MAV_RESULT_ACCEPTED)
+        except BlockingIOError:
+            pass
+        time.sleep(0.002)
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run_backend(name: str, args) -> list[dict]:
+    udp_port = args.port
+    silent, stop = multiprocessing.Event(), multiprocessing.Event()
+    sender = multiprocessing.Process(target=autopilot, args=(udp_port, args.rate, silent, stop), daemon=True)
+    sender.start()
+
+    server = None
+    if name == "mavsdk":
+        binary = find_mavsdk_server()
+        if binary is None:
+            raise SystemExit("mavsdk_server not found")
+        server = MavsdkServer(binary, args.grpc_port, f"udp://:{udp_port}")
+        factory = partial(create_drone, "mavsdk", port=args.grpc_port)
+    else:
+        factory = partial(create_drone, "mavlink")
+        os.environ["CONTROL_STATION_MAVLINK_PORT"] = str(udp_port)
+
+    controller = DroneController(TelemetryState(), drone_factory=factory, server=server)
+    supervisor = controller.connection
+    supervisor.stale_timeout = args.stale
+    task = asyncio.create_task(supervisor.run())
+    await asyncio.wait_for(supervisor.connected.wait(), 60)
+    await wait_for(lambda: supervisor.link.current_rate() > 0, 10)
+
+    scenarios = ["blip"] + (["server"] if server else [])
+    for scenario in scenarios:
+        for _ in range(args.rounds):
+            count = len(supervisor.outages)
+            if scenario == "blip":
+                silent.set()
+                await asyncio.sleep(args.blip)
+                silent.clear()
+            else:
+                os.kill(server.process.pid, signal.SIGKILL)
+            if not await wait_for(lambda: len(supervisor.outages) > count, 60):
+                print(f"{name} {scenario}: no recovery within 60 s ({supervisor.status})")
+                continue
+            await asyncio.sleep(1.0)
+            outage = supervisor.outages[-1]
+            print(f"{name:>8} {scenario:>7}: outage {outage['outage_s']:6.2f} s, "
+                  f"recovered {outage['recovery_s']:6.2f} s after detection ({outage['reason']})")
+
+    stats = supervisor.stats()
+    task.cancel()
+    supervisor.stop()
+    controller.stop_streams()
+    if hasattr(controller.drone, "close"):
+        controller.drone.close()
+    stop.set()
+    sender.join(2)
+    return stats["outages"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="mavlink,mavsdk")
+    parser.add_argument("--blip", type=float, default=4.0, help="seconds the autopilot stays silent")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=20.0, help="GLOBAL_POSITION_INT per second")
+    parser.add_argument("--stale", type=float, default=5.0, help="supervisor stale-telemetry timeout")
+    parser.add_argument("--port", type=int, default=14580)
+    parser.add_argument("--grpc-port", type=int, default=50091)
+    args = parser.parse_args()
+    for name in args.backends.split(","):
+        asyncio.run(run_backend(name, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Throughput of the vectorised log ingestion against a per-message loop.
+
+Writes a synthetic tlog and ULog (or uses the files given), ingests them
+with ``api.log_ingest``, and reports messages per second. For the tlog, a
+pymavlink ``recv_match`` loop over the first ``--baseline`` messages is
+timed for comparison.
+
+    PYTHONPATH=. python benchmarks/log_ingest.py --messages 2000000
+    PYTHONPATH=. python benchmarks/log_ingest.py --tlog flight.tlog --ulog flight.ulg
+"""
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.log_ingest import ingest_tlog, ingest_ulog
+
+
+def write_tlog(path: str, messages: int, seed: int = 0):
+    """Vehicle telemetry mix at PX4-like ratios, plus GCS heartbeats"""
+    rng = np.random.default_rng(seed)
+    vehicle = mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    gcs = mavlink.MAVLink(None, srcSystem=255, srcComponent=190)
+    t0 = time.time()
+    with open(path, "wb") as f:
+        for i in range(messages):
+            t = t0 + i * 0.001
+            kind = i % 10
+            if kind < 4:
+                msg = vehicle.attitude_encode(i, *rng.normal(0, 0.2, 3), 0, 0, 0)
+            elif kind < 6:
+                msg = vehicle.global_position_int_encode(i, 410082000 + i, 289784000 - i, 60000, 20000, 0, 0, 0, 0)
+            elif kind < 8:
+                msg = vehicle.local_position_ned_encode(i, 0, 0, -20, *rng.normal(0, 2, 3))
+            elif kind == 8:
+                msg = vehicle.servo_output_raw_encode(i, 0, *([1500] * 8))
+            elif i % 100 == 9:
+                msg = vehicle.battery_status_encode(0, 0, 0, 2500, [4100, 4100, 4100] + [65535] * 7,
+                                                    -1, -1, -1, 80 - i * 50 // messages)
+            else:
+                msg = gcs.heartbeat_encode(6, 8, 0, 0, 0)
+            source = gcs if msg.get_srcSystem() == 255 else vehicle
+            f.write(struct.pack(">Q", int(t * 1e6)) + msg.pack(source))
+
+
+def write_ulog(path: str, messages: int, seed: int = 0):
+    """Minimal ULog with vehicle_attitude, vehicle_local_position and battery_status"""
+    rng = np.random.default_rng(seed)
+    formats = {
+        "vehicle_attitude": "uint64_t timestamp;float[4] q;uint8_t[4] _padding0",
+        "vehicle_local_position": "uint64_t timestamp;float x;float y;float z;float vx;float vy;float vz",
+        "battery_status": "uint64_t timestamp;float voltage_v;float remaining;float temperature",
+    }
+
+    def message(kind: bytes, body: bytes) -> bytes:
+        return struct.pack("<HB", len(body), kind[0]) + body
+
+    with open(path, "wb") as f:
+        f.write(b"ULog\x01\x12\x35" + bytes([1]) + struct.pack("<Q", 0))
+        for name, fields in formats.items():
+            f.write(message(b"F", f"{name}:{fields}".encode()))
+        for msg_id, name in enumerate(formats):
+            f.write(message(b"A", struct.pack("<BH", 0, msg_id) + name.encode()))
+        for i in range(messages):
+            ts = 1_000_000 + i * 1000
+            kind = i % 5
+            if kind < 3:
+                yaw = rng.uniform(-np.pi, np.pi)
+                q = (np.cos(yaw / 2), 0.0, 0.0, np.sin(yaw / 2))
+                # trailing padding is not logged
+                f.write(message(b"D", struct.pack("<HQ4f", 0, ts, *q)))
+            elif kind < 4:
+                f.write(message(b"D", struct.pack("<HQ6f", 1, ts, 0, 0, -20, *rng.normal(0, 2, 3))))
+            else:
+                f.write(message(b"D", struct.pack("<HQ3f", 2, ts, 12.3, 0.8, 30.0)))
+
+
+def baseline_tlog(path: str, limit: int) -> float:
+    """msg/s of a pymavlink recv_match loop (the connect_qgc.py approach)"""
+    log = mavutil.mavlink_connection(path)
+    started = time.perf_counter()
+    count = 0
+    while count < limit:
+        msg = log.recv_match()
+        if msg is None:
+            break
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000, help="messages in the synthetic logs")
+    parser.add_argument("--baseline", type=int, default=100_000, help="messages for the pymavlink loop")
+    parser.add_argument("--tlog")
+    parser.add_argument("--ulog")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tlog = args.tlog or os.path.join(tmp, "synthetic.tlog")
+        ulog = args.ulog or os.path.join(tmp, "synthetic.ulg")
+        if not args.tlog:
+            print(f"Writing {args.messages:,} MAVLink messages...")
+            write_tlog(tlog, args.messages)
+        if not args.ulog:
+            print(f"Writing {args.messages:,} ULog messages...")
+            write_ulog(ulog, args.messages)
+
+        for name, path, ingest in (("tlog", tlog, ingest_tlog), ("ulog", ulog, ingest_ulog)):
+            started = time.perf_counter()
+            archive = ingest(path)
+            elapsed = time.perf_counter() - started
+            messages = archive.meta["messages"]
+            size = os.path.getsize(path) / 1e6
+            print(f"{name}: {messages:,} messages, {size:.1f} MB in {elapsed:.2f} s -> "
+                  f"{messages / elapsed:,.0f} msg/s, {size / elapsed:.0f} MB/s")
+            for topic, rows in archive.rows.items():
+                print(f"   {topic}: {len(rows):,} rows")
+
+        rate = baseline_tlog(tlog, args.baseline)
+        print(f"pymavlink recv_match loop: {rate:,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
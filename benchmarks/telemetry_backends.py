@@ -0,0 +1,154 @@
+"""Compare the MAVSDK and direct MAVLink telemetry backends.
+
+A fake autopilot process streams ATTITUDE (plus unrelated "noise" messages)
+over UDP. Each backend feeds a ``DroneController`` and ``TelemetryState``
+exactly like the API does, and the script reports the latency from the UDP
+send to the state update, and the CPU time used per sample. For the MAVSDK
+path, the CPU time includes the mavsdk_server process.
+
+    PYTHONPATH=. python benchmarks/telemetry_backends.py --rate 200 --noise 1000 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+
+import numpy as np
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.drone_controller import DroneController
+from api.mavlink_backend import MavlinkSystem
+from api.telemetry_state import TelemetryState
+
+SLOTS = 2000          # send-time ring, indexed by the roll angle
+ROLL_STEP_DEG = 0.05  # survives DroneController's rounding to 0.01 deg
+
+
+def autopilot(port: int, rate: float, noise: float, duration: float, send_times, ready):
+    """Fake PX4: heartbeat, ATTITUDE at ``rate`` Hz and ``noise`` other msgs/s"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sock.bind(("127.0.0.1", 0))
+
+    class Out:
+        def write(self, buf):
+            sock.sendto(buf, ("127.0.0.1", port))
+
+    mav = mavlink.MAVLink(Out(), srcSystem=1, srcComponent=1)
+    parser = mavlink.MAVLink(None)
+    ready.set()
+    start = time.monotonic()
+    next_attitude = next_noise = next_heartbeat = start
+    seq = 0
+    while time.monotonic() - start < duration:
+        now = time.monotonic()
+        if now >= next_heartbeat:
+            mav.heartbeat_send(mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_PX4,
+                               mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, 0, mavlink.MAV_STATE_ACTIVE)
+            next_heartbeat += 1.0
+        if now >= next_attitude:
+            slot = seq % SLOTS
+            send_times[slot] = time.monotonic()
+            mav.attitude_send(seq & 0xFFFFFFFF, np.radians(slot * ROLL_STEP_DEG), 0.0, 0.0, 0.0, 0.0, 0.0)
+            seq += 1
+            next_attitude += 1.0 / rate
+        if noise and now >= next_noise:
+            mav.servo_output_raw_send(seq & 0xFFFFFFFF, 0, *([1500] * 8))
+            next_noise += 1.0 / noise
+        # Accept every command (e.g. SET_MESSAGE_INTERVAL)
+        try:
+            data, addr = sock.recvfrom(2048)
+            for msg in parser.parse_buffer(data) or []:
+                if msg.get_type() == "COMMAND_LONG":
+                    mav.command_ack_send(msg.command, mavlink.MAV_RESULT_ACCEPTED)
+        except BlockingIOError:
+            pass
+        time.sleep(max(min(next_attitude, next_noise if noise else next_attitude) - time.monotonic(), 0) / 2)
+
+
+def _proc_cpu(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def run_backend(name: str, args) -> dict:
+    port = args.port
+    send_times = multiprocessing.Array("d", SLOTS, lock=False)
+    ready = multiprocessing.Event()
+
+    if name == "mavlink":
+        drone = MavlinkSystem(f"udp://127.0.0.1:{port}")
+    else:
+        from mavsdk import System
+        drone = System()  # spawns the bundled mavsdk_server
+    state = TelemetryState()
+    controller = DroneController(state, drone=drone)
+
+    latencies = []
+
+    def on_attitude(topic, record):
+        if topic == "attitude":
+            slot = int(round(record.values[0] / ROLL_STEP_DEG)) % SLOTS
+            latencies.append(time.monotonic() - send_times[slot])
+
+    state.add_listener(on_attitude)
+    sender = multiprocessing.Process(target=autopilot, daemon=True,
+                                     args=(port, args.rate, args.noise, args.duration + 5, send_times, ready))
+    # mavsdk_server only opens its gRPC port once it has seen the vehicle
+    sender.start()
+    ready.wait()
+    await drone.connect(system_address=f"udp://:{port}")
+    async for connection in drone.core.connection_state():
+        if connection.is_connected:
+            break
+    controller._stream_rates["attitude"] = args.rate
+    await controller._telemetry_loop()
+    controller.update_streams(["attitude"])
+    await asyncio.sleep(2)  # warm-up
+
+    latencies.clear()
+    server = getattr(drone, "_server_process", None)
+    cpu0 = time.process_time() + (_proc_cpu(server.pid) if server else 0.0)
+    wall0 = time.monotonic()
+    await asyncio.sleep(args.duration)
+    cpu = time.process_time() + (_proc_cpu(server.pid) if server else 0.0) - cpu0
+    wall = time.monotonic() - wall0
+
+    sender.terminate()
+    controller.update_streams([])
+    if server:
+        server.kill()
+    else:
+        drone.close()
+    ms = np.array(latencies) * 1000
+    return {
+        "backend": name,
+        "samples/s": len(ms) / wall,
+        "p50 ms": np.percentile(ms, 50) if len(ms) else float("nan"),
+        "p99 ms": np.percentile(ms, 99) if len(ms) else float("nan"),
+        "cpu %": 100 * cpu / wall,
+        "cpu us/sample": 1e6 * cpu / max(len(ms), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200.0, help="ATTITUDE messages per second")
+    parser.add_argument("--noise", type=float, default=1000.0, help="unrelated messages per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=14560)
+    parser.add_argument("--backends", default="mavlink,mavsdk")
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_backend(name, args)) for name in args.backends.split(",")]
+    columns = list(results[0])
+    print("  ".join(f"{c:>14}" for c in columns))
+    for result in results:
+        print("  ".join(f"{v:>14.2f}" if isinstance(v, float) else f"{v:>14}" for v in result.values()))
+
+
+if __name__ == "__main__":
+    main()
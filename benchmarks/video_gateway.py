@@ -0,0 +1,177 @@
+"""Video gateway cost per frame and per-viewer fan-out, passthrough vs MJPEG.
+
+A sender process streams pre-encoded H.264 (PyAV/libx264, so ``av`` is
+required) as RTP to an in-process ``VideoGateway``. ``--viewers`` fast
+viewers and one slow viewer (``--slow-ms`` per frame) read each output
+straight from its ``Broadcast``. Reports the gateway's CPU time per frame,
+frame latency from the sender's socket write to each viewer, and what the
+slow viewer dropped. The MP4 a fast viewer received is decoded back as a
+check.
+
+    PYTHONPATH=. python benchmarks/video_gateway.py --width 1280 --height 720 --fps 30 --seconds 10 --viewers 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import struct
+import tempfile
+import time
+from fractions import Fraction
+
+import av
+import numpy as np
+
+from api.video_gateway import VideoGateway
+
+MTU = 1200
+
+
+def encode(width: int, height: int, fps: int, count: int, gop: int) -> list[list[bytes]]:
+    """NAL units per frame of a moving test pattern"""
+    codec = av.CodecContext.create("libx264", "w")
+    codec.width, codec.height, codec.pix_fmt = width, height, "yuv420p"
+    codec.time_base = Fraction(1, fps)
+    codec.options = {"tune": "zerolatency", "preset": "ultrafast", "g": str(gop), "bf": "0",
+                     "profile": "baseline", "x264-params": "repeat-headers=1"}
+    y, x = np.mgrid[0:height, 0:width]
+    frames = []
+    for i in range(count):
+        image = np.stack([(x + 8 * i) % 256, (y + 4 * i) % 256, (x + y) % 256], axis=-1).astype(np.uint8)
+        frame = av.VideoFrame.from_ndarray(image, format="rgb24").reformat(format="yuv420p")
+        frame.pts = i
+        for packet in codec.encode(frame):
+            # Annex-B: 3- or 4-byte start codes
+            frames.append([nal.rstrip(b"\x00") for nal in bytes(packet).split(b"\x00\x00\x01") if nal.strip(b"\x00")])
+    return frames
+
+
+def packetize(nals: list[bytes], seq: int, timestamp: int) -> list[bytes]:
+    """RTP packets (single NAL or FU-A) for one access unit"""
+    packets = []
+    for n, nal in enumerate(nals):
+        last = n == len(nals) - 1
+        if len(nal) <= MTU:
+            chunks = [nal]
+        else:
+            header, body = nal[0], nal[1:]
+            pieces = [body[i:i + MTU] for i in range(0, len(body), MTU)]
+            chunks = [bytes([(header & 0xE0) | 28, (0x80 if i == 0 else 0) | (0x40 if i == len(pieces) - 1 else 0)
+                             | (header & 0x1F)]) + piece for i, piece in enumerate(pieces)]
+        for i, chunk in enumerate(chunks):
+            marker = 0x80 if last and i == len(chunks) - 1 else 0
+            packets.append(struct.pack(">BBHII", 0x80, marker | 96, seq & 0xFFFF, timestamp, 0x1234) + chunk)
+            seq += 1
+    return packets
+
+
+def sender(port: int, frames, fps: int, sent, ready):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    ready.wait()
+    seq = 0
+    started = time.monotonic()
+    for i, nals in enumerate(frames):
+        delay = started + i / fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        packets = packetize(nals, seq, i * 90000 // fps)
+        seq += len(packets)
+        sent[i] = time.monotonic()
+        for packet in packets:
+            sock.sendto(packet, ("127.0.0.1", port))
+
+
+def tfdt(fragment: bytes) -> int:
+    return struct.unpack_from(">Q", fragment, fragment.find(b"tfdt") + 8)[0]
+
+
+async def watch(broadcast, stats: dict, fps: int, sent, slow: float, record: list | None = None):
+    """One viewer; fills ``stats`` as it goes so cancelling it loses nothing.
+
+    MP4 fragments carry their frame's decode time, so latency is exact; for
+    the other outputs it is measured against the newest frame sent.
+    """
+    async for chunk in broadcast.stream():
+        now = time.monotonic()
+        stats["received"] += 1
+        if record is not None:
+            record.append(chunk)
+        moof = chunk.find(b"moof", 0, 2048) - 4
+        if moof >= 0:
+            stats["latency"].append(now - sent[tfdt(chunk[moof:]) * fps // 90000])
+        else:
+            stats["latency"].append(now - max(sent))
+        if slow:
+            await asyncio.sleep(slow)
+
+
+async def run(mode: str, args, frames) -> dict:
+    gateway = VideoGateway(args.port, host="127.0.0.1")
+    await gateway.start()
+    sent = multiprocessing.Array("d", len(frames), lock=False)
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=sender, args=(args.port, frames, args.fps, sent, ready), daemon=True)
+    process.start()
+    broadcast = getattr(gateway, mode)
+    viewers = [{"received": 0, "latency": [], "slow": i == args.viewers} for i in range(args.viewers + 1)]
+    record: list[bytes] = []
+    tasks = [asyncio.create_task(watch(broadcast, stats, args.fps, sent,
+                                       args.slow_ms / 1000 if stats["slow"] else 0.0,
+                                       record if i == 0 else None))
+             for i, stats in enumerate(viewers)]
+    await asyncio.sleep(0.2)
+    cpu = time.process_time()
+    ready.set()
+    while process.is_alive():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+    cpu = time.process_time() - cpu
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    status = gateway.status()
+    gateway.stop()
+    return {"cpu_ms": 1000 * cpu / max(gateway.units, 1), "status": status, "record": record, "viewers": viewers}
+
+
+def check_mp4(chunks: list[bytes]) -> int:
+    """Frames PyAV decodes from what a viewer received"""
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as f:
+        f.write(b"".join(chunks))
+    try:
+        with av.open(f.name) as container:
+            return sum(1 for _ in container.decode(video=0))
+    finally:
+        os.remove(f.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--gop", type=int, default=30)
+    parser.add_argument("--viewers", type=int, default=4, help="fast viewers (plus one slow one)")
+    parser.add_argument("--slow-ms", type=float, default=200)
+    parser.add_argument("--port", type=int, default=5610)
+    args = parser.parse_args()
+    frames = encode(args.width, args.height, args.fps, int(args.seconds * args.fps), args.gop)
+    print(f"{len(frames)} frames {args.width}x{args.height} @ {args.fps} fps, GOP {args.gop}, "
+          f"{sum(map(len, map(b''.join, frames))) / len(frames) / 1024:.1f} KB/frame")
+    for mode in ("mp4", "h264", "mjpeg"):
+        r = asyncio.run(run(mode, args, frames))
+        fast = [v for v in r["viewers"] if not v["slow"]]
+        slow = next(v for v in r["viewers"] if v["slow"])
+        latency = np.concatenate([v["latency"] for v in fast]) * 1000
+        print(f"{mode:>6}: {r['cpu_ms']:6.2f} ms CPU/frame, {len(fast)} fast viewers got "
+              f"{min(v['received'] for v in fast)}-{max(v['received'] for v in fast)} chunks, "
+              f"latency p50 {np.percentile(latency, 50):.1f} ms p99 {np.percentile(latency, 99):.1f} ms; "
+              f"slow viewer got {slow['received']}, dropped {r['status'][mode]['dropped']}")
+        if mode == "mp4":
+            print(f"        {check_mp4(r['record'])} frames decoded from a fast viewer's MP4")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Decoding once in the video hub vs once per consumer.
+
+A sender process streams pre-encoded H.264 (PyAV/libx264, so ``av`` is
+required) as RTP at ``--fps``:
+
+- ``separate``: ``--consumers`` processes, each with its own UDP port,
+  depacketizer and decoder, as if every viewer ran its own pipeline
+- ``hub``: one ``VideoHub`` process decodes into shared memory and
+  ``--consumers`` ``FrameRingReader`` processes read from it
+
+Reports the CPU time all consumer-side processes used (decoders, or hub
+plus readers), the latency from the frame's last RTP packet to the
+consumer having the decoded BGR image, and the frames each consumer got.
+
+    PYTHONPATH=. python benchmarks/video_hub_decode.py --width 1280 --height 720 --fps 30 --seconds 10 --consumers 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import av
+import numpy as np
+
+from api.frame_ring import FrameRingReader
+from api.video_gateway import H264Depacketizer, annexb
+from benchmarks.video_gateway import encode, packetize
+from video_hub import VideoHub
+
+IDLE = 1.5  # consumers stop this long after the last frame
+
+
+def sender(ports: list[int], frames, fps: int, ready):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    ready.wait()
+    seq = 0
+    started = time.monotonic()
+    for i, nals in enumerate(frames):
+        delay = started + i / fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        packets = packetize(nals, seq, i * 90000 // fps)
+        seq += len(packets)
+        for port in ports:
+            for packet in packets:
+                sock.sendto(packet, ("127.0.0.1", port))
+
+
+def decoder(port: int, results, ready):
+    """One consumer with a pipeline of its own"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind(("127.0.0.1", port))
+    sock.settimeout(IDLE)
+    depacketizer = H264Depacketizer()
+    codec = av.CodecContext.create("h264", "r")
+    latency = []
+    ready.set()
+    try:
+        while True:
+            for unit in depacketizer.push(sock.recv(65536)):
+                for frame in codec.decode(av.Packet(annexb(unit.nals))):
+                    frame.to_ndarray(format="bgr24")
+                    latency.append(time.monotonic() - unit.received)
+    except socket.timeout:
+        pass
+    results.put({"cpu": time.process_time(), "frames": len(latency), "dropped": 0, "latency": latency})
+
+
+def hub(port: int, name: str, width: int, height: int, results):
+    instance = VideoHub(port, name=name, max_width=width, max_height=height)
+    try:
+        instance.run()
+    except KeyboardInterrupt:
+        pass
+    results.put({"cpu": time.process_time(), "hub": True})
+
+
+def reader(name: str, results, ready):
+    """One consumer attached to the hub"""
+    ring = FrameRingReader(name)
+    latency = []
+    ready.set()
+    while ring.wait(IDLE if latency else 60):
+        frame = ring.read(newest=False)
+        if frame is not None:
+            frame.image[::64, ::64].sum()  # touch it, as a consumer would
+            latency.append(time.monotonic() - frame.received)
+    results.put({"cpu": time.process_time(), "frames": ring.read_count, "dropped": ring.dropped,
+                 "latency": latency})
+    ring.close()
+
+
+def run(mode: str, args, frames) -> list[dict]:
+    results = multiprocessing.Queue()
+    ready = multiprocessing.Event()
+    consumers, waits = [], []
+    if mode == "separate":
+        ports = [args.port + i for i in range(args.consumers)]
+        for port in ports:
+            started = multiprocessing.Event()
+            consumers.append(multiprocessing.Process(target=decoder, args=(port, results, started)))
+            waits.append(started)
+    else:
+        ports = [args.port]
+        name = f"video_hub_bench_{os.getpid()}"
+        hub_process = multiprocessing.Process(target=hub, args=(args.port, name, args.width, args.height, results))
+        hub_process.start()
+        while not os.path.exists(f"/dev/shm/{name}") and hub_process.is_alive():
+            time.sleep(0.05)
+        for _ in range(args.consumers):
+            started = multiprocessing.Event()
+            consumers.append(multiprocessing.Process(target=reader, args=(name, results, started)))
+            waits.append(started)
+    for process in consumers:
+        process.start()
+    for started in waits:
+        started.wait()
+    time.sleep(0.5)  # let the hub's socket and the decoders settle
+    send = multiprocessing.Process(target=sender, args=(ports, frames, args.fps, ready))
+    send.start()
+    ready.set()
+    send.join()
+    out = [results.get() for _ in consumers]
+    for process in consumers:
+        process.join()
+    if mode == "hub":
+        os.kill(hub_process.pid, signal.SIGINT)
+        out.append(results.get())
+        hub_process.join()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--gop", type=int, default=30)
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5620)
+    args = parser.parse_args()
+    frames = encode(args.width, args.height, args.fps, int(args.seconds * args.fps), args.gop)
+    print(f"{len(frames)} frames {args.width}x{args.height} @ {args.fps} fps, {args.consumers} consumers")
+    for mode in ("separate", "hub"):
+        results = run(mode, args, frames)
+        readers = [r for r in results if not r.get("hub")]
+        latency = np.concatenate([r["latency"] for r in readers]) * 1000
+        cpu = sum(r["cpu"] for r in results)
+        print(f"{mode:>9}: {cpu:6.2f} s CPU ({1000 * cpu / len(frames):5.2f} ms/frame), "
+              f"latency p50 {np.percentile(latency, 50):5.1f} ms p99 {np.percentile(latency, 99):5.1f} ms, "
+              f"frames per consumer {min(r['frames'] for r in readers)}-{max(r['frames'] for r in readers)}, "
+              f"dropped {sum(r['dropped'] for r in readers)}")
+        if mode == "hub":
+            print(f"           hub {next(r['cpu'] for r in results if r.get('hub')):.2f} s, "
+                  f"readers {sum(r['cpu'] for r in readers):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
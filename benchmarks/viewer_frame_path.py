@@ -0,0 +1,103 @@
+"""GUI-thread time per frame in video_viewer.py, old frame path vs FrameBuffer.
+
+Runs Qt offscreen (needs PyQt5 and cv2) and pushes ``--frames`` moving
+``--source`` frames into a ``--display`` sized video label:
+
+- ``legacy``: the old ``update_frame`` on the GUI thread (copy, overlay
+  copies, ``QImage.rgbSwapped``, ``QPixmap`` and a smooth scale), then a paint
+- ``buffer``: ``VideoStreamThread.present`` (timed separately, it runs on
+  the video thread) and the GUI thread's slot plus paint of the front buffer
+
+    PYTHONPATH=. python benchmarks/viewer_frame_path.py --source 1920x1080 --display 1280x720 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication, QLabel
+
+import video_viewer
+
+
+def legacy_update(label: QLabel, frame: np.ndarray, count: int):
+    """The viewer's frame path before the double buffer"""
+    current_frame = frame.copy()
+    overlay = frame.copy().copy()
+    height, width = overlay.shape[:2]
+    for text, org in (("FPS: 60", (10, 30)), (f"Frame: {count}", (10, 60)),
+                      (datetime.now().strftime("%H:%M:%S"), (width - 120, 30)), ("CONNECTED", (10, height - 20))):
+        cv2.putText(overlay, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    q_image = QImage(overlay.data, width, height, 3 * width, QImage.Format_RGB888).rgbSwapped()
+    pixmap = QPixmap.fromImage(q_image)
+    label.setPixmap(pixmap.scaled(label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+    return current_frame
+
+
+def size(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=size, default=(1920, 1080))
+    parser.add_argument("--display", type=size, default=(1280, 720))
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+    width, height = args.source
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x % 256, y % 256, (x + y) % 256], axis=-1).astype(np.uint8)
+    frames = [np.roll(base, 8 * i, axis=1) for i in range(8)]
+    print(f"{args.frames} frames {width}x{height} into a {args.display[0]}x{args.display[1]} label")
+
+    label = QLabel()
+    label.setAlignment(Qt.AlignCenter)
+    label.resize(*args.display)
+    label.show()
+    gui = []
+    for i in range(args.frames):
+        start = time.perf_counter()
+        legacy_update(label, frames[i % len(frames)], i)
+        label.repaint()
+        gui.append(time.perf_counter() - start)
+    report("legacy", gui)
+    label.close()
+
+    buffer = video_viewer.FrameBuffer()
+    label = video_viewer.VideoLabel(buffer)
+    label.resize(*args.display)
+    label.show()
+    app.processEvents()
+    thread = video_viewer.VideoStreamThread(buffer=buffer)
+    gui = []
+    for i in range(args.frames):
+        thread.frame_count = i
+        thread.present(frames[i % len(frames)])
+        start = time.perf_counter()
+        label.show_frame()
+        label.repaint()
+        gui.append(time.perf_counter() - start)
+    report("buffer", gui, thread.prepare_times)
+    label.close()
+
+
+def report(mode: str, gui: list, prepare=None):
+    gui_ms = np.array(gui) * 1000
+    line = (f"{mode:>7}: GUI thread {gui_ms.mean():5.2f} ms/frame, p95 {np.percentile(gui_ms, 95):5.2f}, "
+            f"max {gui_ms.max():5.2f} (1080p60 budget 16.7)")
+    if prepare:
+        line += f"; video thread {np.mean(prepare) * 1000:5.2f} ms/frame"
+    print(line)
+
+
+if __name__ == "__main__":
+    main()
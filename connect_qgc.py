@@ -1,36 +1,108 @@
-from pymavlink import mavutil
-
-# Connect to the same port as PX4/MAVSDK (14540)
-master = mavutil.mavlink_connection('udp:0.0.0.0:14540')
-print("Waiting for heartbeat from PX4...")
-master.wait_heartbeat()
-print(f"Heartbeat from system {master.target_system}, component {master.target_component}")
-
-# Request telemetry data streams
-print("Requesting data streams...")
-master.mav.request_data_stream_send(
-    master.target_system, 
-    master.target_component, 
-    mavutil.mavlink.MAV_DATA_STREAM_ALL, 
-    10,  # 10 Hz
-    1    # Start streaming
-)
-
-# Continuous telemetry monitoring
-print("Starting telemetry monitoring...")
-while True:
-    msg = master.recv_match(blocking=True)
-    if not msg:
-        continue
-    
-    t = msg.get_type()
-    if t == 'GLOBAL_POSITION_INT':
-        print(f"Position: {msg.lat/1e7:.6f}, {msg.lon/1e7:.6f}, Alt: {msg.alt/1000:.1f}m")
-    elif t == 'ATTITUDE':
-        print(f"Attitude: Roll={msg.roll:.2f}, Pitch={msg.pitch:.2f}, Yaw={msg.yaw:.2f}")
-    elif t == 'BATTERY_STATUS':
-        print(f"Battery: {msg.battery_remaining}%")
-    elif t == 'LOCAL_POSITION_NED':
-        print(f"Velocity: vx={msg.vx:.2f}, vy={msg.vy:.2f}, vz={msg.vz:.2f}")
-    elif t == 'RC_CHANNELS':
-        print(f"RC: {msg.chan1_raw}, {msg.chan2_raw}, {msg.chan3_raw}, {msg.chan4_raw}")
\ No newline at end of file
+"""Share the PX4 link between QGroundControl, MAVSDK and the control station.
+
+The router owns UDP 14540 (where PX4 SITL sends) and forwards every packet to
+the endpoints; commands from any endpoint go back to the vehicle. The station
+listens on 14540 by default too, so move it to the ``mavsdk`` endpoint port
+with CONTROL_STATION_MAVLINK_PORT:
+
+    python connect_qgc.py --endpoint qgc=127.0.0.1:14550 --endpoint mavsdk=127.0.0.1:14541 \\
+        --limit qgc=ATTITUDE:10 --block mavsdk=SERVO_OUTPUT_RAW --monitor
+    CONTROL_STATION_MAVLINK_PORT=14541 python -m api.index
+"""
+import argparse
+import asyncio
+import time
+
+from pymavlink.dialects.v20 import common as mavlink
+
+from api.mavlink_backend import frames
+from api.mavlink_router import Endpoint, MavlinkRouter, message_ids
+
+MONITORED = {
+    mavlink.MAVLINK_MSG_ID_GLOBAL_POSITION_INT: lambda msg: f"Position: {msg.lat/1e7:.6f}, {msg.lon/1e7:.6f}, Alt: {msg.alt/1000:.1f}m",
+    mavlink.MAVLINK_MSG_ID_ATTITUDE: lambda msg: f"Attitude: Roll={msg.roll:.2f}, Pitch={msg.pitch:.2f}, Yaw={msg.yaw:.2f}",
+    mavlink.MAVLINK_MSG_ID_BATTERY_STATUS: lambda msg: f"Battery: {msg.battery_remaining}%",
+    mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED: lambda msg: f"Velocity: vx={msg.vx:.2f}, vy={msg.vy:.2f}, vz={msg.vz:.2f}",
+    mavlink.MAVLINK_MSG_ID_RC_CHANNELS: lambda msg: f"RC: {msg.chan1_raw}, {msg.chan2_raw}, {msg.chan3_raw}, {msg.chan4_raw}",
+}
+
+
+class Monitor:
+    """Print one line per monitored message type per second"""
+
+    def __init__(self):
+        self.mav = mavlink.MAVLink(None)
+        self.last: dict[int, float] = {}
+
+    def __call__(self, data: bytes):
+        now = time.monotonic()
+        for offset, size, msgid, _ in frames(data):
+            if msgid in MONITORED and now - self.last.get(msgid, 0.0) >= 1.0:
+                self.last[msgid] = now
+                try:
+                    print(MONITORED[msgid](self.mav.decode(bytearray(data[offset:offset + size]))))
+                except Exception:
+                    pass
+
+
+def _address(text: str) -> tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _per_endpoint(items) -> dict[str, str]:
+    result = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        result[name] = value
+    return result
+
+
+def build_endpoints(args) -> list[Endpoint]:
+    allow = _per_endpoint(args.allow)
+    block = _per_endpoint(args.block)
+    limits = _per_endpoint(args.limit)
+    endpoints = []
+    for spec in args.endpoint:
+        name, _, address = spec.partition("=")
+        rates = {}
+        for item in filter(None, limits.get(name, "").split(",")):
+            message, _, hz = item.partition(":")
+            rates[message_ids([message]).pop()] = float(hz)
+        endpoints.append(Endpoint(
+            name, _address(address),
+            allow=message_ids(allow[name].split(",")) if name in allow else None,
+            block=message_ids(block.get(name, "").split(",")),
+            rates=rates,
+        ))
+    return endpoints
+
+
+async def main(args):
+    router = MavlinkRouter(_address(args.listen), build_endpoints(args), Monitor() if args.monitor else None)
+    await router.start()
+    for endpoint in router.endpoints:
+        if endpoint.name == "mavsdk":
+            print(f"💡 Start the station with CONTROL_STATION_MAVLINK_PORT={endpoint.address[1]}")
+    while True:
+        await asyncio.sleep(args.stats)
+        print(f"📊 {router.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listen", default="0.0.0.0:14540", help="UDP address PX4 sends to")
+    parser.add_argument("--endpoint", action="append", default=[], metavar="NAME=HOST:PORT",
+                        help="local MAVLink client (repeatable)")
+    parser.add_argument("--allow", action="append", metavar="NAME=MSG,MSG",
+                        help="forward only these messages to an endpoint")
+    parser.add_argument("--block", action="append", metavar="NAME=MSG,MSG",
+                        help="never forward these messages to an endpoint")
+    parser.add_argument("--limit", action="append", metavar="NAME=MSG:HZ,MSG:HZ",
+                        help="per-message rate caps for an endpoint")
+    parser.add_argument("--monitor", action="store_true", help="print telemetry once per second")
+    parser.add_argument("--stats", type=float, default=10.0, help="seconds between stats lines")
+    args = parser.parse_args()
+    if not args.endpoint:
+        args.endpoint = ["qgc=127.0.0.1:14550", "mavsdk=127.0.0.1:14541"]
+    asyncio.run(main(args))
@@ -12,9 +12,12 @@ from datetime import datetime
 import threading
 import sys
 
+from api.frame_ring import DEFAULT_NAME as HUB_NAME, HubCapture
+
 class DroneVideoViewer:
-    def __init__(self, udp_port=5600):
+    def __init__(self, udp_port=5600, hub=None):
         self.udp_port = udp_port
+        self.hub = hub
         self.running = False
         self.cap = None
         self.frame_count = 0
@@ -118,19 +121,24 @@ class DroneVideoViewer:
     
     def run(self):
         """Main video loop"""
-        print(f"🎥 Starting video viewer on UDP port {self.udp_port}")
+        source = f"video hub {self.hub}" if self.hub else f"UDP port {self.udp_port}"
+        print(f"🎥 Starting video viewer on {source}")
         print("Press 'q' to quit, 's' to save screenshot, 'f' for fullscreen")
         
-        # Setup pipeline
-        pipeline = self.setup_gstreamer_pipeline()
-        print(f"🔧 Using pipeline: {pipeline}")
-        
         # Avoid Qt conflicts
         import os
         os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = ''
         
-        # Create capture object
-        self.cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+        if self.hub:
+            # Decoded frames from video_hub.py's shared memory
+            self.cap = HubCapture(self.hub)
+        else:
+            # Setup pipeline
+            pipeline = self.setup_gstreamer_pipeline()
+            print(f"🔧 Using pipeline: {pipeline}")
+            
+            # Create capture object
+            self.cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
         
         if not self.cap.isOpened():
             print("❌ Failed to open video capture")
@@ -172,7 +180,7 @@ class DroneVideoViewer:
                 placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
                 cv2.putText(placeholder, "Waiting for video stream...", (100, 200), 
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                cv2.putText(placeholder, f"UDP Port: {self.udp_port}", (100, 250), 
+                cv2.putText(placeholder, source, (100, 250), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
                 cv2.putText(placeholder, f"Failures: {consecutive_failures}/{max_failures}", (100, 300), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
@@ -291,6 +299,8 @@ def main():
                        help="UDP port to receive video stream (default: 5600)")
     parser.add_argument("--test-stream", action="store_true",
                        help="Test if stream is available before starting viewer")
+    parser.add_argument("--hub", nargs="?", const=HUB_NAME, metavar="NAME",
+                       help=f"read decoded frames from a running video_hub.py (default name: {HUB_NAME})")
     
     args = parser.parse_args()
     
@@ -298,19 +308,19 @@ def main():
     print("============================")
     print(f"OpenCV version: {cv2.__version__}")
     
-    # Check GStreamer
-    if not check_gstreamer():
+    # Check GStreamer (not needed when the hub decodes)
+    if not args.hub and not check_gstreamer():
         print("❌ GStreamer is required but not found")
         return 1
     
     # Test stream if requested
-    if args.test_stream:
+    if args.test_stream and not args.hub:
         if not test_udp_stream(args.port):
             print(f"⚠️ No stream detected on port {args.port}, but starting anyway...")
     
     # Create and run viewer
     try:
-        viewer = DroneVideoViewer(udp_port=args.port)
+        viewer = DroneVideoViewer(udp_port=args.port, hub=args.hub)
         success = viewer.run()
         return 0 if success else 1
         
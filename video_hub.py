@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Shared video hub for the Drone Control Station
+Receives the RTP/H.264 stream once, decodes it once and publishes the decoded
+frames to any number of local processes through shared memory.
+
+Only one process can own UDP 5600. The hub takes it, optionally relays the
+raw RTP packets to other ports (e.g. the API server's video gateway), and
+writes every decoded BGR frame into the shared-memory ring of
+``api/frame_ring.py``, where any number of readers attach with their own
+cursor and zero-copy numpy views.
+
+If the sender also sends RTCP sender reports and ``--rtcp-port`` names the
+port they arrive on, each frame is stamped with the wall-clock time it was
+captured, so consumers can measure glass-to-glass latency; otherwise only the
+RTP arrival time is known.
+
+Usage:
+    python video_hub.py --port 5600 --rtcp-port 5601 --forward 127.0.0.1:5602
+    python video_hub.py --stats
+    python video_viewer.py --hub
+"""
+
+import argparse
+import queue
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from api.frame_ring import (DEFAULT_NAME, DEFAULT_SLOTS, HEADER_DTYPE, FrameRingReader, FrameRingWriter,
+                            RingLayout)
+
+NTP_EPOCH = 2208988800  # seconds from 1900 to 1970
+
+
+# -----------------------------
+# Hub process
+# -----------------------------
+class VideoHub:
+    """Receives RTP on ``port``, relays it to ``forward`` and decodes it into the ring.
+
+    RTCP sender reports are read from ``rtcp_port`` (0: none) and not relayed.
+    """
+
+    def __init__(self, port: int = 5600, forward: list[tuple[str, int]] = (), name: str = DEFAULT_NAME,
+                 slots: int = DEFAULT_SLOTS, max_width: int = 1920, max_height: int = 1080,
+                 rtcp_port: int = 0):
+        self.port = port
+        self.rtcp_port = rtcp_port
+        self.forward = list(forward)
+        self.ring = FrameRingWriter(name, slots, max_width, max_height)
+        self.running = False
+        self.decoded = 0
+        self.errors = 0
+        self.skipped = 0
+        self.sender_report: tuple[float, int] | None = None  # (wall clock, RTP timestamp)
+        self._units: queue.Queue = queue.Queue(maxsize=120)
+
+    def run(self):
+        # Imported here so --stats only needs numpy
+        import av
+        from api.video_gateway import RECEIVE_BUFFER, H264Depacketizer, annexb
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        sock.bind(("0.0.0.0", self.port))
+        rtcp = None
+        if self.rtcp_port:
+            rtcp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                rtcp.bind(("0.0.0.0", self.rtcp_port))
+            except OSError as e:
+                print(f"⚠️ No RTCP on UDP {self.rtcp_port} ({e}); capture times unknown")
+                rtcp.close()
+                rtcp = None
+        relay = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        depacketizer = H264Depacketizer()
+        self.running = True
+        decoder = threading.Thread(target=self._decode, args=(av, annexb), name="hub-decoder", daemon=True)
+        decoder.start()
+        print(f"🎥 Video hub on UDP {self.port}, frames in shared memory '{self.ring.shm.name}'"
+              + (f", relaying to {', '.join(f'{h}:{p}' for h, p in self.forward)}" if self.forward else ""))
+        last_report = time.monotonic()
+        try:
+            while self.running:
+                ready, _, _ = select.select([sock, rtcp] if rtcp else [sock], [], [], 0.5)
+                if rtcp in ready:
+                    self._on_rtcp(rtcp.recv(65536))
+                if sock in ready:
+                    packet = sock.recv(65536)
+                    for target in self.forward:
+                        relay.sendto(packet, target)
+                    for unit in depacketizer.push(packet):
+                        try:
+                            self._units.put_nowait(unit)
+                        except queue.Full:
+                            self.skipped += 1
+                if time.monotonic() - last_report > 10:
+                    last_report = time.monotonic()
+                    print(f"📊 {self.decoded} frames decoded, {depacketizer.lost} RTP packets lost, "
+                          f"{self.skipped} frames skipped, {self.errors} decode errors")
+        finally:
+            self.running = False
+            self._units.put(None)
+            decoder.join()
+            sock.close()
+            if rtcp:
+                rtcp.close()
+            self.ring.close()
+
+    def _on_rtcp(self, packet: bytes):
+        """Keep the newest sender report's wall clock <-> RTP timestamp pair"""
+        offset = 0
+        while offset + 4 <= len(packet):
+            kind, words = packet[offset + 1], struct.unpack_from(">H", packet, offset + 2)[0]
+            if kind == 200 and offset + 20 <= len(packet):  # SR
+                seconds, fraction, rtp = struct.unpack_from(">III", packet, offset + 8)
+                self.sender_report = (seconds - NTP_EPOCH + fraction / 2 ** 32, rtp)
+            offset += 4 * (words + 1)
+
+    def captured(self, rtp_timestamp: int) -> float:
+        """Sender's wall clock at capture, from the last sender report"""
+        if self.sender_report is None:
+            return 0.0
+        wall, rtp = self.sender_report
+        delta = (rtp_timestamp - rtp + 2 ** 31) % 2 ** 32 - 2 ** 31
+        return wall + delta / 90000
+
+    def _decode(self, av, annexb):
+        codec = av.CodecContext.create("h264", "r")
+        while True:
+            unit = self._units.get()
+            if unit is None:
+                return
+            try:
+                frames = codec.decode(av.Packet(annexb(unit.nals)))
+            except Exception:
+                self.errors += 1
+                continue
+            for frame in frames:
+                bgr = frame.reformat(format="bgr24")
+                width, height = bgr.width, bgr.height
+                plane = bgr.planes[0]
+                rows = np.frombuffer(plane, np.uint8).reshape(height, plane.line_size)
+                try:
+                    seq, view = self.ring.slot(width, height)
+                except ValueError as e:
+                    self.errors += 1
+                    print(f"❌ {e}")
+                    continue
+                # The only copy: straight from the decoder's buffer into the ring
+                view.reshape(height, width * 3)[:] = rows[:, :width * 3]
+                self.ring.publish(seq, width, height, unit.received, unit.timestamp,
+                                  self.captured(unit.timestamp))
+                self.decoded += 1
+                self.ring.layout.header["decoded"] = self.decoded
+
+
+def print_stats(name: str):
+    try:
+        reader = FrameRingReader(name)
+    except FileNotFoundError:
+        print(f"❌ No video hub running ('{name}')")
+        return 1
+    reader.close()  # stats only; don't hold a consumer slot
+    shm = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    header = np.ndarray((), HEADER_DTYPE, shm.buf)
+    layout = RingLayout(shm.buf, int(header["slots"]), int(header["slot_bytes"]))
+    latest = int(layout.header["write_seq"])
+    newest = layout.slots[latest % len(layout.slots)]
+    print(f"🎥 Hub pid {int(layout.header['writer_pid'])}: frame {latest}, "
+          f"{int(newest['width'])}x{int(newest['height'])}, {len(layout.slots)} slots")
+    now = time.monotonic()
+    for consumer in layout.consumers:
+        if consumer["pid"]:
+            last = f"{now - float(consumer['last_read']):.1f} s ago" if consumer["read"] else "never"
+            print(f"   pid {int(consumer['pid']):>7}: {latest - int(consumer['cursor'])} behind, "
+                  f"{int(consumer['read'])} read, {int(consumer['dropped'])} dropped, last read {last}")
+    del header, layout, newest
+    shm.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared video hub: decode once, read from shared memory")
+    parser.add_argument("--port", type=int, default=5600, help="UDP port of the RTP/H.264 stream (default: 5600)")
+    parser.add_argument("--forward", action="append", default=[], metavar="HOST:PORT",
+                        help="also relay the raw RTP packets here (repeatable)")
+    parser.add_argument("--rtcp-port", type=int, default=0,
+                        help="UDP port of the sender's RTCP reports, for capture times (default: off)")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS)
+    parser.add_argument("--max-size", default="1920x1080", help="largest frame the slots hold")
+    parser.add_argument("--stats", action="store_true", help="print the running hub's consumers and exit")
+    args = parser.parse_args()
+    if args.stats:
+        return print_stats(args.name)
+
+    forward = [(host, int(port)) for host, _, port in (target.rpartition(":") for target in args.forward)]
+    if args.rtcp_port and args.rtcp_port in {args.port, *(port for _, port in forward)}:
+        parser.error(f"--rtcp-port {args.rtcp_port} overlaps --port or a --forward port")
+    width, height = (int(v) for v in args.max_size.lower().split("x"))
+    hub = VideoHub(args.port, forward, args.name, args.slots, width, height, args.rtcp_port)
+    try:
+        hub.run()
+    except KeyboardInterrupt:
+        print("\n👋 Video hub stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
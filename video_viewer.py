@@ -12,6 +12,10 @@ import argparse
 from datetime import datetime
 import subprocess
 import os
+import threading
+from collections import deque
+
+from api.frame_ring import DEFAULT_NAME as HUB_NAME, HubCapture
 
 # Force use of system Qt plugins and xcb platform to avoid conflicts with OpenCV's Qt
 os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = '/usr/lib/qt5/plugins'
@@ -22,38 +26,144 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QMenuBar, QAction, QMessageBox, QFrame,
                            QGridLayout, QGroupBox, QSpinBox, QCheckBox)
 from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage, QPainter
+
+class FrameBuffer:
+    """Double buffer between the video thread and the video widget.
+    
+    The thread scales each frame to display size and converts it to RGB
+    (the format Qt's raster engine blits fastest) into the back buffer,
+    then swaps. The widget paints the front buffer
+    through a QImage that wraps the same memory, so nothing is copied or
+    scaled on the GUI thread.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()  # held by the GUI while painting and by swap()
+        self.buffers = [None, None]
+        self.images = [None, None]
+        self.timing = [(0.0, 0.0), (0.0, 0.0)]  # (received, captured) of each buffer's frame
+        self.front = 0
+        self.seq = 0
+        self.target = (640, 480)
+    
+    def set_target(self, width, height):
+        """Size of the area frames are displayed in (GUI thread)"""
+        self.target = (max(width, 1), max(height, 1))
+    
+    def back(self, width, height):
+        """Back buffer of this size, only reallocated when the size changes"""
+        index = 1 - self.front
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape[:2] != (height, width):
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self.buffers[index] = buffer
+            self.images[index] = QImage(buffer.data, width, height, 3 * width, QImage.Format_RGB888)
+        return buffer
+    
+    def swap(self, received=0.0, captured=0.0):
+        """Show the back buffer; ``received`` is time.monotonic() at RTP arrival,
+        ``captured`` the sender's time.time() at capture (0.0 when unknown)"""
+        with self.lock:
+            self.timing[1 - self.front] = (received, captured)
+            self.front = 1 - self.front
+            self.seq += 1
+        return self.seq
+
+class VideoLabel(QLabel):
+    """Video display that paints the front buffer directly (no QPixmap per frame)"""
+    
+    def __init__(self, buffer):
+        super().__init__()
+        self.buffer = buffer
+        self.showing = False
+        self.paint_times = deque(maxlen=300)
+        self.receive_latency = deque(maxlen=300)  # RTP arrival -> painted
+        self.glass_latency = deque(maxlen=300)    # capture at the sender -> painted
+        self.painted_seq = 0
+        self.superseded = 0  # frames replaced by a newer one before they were painted
+    
+    def show_frame(self):
+        if not self.showing:
+            self.clear()
+            self.showing = True
+        self.update()  # Qt merges pending updates, so only the newest frame is painted
+    
+    def setText(self, text):
+        self.showing = False
+        super().setText(text)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        rect = self.contentsRect()
+        self.buffer.set_target(rect.width(), rect.height())
+    
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        if self.showing:
+            painter = QPainter(self)
+            rect = self.contentsRect()
+            with self.buffer.lock:
+                image = self.buffer.images[self.buffer.front]
+                if image is not None:
+                    painter.drawImage(rect.x() + (rect.width() - image.width()) // 2,
+                                      rect.y() + (rect.height() - image.height()) // 2, image)
+                seq, (received, captured) = self.buffer.seq, self.buffer.timing[self.buffer.front]
+            painter.end()
+            self.paint_times.append(time.perf_counter() - start)
+            if seq != self.painted_seq:
+                if self.painted_seq:
+                    self.superseded += max(seq - self.painted_seq - 1, 0)
+                self.painted_seq = seq
+                if received:
+                    self.receive_latency.append(time.monotonic() - received)
+                if captured:
+                    self.glass_latency.append(time.time() - captured)
 
 class VideoStreamThread(QThread):
     """Thread for handling video stream reception and processing"""
-    frameReady = pyqtSignal(np.ndarray)
+    frameReady = pyqtSignal(int)  # FrameBuffer sequence number
     statusChanged = pyqtSignal(str)
     fpsChanged = pyqtSignal(int)
     
-    def __init__(self, udp_port=5600):
+    def __init__(self, udp_port=5600, hub=None, buffer=None, max_fps=0):
         super().__init__()
         self.udp_port = udp_port
+        self.hub = hub
+        self.max_fps = max_fps
+        self.buffer = buffer or FrameBuffer()
+        self.overlay = True
         self.running = False
         self.cap = None
+        self.latest_frame = None
         self.frame_count = 0
+        self.current_fps = 0
         self.fps_counter = 0
         self.last_fps_time = time.time()
+        self.prepare_times = deque(maxlen=300)
+        self.dropped = 0   # missing from the stream (gaps in the media timestamps)
+        self.skipped = 0   # read but not shown because of max_fps
+        self.frame_intervals = deque(maxlen=60)
+        self.last_media_time = None
+        self.next_due = 0.0   # earliest monotonic time the next frame may be shown (max_fps)
+        self._scaled = None
         
     def setup_gstreamer_pipeline(self):
         """Setup GStreamer pipeline to decode H.264 UDP stream"""
         # Try multiple pipeline configurations
         pipelines = [
             # Pipeline 1: Full RTP pipeline
-            f"udpsrc port={self.udp_port} ! application/x-rtp,media=video,clock-rate=90000,encoding-name=H264,payload=96 ! rtph264depay ! h264parse ! avdec_h264 ! videoconvert ! appsink drop=1 max-buffers=1",
+            f"udpsrc port={self.udp_port} ! application/x-rtp,media=video,clock-rate=90000,encoding-name=H264,payload=96 ! rtph264depay ! h264parse ! avdec_h264 ! videoconvert ! appsink drop=1 max-buffers=1 sync=false",
             
             # Pipeline 2: Simplified pipeline
-            f"udpsrc port={self.udp_port} ! application/x-rtp ! rtph264depay ! h264parse ! avdec_h264 ! videoconvert ! appsink",
+            f"udpsrc port={self.udp_port} ! application/x-rtp ! rtph264depay ! h264parse ! avdec_h264 ! videoconvert ! appsink drop=1 max-buffers=1 sync=false",
             
             # Pipeline 3: Raw UDP approach
-            f"udpsrc port={self.udp_port} ! h264parse ! avdec_h264 ! videoconvert ! appsink",
+            f"udpsrc port={self.udp_port} ! h264parse ! avdec_h264 ! videoconvert ! appsink drop=1 max-buffers=1 sync=false",
             
             # Pipeline 4: Test pattern fallback
-            "videotestsrc pattern=ball ! videoconvert ! appsink"
+            "videotestsrc pattern=ball ! videoconvert ! appsink drop=1 max-buffers=1"
         ]
         
         for i, pipeline in enumerate(pipelines):
@@ -83,10 +193,15 @@ class VideoStreamThread(QThread):
         self.statusChanged.emit("Initializing video capture...")
         
         try:
-            pipeline = self.setup_gstreamer_pipeline()
-            print(f"🎥 Using pipeline: {pipeline}")
-            
-            self.cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+            if self.hub:
+                # Decoded frames from video_hub.py's shared memory, no pipeline of our own
+                print(f"🎥 Using video hub: {self.hub}")
+                self.cap = HubCapture(self.hub)
+            else:
+                pipeline = self.setup_gstreamer_pipeline()
+                print(f"🎥 Using pipeline: {pipeline}")
+                
+                self.cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
             
             if not self.cap.isOpened():
                 self.statusChanged.emit("Failed to open video pipeline")
@@ -106,11 +221,29 @@ class VideoStreamThread(QThread):
             while self.running:
                 ret, frame = self.cap.read()
                 
+                # No sleep: read() blocks until the next frame, and the
+                # appsink (or the hub) only ever hands over the newest one
                 if ret and frame is not None:
                     consecutive_failures = 0
+                    self.latest_frame = frame  # capture returns a new array per read; kept for screenshots
                     self.frame_count += 1
                     self.calculate_fps()
-                    self.frameReady.emit(frame)
+                    if self.hub:
+                        last = self.cap.last
+                        self.count_drops(last.rtp_timestamp / 90)
+                        received, captured = last.received, last.captured
+                    else:
+                        self.count_drops(self.cap.get(cv2.CAP_PROP_POS_MSEC))
+                        received = captured = 0.0
+                    if self.max_fps:
+                        now = time.monotonic()
+                        if now < self.next_due:
+                            self.skipped += 1
+                            continue
+                        # Step the deadline, not the arrival time, so jitter can't lower the rate;
+                        # after a stall start again from now instead of bursting to catch up
+                        self.next_due = max(self.next_due + 1.0 / self.max_fps, now)
+                    self.present(frame, received, captured)
                 else:
                     consecutive_failures += 1
                     print(f"⚠️ Frame read failed (attempt {consecutive_failures})")
@@ -123,13 +256,13 @@ class VideoStreamThread(QThread):
                     empty_frame = np.zeros((480, 640, 3), dtype=np.uint8)
                     cv2.putText(empty_frame, "Waiting for video stream...", 
                                (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    cv2.putText(empty_frame, f"Listening on UDP port {self.udp_port}", 
+                    source = f"video hub {self.hub}" if self.hub else f"UDP port {self.udp_port}"
+                    cv2.putText(empty_frame, f"Listening on {source}", 
                                (50, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
                     cv2.putText(empty_frame, f"Failures: {consecutive_failures}/{max_failures}", 
                                (50, 320), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                    self.frameReady.emit(empty_frame)
-                
-                self.msleep(33)  # ~30 FPS max
+                    self.present(empty_frame)
+                    self.msleep(100)  # back off only while there is no stream
                 
         except Exception as e:
             error_msg = f"Error: {str(e)}"
@@ -141,12 +274,66 @@ class VideoStreamThread(QThread):
             self.statusChanged.emit("Video capture stopped")
             print("🛑 Video capture stopped")
     
+    def count_drops(self, media_time):
+        """Frames missing before this one, from gaps in their timestamps (ms)"""
+        last, self.last_media_time = self.last_media_time, media_time
+        if last is None or media_time <= last:
+            return  # first frame, no timestamps or a wrap
+        delta = media_time - last
+        if len(self.frame_intervals) >= 5:
+            interval = float(np.median(self.frame_intervals))
+            if delta > 1.5 * interval:
+                self.dropped += round(delta / interval) - 1
+        self.frame_intervals.append(delta)
+    
+    def present(self, frame, received=0.0, captured=0.0):
+        """Scale, convert and overlay ``frame`` into the back buffer and hand it to the GUI"""
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        target_width, target_height = self.buffer.target
+        scale = min(target_width / width, target_height / height)
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        back = self.buffer.back(*size)
+        if size != (width, height):
+            if self._scaled is None or self._scaled.shape != back.shape:
+                self._scaled = np.empty_like(back)
+            # INTER_AREA looks marginally better but costs ~20 ms at 1080p
+            frame = cv2.resize(frame, size, dst=self._scaled, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=back)
+        if self.overlay:
+            self.draw_overlay(back)
+        self.prepare_times.append(time.perf_counter() - start)
+        self.frameReady.emit(self.buffer.swap(received, captured))
+    
+    def draw_overlay(self, image):
+        """Draw the information overlay in place, at display size"""
+        height, width = image.shape[:2]
+        
+        # FPS counter
+        cv2.putText(image, f"FPS: {self.current_fps}", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        # Frame counter
+        cv2.putText(image, f"Frame: {self.frame_count}", (10, 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        # Timestamp
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        cv2.putText(image, timestamp, (width - 120, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        # Connection status
+        status_text = "CONNECTED"
+        cv2.putText(image, status_text, (10, height - 20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    
     def calculate_fps(self):
         """Calculate FPS"""
         self.fps_counter += 1
         current_time = time.time()
         
         if current_time - self.last_fps_time >= 1.0:
+            self.current_fps = self.fps_counter
             self.fpsChanged.emit(self.fps_counter)
             self.fps_counter = 0
             self.last_fps_time = current_time
@@ -159,21 +346,22 @@ class VideoStreamThread(QThread):
 class DroneVideoViewer(QMainWindow):
     """Main PyQt application window for drone video viewer"""
     
-    def __init__(self, udp_port=5600):
+    def __init__(self, udp_port=5600, hub=None, max_fps=0):
         super().__init__()
         self.udp_port = udp_port
-        self.current_frame = None
+        self.hub = hub
+        self.max_fps = max_fps
         self.current_fps = 0
         self.frame_count = 0
         self.recording = False
+        self.frame_buffer = FrameBuffer()
+        self.slot_times = deque(maxlen=300)
+        
+        self.init_ui()
         
         # Initialize video thread
-        self.video_thread = VideoStreamThread(udp_port)
-        self.video_thread.frameReady.connect(self.update_frame)
-        self.video_thread.statusChanged.connect(self.update_status)
-        self.video_thread.fpsChanged.connect(self.update_fps)
+        self.video_thread = self.create_video_thread(udp_port)
         
-        self.init_ui()
         self.setup_timer()
         
         # Auto-start video stream
@@ -231,7 +419,7 @@ class DroneVideoViewer(QMainWindow):
         video_layout = QVBoxLayout()
         
         # Video display label
-        self.video_label = QLabel()
+        self.video_label = VideoLabel(self.frame_buffer)
         self.video_label.setMinimumSize(640, 480)
         self.video_label.setStyleSheet("""
             QLabel {
@@ -304,6 +492,7 @@ class DroneVideoViewer(QMainWindow):
         # Show overlay checkbox
         self.show_overlay_cb = QCheckBox("Show Overlay")
         self.show_overlay_cb.setChecked(True)
+        self.show_overlay_cb.toggled.connect(self.toggle_overlay)
         
         settings_layout.addWidget(port_label, 0, 0)
         settings_layout.addWidget(self.port_spinbox, 0, 1)
@@ -319,10 +508,18 @@ class DroneVideoViewer(QMainWindow):
         self.total_frames_label = QLabel("Total Frames: 0")
         self.uptime_label = QLabel("Uptime: 00:00:00")
         self.data_rate_label = QLabel("Data Rate: 0 KB/s")
+        self.gui_time_label = QLabel("GUI Thread: -- ms/frame")
+        self.prepare_time_label = QLabel("Frame Prep: -- ms/frame")
+        self.latency_label = QLabel("Latency: --")
+        self.dropped_label = QLabel("Dropped: 0")
         
         stats_layout.addWidget(self.total_frames_label, 0, 0)
         stats_layout.addWidget(self.uptime_label, 1, 0)
         stats_layout.addWidget(self.data_rate_label, 2, 0)
+        stats_layout.addWidget(self.gui_time_label, 3, 0)
+        stats_layout.addWidget(self.prepare_time_label, 4, 0)
+        stats_layout.addWidget(self.latency_label, 5, 0)
+        stats_layout.addWidget(self.dropped_label, 6, 0)
         
         info_panel.addWidget(stats_group)
         
@@ -380,53 +577,58 @@ class DroneVideoViewer(QMainWindow):
         self.timer.timeout.connect(self.update_ui)
         self.timer.start(1000)  # Update every second
     
-    def update_frame(self, frame):
-        """Update video frame display"""
-        self.current_frame = frame.copy()
+    def create_video_thread(self, port):
+        """Video thread sharing this window's frame buffer"""
+        thread = VideoStreamThread(port, self.hub, self.frame_buffer, self.max_fps)
+        thread.overlay = self.show_overlay_cb.isChecked()
+        thread.frameReady.connect(self.update_frame)
+        thread.statusChanged.connect(self.update_status)
+        thread.fpsChanged.connect(self.update_fps)
+        return thread
+    
+    def update_frame(self, seq):
+        """A new frame is in the front buffer; repaint (already scaled and converted)"""
+        start = time.perf_counter()
         self.frame_count += 1
-        
-        # Add overlay if enabled
-        if self.show_overlay_cb.isChecked():
-            frame = self.add_overlay(frame)
-        
-        # Convert frame to Qt format
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-        
-        # Scale image to fit label while maintaining aspect ratio
-        pixmap = QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        
-        self.video_label.setPixmap(scaled_pixmap)
+        self.video_label.show_frame()
+        self.slot_times.append(time.perf_counter() - start)
     
-    def add_overlay(self, frame):
-        """Add information overlay to frame"""
-        overlay_frame = frame.copy()
-        height, width = overlay_frame.shape[:2]
-        
-        # Semi-transparent background for text
-        overlay = overlay_frame.copy()
-        
-        # FPS counter
-        cv2.putText(overlay, f"FPS: {self.current_fps}", (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Frame counter
-        cv2.putText(overlay, f"Frame: {self.frame_count}", (10, 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Timestamp
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        cv2.putText(overlay, timestamp, (width - 120, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Connection status
-        status_text = "CONNECTED"
-        cv2.putText(overlay, status_text, (10, height - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        return overlay
+    def toggle_overlay(self, checked):
+        """Overlay is drawn by the video thread"""
+        self.video_thread.overlay = checked
+    
+    def update_frame_times(self):
+        """GUI thread time per frame against the frame interval"""
+        if not self.video_label.paint_times:
+            return
+        slot = np.mean(self.slot_times) * 1000 if self.slot_times else 0.0
+        gui = np.array(self.video_label.paint_times) * 1000 + slot
+        budget = 1000 / self.current_fps if self.current_fps else 1000 / 30
+        self.gui_time_label.setText(f"GUI Thread: {gui.mean():.1f} ms/frame "
+                                    f"(p95 {np.percentile(gui, 95):.1f}, budget {budget:.1f})")
+        prepare = self.video_thread.prepare_times
+        if prepare:
+            self.prepare_time_label.setText(f"Frame Prep: {np.mean(prepare) * 1000:.1f} ms/frame")
+    
+    def update_latency(self):
+        """Glass-to-glass latency if the sender's capture times are known (hub + RTCP),
+        otherwise from RTP arrival; both up to the frame being painted"""
+        if self.video_label.glass_latency:
+            latency, kind = self.video_label.glass_latency, "glass-to-glass"
+        elif self.video_label.receive_latency:
+            latency, kind = self.video_label.receive_latency, "from RTP arrival"
+        else:
+            latency = None
+        if latency:
+            values = np.array(latency) * 1000
+            self.latency_label.setText(f"Latency: {np.median(values):.0f} ms {kind} "
+                                       f"(p95 {np.percentile(values, 95):.0f})")
+        elif not self.hub:
+            self.latency_label.setText("Latency: -- (needs --hub)")
+        thread = self.video_thread
+        self.dropped_label.setText(f"Dropped: {thread.dropped + thread.skipped + self.video_label.superseded} "
+                                   f"(stream {thread.dropped}, display {self.video_label.superseded}"
+                                   + (f", max-fps {thread.skipped})" if self.max_fps else ")"))
     
     def update_status(self, status):
         """Update status message"""
@@ -447,6 +649,8 @@ class DroneVideoViewer(QMainWindow):
         # Update frame counter
         self.frame_label.setText(f"Frames: {self.frame_count}")
         self.total_frames_label.setText(f"Total Frames: {self.frame_count}")
+        self.update_frame_times()
+        self.update_latency()
         
         # Update uptime
         uptime_seconds = int(time.time() - self.start_time)
@@ -479,15 +683,13 @@ class DroneVideoViewer(QMainWindow):
         # Restart video thread with new port
         if self.video_thread.running:
             self.stop_video()
-            self.video_thread = VideoStreamThread(port)
-            self.video_thread.frameReady.connect(self.update_frame)
-            self.video_thread.statusChanged.connect(self.update_status)
-            self.video_thread.fpsChanged.connect(self.update_fps)
+            self.video_thread = self.create_video_thread(port)
             self.start_video()
     
     def take_screenshot(self):
         """Save current frame as screenshot"""
-        if self.current_frame is not None:
+        frame = self.video_thread.latest_frame
+        if frame is not None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"drone_screenshot_{timestamp}.jpg"
             
@@ -495,7 +697,7 @@ class DroneVideoViewer(QMainWindow):
             os.makedirs("screenshots", exist_ok=True)
             filepath = os.path.join("screenshots", filename)
             
-            cv2.imwrite(filepath, self.current_frame)
+            cv2.imwrite(filepath, frame)
             self.status_bar.showMessage(f"Screenshot saved: {filepath}", 3000)
             
             QMessageBox.information(self, "Screenshot Saved", 
@@ -562,6 +764,10 @@ def main():
     parser = argparse.ArgumentParser(description="PyQt Drone Video Viewer")
     parser.add_argument("--port", type=int, default=5600, 
                        help="UDP port to receive video stream (default: 5600)")
+    parser.add_argument("--hub", nargs="?", const=HUB_NAME, metavar="NAME",
+                       help=f"read decoded frames from a running video_hub.py (default name: {HUB_NAME})")
+    parser.add_argument("--max-fps", type=float, default=0,
+                       help="cap the display rate by skipping frames, never by waiting (default: no cap)")
     
     args = parser.parse_args()
     
@@ -582,7 +788,7 @@ def main():
     app.setStyle('Fusion')
     
     # Create and show main window
-    viewer = DroneVideoViewer(udp_port=args.port)
+    viewer = DroneVideoViewer(udp_port=args.port, hub=args.hub, max_fps=args.max_fps)
     viewer.show()
     
     # Run application